@@ -0,0 +1,312 @@
+"""Benchmark the solver on the example games and seeded random deals of mission 26.
+
+Run with `python -m crewz3r.crew_benchmark --output results.json`, and compare
+a later run against it with `--baseline results.json`. The startup times of the
+server and the command line are measured as well."""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from z3 import get_version_string
+
+from .crew_example_games import (
+    EXAMPLE_GAME_NUMBERS,
+    example_game,
+    random_game,
+    random_game_mission_26,
+)
+from .crew_game import CrewGame
+from .crew_playout import find_witness
+from .crew_rules import verify_solution
+from .crew_utils import (
+    DEFAULT_SOLVER_CONFIG,
+    PLAYER_PARAMETERS,
+    SolverConfig,
+)
+
+# The seed of the first random deal of mission 26.
+DEFAULT_SEED: int = 26
+
+# Relative slowdown above which a time is reported as a regression.
+DEFAULT_THRESHOLD: float = 0.2
+
+# Slowdowns of less seconds are ignored as noise.
+DEFAULT_MIN_SECONDS: float = 0.05
+
+# The Python arguments of the commands whose startup time is measured, by name:
+# the bare interpreter, importing the server and the command line.
+STARTUP_COMMANDS: dict[str, list[str]] = {
+    "python": ["-c", "pass"],
+    "server": ["-c", "import crewz3r.server"],
+    "cli": ["-m", "crewz3r.main", "--help"],
+}
+
+# The number of times each startup command is run.
+STARTUP_REPEAT: int = 5
+
+
+@dataclass(frozen=True)
+class BenchmarkInstance:
+    """An example game by its number, or a deal of mission 26 or a random game for
+    a number of players by its seed."""
+
+    kind: str
+    number: int
+    players: int = 4
+
+    @property
+    def name(self) -> str:
+        if self.kind == "example":
+            return f"example {self.number}"
+        if self.kind == "random":
+            return f"random {self.players} players seed {self.number}"
+        return f"mission 26 seed {self.number}"
+
+    def create_game(
+        self, solver_config: SolverConfig = DEFAULT_SOLVER_CONFIG
+    ) -> CrewGame:
+        if self.kind == "example":
+            # The example games print their description.
+            with contextlib.redirect_stdout(io.StringIO()):
+                return example_game(self.number, solver_config)
+        if self.kind == "random":
+            return random_game(
+                PLAYER_PARAMETERS[self.players], self.number, solver_config
+            )
+        return random_game_mission_26(seed=self.number, solver_config=solver_config)
+
+
+def benchmark_instances(
+    examples: tuple[int, ...] = EXAMPLE_GAME_NUMBERS,
+    random_games: int = 5,
+    seed: int = DEFAULT_SEED,
+) -> list[BenchmarkInstance]:
+    return [BenchmarkInstance("example", n) for n in examples] + [
+        BenchmarkInstance("mission_26", seed + i) for i in range(random_games)
+    ]
+
+
+def run_instance(
+    instance: BenchmarkInstance, timeout: float | None = None, repeat: int = 1
+) -> dict[str, Any]:
+    """Build and solve a game repeat times and return the median times, the result,
+    the peak memory of the process and the z3 statistics of the last check.
+
+    The solution of a sat game is replayed with the rules of crew_rules, and the
+    first rule it violates is returned as violation. witness tells whether the
+    playouts of crew_playout found a solution, within witness_seconds."""
+    build_times: list[float] = []
+    check_times: list[float] = []
+    game: CrewGame | None = None
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        game = instance.create_game()
+        build_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        game.solve(timeout)
+        check_times.append(time.perf_counter() - start)
+    assert game is not None
+    start = time.perf_counter()
+    witness: bool = find_witness(game.parameters, game.initial_state) is not None
+    witness_seconds: float = time.perf_counter() - start
+
+    return {
+        "name": instance.name,
+        "kind": instance.kind,
+        "number": instance.number,
+        "players": game.parameters.number_of_players,
+        "build_seconds": statistics.median(build_times),
+        "check_seconds": statistics.median(check_times),
+        "result": str(game.check_result),
+        "violation": (
+            verify_solution(game.parameters, game.get_solution())
+            if game.has_solution()
+            else None
+        ),
+        "phase_seconds": game.statistics.phase_seconds,
+        "assertions": game.statistics.assertions,
+        "witness": witness,
+        "witness_seconds": witness_seconds,
+        # Kilobytes on Linux.
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "statistics": game.statistics.solver,
+    }
+
+
+def measure_startup(repeat: int = STARTUP_REPEAT) -> dict[str, float]:
+    """The median wall time in seconds of each of STARTUP_COMMANDS, each run in a
+    fresh interpreter."""
+    root: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    startup: dict[str, float] = {}
+    for name, arguments in STARTUP_COMMANDS.items():
+        times: list[float] = []
+        for _ in range(repeat):
+            start: float = time.perf_counter()
+            subprocess.run(
+                [sys.executable, *arguments],
+                cwd=root,
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+            times.append(time.perf_counter() - start)
+        startup[name] = statistics.median(times)
+    return startup
+
+
+def _run_instance(arguments: tuple[BenchmarkInstance, float | None, int]) -> Any:
+    return run_instance(*arguments)
+
+
+def run_benchmark(
+    instances: list[BenchmarkInstance],
+    timeout: float | None = None,
+    repeat: int = 1,
+    workers: int = 1,
+) -> dict[str, Any]:
+    """Run each instance in a fresh process, so the peak memory is measured per
+    instance. More than one worker makes the times less comparable."""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, maxtasksperchild=1) as pool:
+        results: list[dict[str, Any]] = []
+        for result in pool.imap(
+            _run_instance, [(instance, timeout, repeat) for instance in instances]
+        ):
+            print(
+                f"{result['name']:<24} {result['result']:<8} "
+                f"build {result['build_seconds']:7.3f}s  "
+                f"check {result['check_seconds']:7.3f}s",
+                file=sys.stderr,
+            )
+            results.append(result)
+    return {
+        "metadata": {
+            "z3": get_version_string(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timeout": timeout,
+            "repeat": repeat,
+            "workers": workers,
+        },
+        "startup": measure_startup(),
+        "results": results,
+    }
+
+
+def compare_results(
+    report: dict[str, Any],
+    baseline: dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    min_seconds: float = DEFAULT_MIN_SECONDS,
+) -> list[str]:
+    """Return a description of each regression of report against baseline: invalid
+    solutions, unsat results of games solved by playouts, slower phases and
+    changed results of the instances in both, and slower startup commands."""
+    regressions: list[str] = []
+    old_startup: dict[str, float] = baseline.get("startup", {})
+    for name, seconds in report.get("startup", {}).items():
+        if name in old_startup and _slower(
+            seconds, old_startup[name], threshold, min_seconds
+        ):
+            regressions.append(
+                f"startup of {name} took {seconds:.3f}s "
+                f"instead of {old_startup[name]:.3f}s"
+            )
+    previous: dict[str, dict[str, Any]] = {r["name"]: r for r in baseline["results"]}
+    for result in report["results"]:
+        if result.get("violation"):
+            regressions.append(
+                f"{result['name']}: invalid solution: {result['violation']}"
+            )
+        if result.get("witness") and result["result"] == "unsat":
+            regressions.append(f"{result['name']}: unsat, but playouts solved it")
+        old: dict[str, Any] | None = previous.get(result["name"])
+        if old is None:
+            continue
+        if result["result"] != old["result"]:
+            regressions.append(
+                f"{result['name']}: result changed from {old['result']} "
+                f"to {result['result']}"
+            )
+        for phase in ("build", "check"):
+            new_time: float = result[f"{phase}_seconds"]
+            old_time: float = old[f"{phase}_seconds"]
+            if _slower(new_time, old_time, threshold, min_seconds):
+                regressions.append(
+                    f"{result['name']}: {phase} took {new_time:.3f}s "
+                    f"instead of {old_time:.3f}s"
+                )
+    return regressions
+
+
+def _slower(
+    new_time: float, old_time: float, threshold: float, min_seconds: float
+) -> bool:
+    return new_time > old_time * (1 + threshold) and new_time - old_time > min_seconds
+
+
+def parse_numbers(text: str) -> tuple[int, ...]:
+    """Parse comma separated numbers."""
+    return tuple(int(n) for n in text.split(",") if n)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--examples",
+        type=parse_numbers,
+        default=EXAMPLE_GAME_NUMBERS,
+        help="comma separated numbers of the example games (default: all)",
+    )
+    parser.add_argument(
+        "--random", type=int, default=5, help="number of random mission 26 deals"
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument(
+        "--timeout", type=float, default=60.0, help="solver timeout in seconds"
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against the results in this file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    arguments = parser.parse_args(argv)
+
+    report: dict[str, Any] = run_benchmark(
+        benchmark_instances(arguments.examples, arguments.random, arguments.seed),
+        arguments.timeout,
+        arguments.repeat,
+        arguments.workers,
+    )
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            baseline: dict[str, Any] = json.load(file)
+        regressions: list[str] = compare_results(report, baseline, arguments.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
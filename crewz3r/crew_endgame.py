@@ -0,0 +1,383 @@
+"""Exact search of the last tricks of a game, memoised across searches and deals.
+
+Positions are given by the remaining hands as bitsets of crew_rules, the starting
+player of the next trick, the completed tasks and the tricks won towards the
+counting special tasks. Whether the rest of the game can be played such that all
+tasks are completed is stored per position in an LRU cache, which is shared by
+all searches of a process, so positions that recur in a search tree, in repeated
+queries during live play or in other deals with the same tasks are looked up."""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from .crew_rules import (
+    VALUE_BITS,
+    card_mask,
+    card_rank,
+    colour_mask,
+    decode_card,
+    encode_card,
+    first_starting_player,
+    task_predecessors,
+)
+from .crew_tasks import (
+    AssignTrickToPlayer,
+    NoTricksWithValueTask,
+    NullGame,
+    WinTricksWithSpecificValues,
+)
+from .crew_types import Card, CardDistribution, Player
+from .crew_utils import (
+    TRUMP_COLOUR,
+    CrewGameParameters,
+    CrewGameState,
+    CrewGameTrick,
+)
+
+# The number of remaining tricks from which on games are searched exactly.
+ENDGAME_TRICKS: int = 3
+
+# The default number of positions kept by an EndgameCache.
+DEFAULT_MAX_ENTRIES: int = 100_000
+
+_VALUE: int = (1 << VALUE_BITS) - 1
+
+
+class EndgameCache:
+    """A bounded map from positions to whether they can be played to completion.
+    The positions that were used least recently are evicted first."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries: int = max_entries
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[Hashable, bool] = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def get(self, key: Hashable) -> bool | None:
+        with self._lock:
+            value: bool | None = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: bool) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# The cache shared by all endgame searches of this process.
+ENDGAME_CACHE: EndgameCache = EndgameCache()
+
+
+@dataclass(frozen=True)
+class EndgamePosition:
+    """The state of a game before a trick, counted from 1.
+
+    leader is None if any player may start the trick. completed is the bitset of
+    the indices of the completed tasks, and won holds the number of tricks won
+    towards each WinTricksWithSpecificValues task."""
+
+    hands: tuple[int, ...]
+    leader: Player | None
+    trick_number: int
+    completed: int = 0
+    won: tuple[int, ...] = ()
+
+
+class EndgameSearch:
+    """Searches the remaining tricks of a game with tasks and special tasks.
+
+    The state is the initial state of the game, or a mid-game state with the
+    remaining hands, the starting player of the next trick as active player and
+    the open tasks. Positions are searched depth-first, trick by trick, and the
+    result of each position is stored in the cache."""
+
+    def __init__(
+        self,
+        parameters: CrewGameParameters,
+        state: CrewGameState,
+        cache: EndgameCache = ENDGAME_CACHE,
+    ) -> None:
+        if state.hands is None:
+            raise ValueError("Hands not specified.")
+        self.parameters: CrewGameParameters = parameters
+        self.state: CrewGameState = state
+        self.hands: CardDistribution = state.hands
+        self.cache: EndgameCache = cache
+        self.number_of_tricks: int = len(state.hands[0])
+        self.trump_cards: int = colour_mask(TRUMP_COLOUR)
+
+        # The tasked player and index of each task card.
+        self.tasks: dict[int, tuple[Player, int]] = {}
+        for i, task in enumerate(state.tasks):
+            if task.player is None:
+                raise ValueError(f"{task} has no player.")
+            self.tasks[encode_card(task.card)] = task.player, i
+        self.predecessors: list[int] = task_predecessors(state.tasks)
+
+        self.null_players: set[Player] = set()
+        self.assigned_tricks: dict[int, Player] = {}
+        self.forbidden_values: set[int] = set()
+        # The value and number of tricks of each WinTricksWithSpecificValues task.
+        self.winning_values: list[tuple[int, int]] = []
+        signature: list[Any] = []
+        for special_task in state.special_tasks:
+            match special_task:
+                case NullGame():
+                    self.null_players.add(special_task.player)
+                case AssignTrickToPlayer():
+                    self.assigned_tricks[
+                        special_task.trick_number
+                    ] = special_task.player
+                case NoTricksWithValueTask():
+                    self.forbidden_values.add(special_task.forbidden_value)
+                case WinTricksWithSpecificValues():
+                    self.winning_values.append(
+                        (special_task.value, special_task.number)
+                    )
+                case _:
+                    raise NotImplementedError(type(special_task).__name__)
+            signature.append((type(special_task).__name__, vars(special_task)))
+
+        # Identifies the rules and tasks of positions in the shared cache.
+        self.signature: Hashable = repr(
+            (
+                parameters,
+                self.number_of_tricks,
+                [
+                    (t.card, t.player, t.order_constraint, t.relative_constraint)
+                    for t in state.tasks
+                ],
+                signature,
+            )
+        )
+
+    def initial_position(self) -> EndgamePosition:
+        hands: tuple[int, ...] = tuple(card_mask(hand) for hand in self.hands)
+        return EndgamePosition(
+            hands,
+            first_starting_player(
+                self.parameters, list(hands), self.state.active_player
+            ),
+            1,
+            0,
+            (0,) * len(self.winning_values),
+        )
+
+    def play_trick(
+        self,
+        position: EndgamePosition,
+        cards: list[Card],
+        starting_player: Player | None = None,
+    ) -> EndgamePosition | None:
+        """The position after a trick of cards indexed by player, or None if the
+        trick breaks a rule or a task."""
+        leader: Player | None = position.leader or starting_player
+        if leader is None or starting_player not in (None, leader):
+            return None
+        codes: list[int | None] = [
+            encode_card(card) if card is not None else None for card in cards
+        ]
+        for tricks in self._tricks(position, leader, codes):
+            return self._after_trick(position, leader, tricks)
+        return None
+
+    def solvable(self, position: EndgamePosition) -> bool:
+        """Whether the game can be played to completion from position."""
+        remaining: int = self.number_of_tricks - position.trick_number + 1
+        if any(
+            won + remaining < number
+            for won, (_, number) in zip(position.won, self.winning_values)
+        ):
+            return False
+        if not remaining:
+            return position.completed == (1 << len(self.tasks)) - 1
+        key: Hashable = (
+            self.signature,
+            position.hands,
+            position.leader,
+            position.completed,
+            position.won,
+        )
+        result: bool | None = self.cache.get(key)
+        if result is None:
+            result = any(
+                next_position is not None and self.solvable(next_position)
+                for next_position in self._next_positions(position)
+            )
+            self.cache.put(key, result)
+        return result
+
+    def solution(self, position: EndgamePosition) -> list[CrewGameTrick] | None:
+        """The remaining tricks of a way to play the game to completion from
+        position, or None if there is none."""
+        tricks: list[CrewGameTrick] = []
+        while position.trick_number <= self.number_of_tricks:
+            for leader in self._leaders(position):
+                for codes in self._tricks(position, leader):
+                    next_position: EndgamePosition | None = self._after_trick(
+                        position, leader, codes
+                    )
+                    if next_position is not None and self.solvable(next_position):
+                        break
+                else:
+                    continue
+                break
+            else:
+                return None
+            tricks.append(
+                CrewGameTrick(
+                    [decode_card(code) for code in codes],
+                    (codes[leader - 1] >> VALUE_BITS) - 1,
+                    leader,
+                    next_position.leader,
+                )
+            )
+            position = next_position
+        return tricks
+
+    def playable_cards(
+        self,
+        position: EndgamePosition,
+        trick: list[Card | None],
+        player: Player,
+        starting_player: Player | None = None,
+    ) -> dict[Card, bool]:
+        """Whether the game can be played to completion if player plays each card
+        of its hand in the trick after position, of which the cards in trick have
+        been played already."""
+        codes: list[int | None] = [
+            encode_card(card) if card is not None else None for card in trick
+        ]
+        leaders: list[Player] = [
+            leader
+            for leader in self._leaders(position)
+            if starting_player in (None, leader)
+        ]
+        result: dict[Card, bool] = {}
+        hand: int = position.hands[player - 1]
+        while hand:
+            bit: int = hand & -hand
+            hand ^= bit
+            code: int = bit.bit_length() - 1
+            codes[player - 1] = code
+            result[decode_card(code)] = any(
+                next_position is not None and self.solvable(next_position)
+                for leader in leaders
+                for next_position in (
+                    self._after_trick(position, leader, trick_codes)
+                    for trick_codes in self._tricks(position, leader, codes)
+                )
+            )
+        return result
+
+    def _leaders(self, position: EndgamePosition) -> list[Player]:
+        if position.leader is not None:
+            return [position.leader]
+        return list(range(1, self.parameters.number_of_players + 1))
+
+    def _next_positions(
+        self, position: EndgamePosition
+    ) -> Iterator[EndgamePosition | None]:
+        for leader in self._leaders(position):
+            for codes in self._tricks(position, leader):
+                yield self._after_trick(position, leader, codes)
+
+    def _tricks(
+        self,
+        position: EndgamePosition,
+        leader: Player,
+        fixed: list[int | None] | None = None,
+    ) -> Iterator[list[int]]:
+        """The legal tricks started by leader, as codes indexed by player. The
+        cards of fixed that aren't None are played by their players."""
+        number_of_players: int = self.parameters.number_of_players
+        codes: list[int] = [0] * number_of_players
+
+        def play(offset: int, lead: int) -> Iterator[list[int]]:
+            if offset == number_of_players:
+                yield codes
+                return
+            player: Player = (leader + offset - 1) % number_of_players + 1
+            hand: int = position.hands[player - 1]
+            legal: int
+            if offset == 0:
+                legal = hand & ~self.trump_cards
+            else:
+                legal = hand & colour_mask((lead >> VALUE_BITS) - 1) or hand
+            if fixed is not None and fixed[player - 1] is not None:
+                legal &= 1 << fixed[player - 1]  # type: ignore
+            while legal:
+                bit: int = legal & -legal
+                legal ^= bit
+                codes[player - 1] = bit.bit_length() - 1
+                yield from play(offset + 1, lead or codes[player - 1])
+
+        yield from play(0, 0)
+
+    def _after_trick(
+        self, position: EndgamePosition, leader: Player, codes: list[int]
+    ) -> EndgamePosition | None:
+        lead: int = codes[leader - 1]
+        ranks: list[int] = [card_rank(code, lead) for code in codes]
+        winner: Player = ranks.index(max(ranks)) + 1
+        if (
+            winner in self.null_players
+            or self.assigned_tricks.get(position.trick_number, winner) != winner
+        ):
+            return None
+        completed: int = position.completed
+        for code, rank in zip(codes, ranks):
+            task: tuple[Player, int] | None = self.tasks.get(code)
+            if task is not None:
+                if task[0] != winner:
+                    return None
+                completed |= 1 << task[1]
+            if (
+                rank >= 0
+                and code >> VALUE_BITS != 0
+                and code & _VALUE in self.forbidden_values
+            ):
+                return None
+        for code in codes:
+            task = self.tasks.get(code)
+            if task is not None and self.predecessors[task[1]] & ~completed:
+                return None
+        won: tuple[int, ...] = position.won
+        winning_card: int = codes[winner - 1]
+        if self.winning_values and winning_card >> VALUE_BITS != 0:
+            won = tuple(
+                count + (winning_card & _VALUE == value)
+                for count, (value, _) in zip(won, self.winning_values)
+            )
+        return EndgamePosition(
+            tuple(hand & ~(1 << code) for hand, code in zip(position.hands, codes)),
+            winner,
+            position.trick_number + 1,
+            completed,
+            won,
+        )
@@ -1,25 +1,36 @@
 import random
+from typing import TYPE_CHECKING
 
-from .crew_game import CrewGame
 from .crew_tasks import (
     AssignTrickToPlayer,
     NullGame,
     SpecialTask,
     WinTricksWithSpecificValues,
 )
-from .crew_types import CardDistribution, Player
+from .crew_types import Card, CardDistribution, Player
 from .crew_utils import (
     DEFAULT_PARAMETERS,
+    DEFAULT_SOLVER_CONFIG,
     FIVE_PLAYER_PARAMETERS,
     THREE_PLAYER_PARAMETERS,
+    TRUMP_COLOUR,
     CrewGameParameters,
     CrewGameState,
+    SolverConfig,
     Task,
     deal_cards,
 )
 
+if TYPE_CHECKING:
+    from .crew_game import CrewGame
 
-def example_game(number: int | None = None) -> CrewGame:
+# The numbers of the example games.
+EXAMPLE_GAME_NUMBERS: tuple[int, ...] = (1, 2, 3, 4, 5, 6, 7, 42)
+
+
+def example_game(
+    number: int | None = None, solver_config: SolverConfig = DEFAULT_SOLVER_CONFIG
+) -> "CrewGame":
     description: str = ""
     hands: CardDistribution
     active_player: Player | None = None
@@ -374,29 +385,80 @@ def example_game(number: int | None = None) -> CrewGame:
                 description = f"There is no example game number {number}."
             description += "Creating random game."
 
-            hands = deal_cards(parameters)
-            task_cards = random.sample([c for h in hands for c in h], 3)
-            tasks = [
-                Task(c, i + 1, order_constraint=i + 1, relative_constraint=True)
-                for i, c in enumerate(task_cards)
-            ]
+            random_state = random_game_state(parameters)
+            assert random_state.hands is not None
+            hands, tasks = random_state.hands, random_state.tasks
 
     if number:
         print(f"Example game #{number}:")
     if description:
         print(description)
 
+    # The solver and z3 are only loaded when a game is built.
+    from .crew_game import CrewGame
+
     return CrewGame(
-        parameters, CrewGameState(hands, active_player, tasks, special_tasks)
+        parameters,
+        CrewGameState(hands, active_player, tasks, special_tasks),
+        solver_config,
+    )
+
+
+def random_game_state(
+    parameters: CrewGameParameters = DEFAULT_PARAMETERS, seed: int | None = None
+) -> CrewGameState:
+    """A random deal with three tasks in relative order. Trump cards are never
+    dealt as tasks. The same seed always gives the same state."""
+    rng: random.Random = random.Random(seed)
+    hands: CardDistribution = deal_cards(parameters, rng)
+    task_cards: list[Card] = rng.sample(
+        [c for h in hands for c in h if c[0] != TRUMP_COLOUR], 3
     )
+    tasks: list[Task] = [
+        Task(
+            c,
+            i % parameters.number_of_players + 1,
+            order_constraint=i + 1,
+            relative_constraint=True,
+        )
+        for i, c in enumerate(task_cards)
+    ]
+    return CrewGameState(hands, tasks=tasks)
+
 
+def random_game(
+    parameters: CrewGameParameters | None = None,
+    seed: int | None = None,
+    solver_config: SolverConfig = DEFAULT_SOLVER_CONFIG,
+) -> "CrewGame":
+    """A random deal with three tasks in relative order. The same seed always gives
+    the same game."""
+    if parameters is None and seed is None:
+        return example_game(solver_config=solver_config)
+    parameters = parameters or DEFAULT_PARAMETERS
+    from .crew_game import CrewGame
 
-def random_game() -> CrewGame:
-    return example_game()
+    return CrewGame(parameters, random_game_state(parameters, seed), solver_config)
+
+
+def mission_26_state(
+    parameters: CrewGameParameters = FIVE_PLAYER_PARAMETERS, seed: int | None = None
+) -> CrewGameState:
+    """A random deal of mission 26. The same seed always gives the same deal, and
+    without a seed the hands are left to the solver."""
+    special_tasks = [WinTricksWithSpecificValues(1, 2)]
+    hands: CardDistribution | None = None
+    if seed is not None:
+        hands = deal_cards(parameters, random.Random(seed))
+    return CrewGameState(hands, special_tasks=special_tasks)
 
 
 def random_game_mission_26(
     parameters: CrewGameParameters = FIVE_PLAYER_PARAMETERS,
-) -> CrewGame:
-    special_tasks = [WinTricksWithSpecificValues(1, 2)]
-    return CrewGame(parameters, CrewGameState(special_tasks=special_tasks))
+    seed: int | None = None,
+    solver_config: SolverConfig = DEFAULT_SOLVER_CONFIG,
+) -> "CrewGame":
+    """A random deal of mission 26. The same seed always gives the same deal."""
+    from .crew_game import CrewGame
+
+    return CrewGame(parameters, mission_26_state(parameters, seed), solver_config)
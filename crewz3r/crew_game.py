@@ -1,29 +1,59 @@
 import random
+import threading
+import time
+from collections.abc import Collection, Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any
 
 from z3 import (
     And,
     ArithRef,
+    AtLeast,
+    Bool,
+    BoolRef,
+    BoolVal,
     CheckSatResult,
     Distinct,
     Implies,
     Int,
     IntVector,
     ModelRef,
+    Not,
     Or,
     Solver,
+    Tactic,
+    Then,
     sat,
+    unknown,
+    unsat,
+)
+from z3.z3consts import Z3_INT_SORT, Z3_NUMERAL_AST
+from z3.z3core import (
+    Z3_get_app_decl,
+    Z3_get_ast_kind,
+    Z3_get_decl_name,
+    Z3_get_numeral_string,
+    Z3_get_sort,
+    Z3_get_sort_kind,
+    Z3_get_symbol_string,
+    Z3_model_get_const_decl,
+    Z3_model_get_const_interp,
+    Z3_model_get_num_consts,
 )
 
+from .crew_endgame import ENDGAME_TRICKS, EndgamePosition, EndgameSearch
 from .crew_tasks import (
     AssignTrickToPlayer,
     NoTricksWithValueTask,
     NullGame,
+    SpecialTask,
     Task,
     WinTricksWithSpecificValues,
 )
-from .crew_types import Card, CardDistribution, Colour, Player
+from .crew_types import Card, CardDistribution, Player
 from .crew_utils import (
     DEFAULT_PARAMETERS,
+    DEFAULT_SOLVER_CONFIG,
     FIVE_PLAYER_PARAMETERS,
     FOUR_PLAYER_PARAMETERS,
     THREE_PLAYER_PARAMETERS,
@@ -31,15 +61,47 @@ from .crew_utils import (
     CrewGameParameters,
     CrewGameSolution,
     CrewGameState,
+    CrewGameStatistics,
     CrewGameTrick,
+    SolverConfig,
     deal_cards,
     no_card_duplicates,
 )
 
+# The fields of a CrewGameTrick that can be extracted from a solver model.
+SOLUTION_FIELDS: tuple[str, ...] = (
+    "played_cards",
+    "active_colour",
+    "starting_player",
+    "winning_player",
+)
+
+# The rule families of the constraints of a game, in the order they are added.
+RULE_FAMILIES: tuple[str, ...] = (
+    "distinct_cards",
+    "first_player",
+    "domains",
+    "hands",
+    "next_starting_player",
+    "active_colour",
+    "trump_winner",
+    "colour_winner",
+    "follow_suit",
+    "tasks",
+    "task_order",
+    "special_tasks",
+)
+
+# The default timeout of z3, which means no limit, in milliseconds.
+_NO_TIMEOUT: int = 4294967295
+
 
 class CrewGameBase:
     def __init__(
-        self, parameters: CrewGameParameters, initial_state: CrewGameState
+        self,
+        parameters: CrewGameParameters,
+        initial_state: CrewGameState,
+        solver_config: SolverConfig = DEFAULT_SOLVER_CONFIG,
     ) -> None:
 
         if parameters.number_of_players < 2:
@@ -53,6 +115,7 @@ class CrewGameBase:
 
         self.parameters: CrewGameParameters = parameters
         self.initial_state: CrewGameState = initial_state
+        self.solver_config: SolverConfig = solver_config
 
         # Rules for the game and the game setup.
         self.rules: dict[str, bool] = {
@@ -70,6 +133,31 @@ class CrewGameBase:
         # The solver result.
         self.check_result: CheckSatResult | None = None
 
+        # Why the solver returned unknown, e.g. "timeout" or "canceled".
+        self.reason_unknown: str | None = None
+
+        # Guards the state of a running check against interrupts from other threads.
+        self._check_lock: threading.Lock = threading.Lock()
+        self._checking: bool = False
+        self._interrupted: bool = False
+
+        # The tricks observed during live play, indexed by player. Each observed
+        # trick is asserted in its own solver scope.
+        self.observed_tricks: list[list[Card | None]] = []
+        # The starting players given with the observed tricks.
+        self.observed_starting_players: list[Player | None] = []
+
+        # From this number of remaining tricks on, playable_cards uses the
+        # memoised endgame search instead of the solver, if all tasks have been
+        # added from the initial state.
+        self.endgame_tricks: int = ENDGAME_TRICKS
+        self._tasks_from_state: bool = False
+
+        # Boolean literals that are true iff a player plays a card in a trick, keyed
+        # by (trick index, player index, card). Each literal is stored together with
+        # the solver scope level on which its definition was asserted.
+        self._play_literals: dict[tuple[int, int, Card], tuple[BoolRef, int]] = {}
+
         self.player_hands: CardDistribution
         if initial_state.hands:
             self.player_hands = initial_state.hands
@@ -91,7 +179,15 @@ class CrewGameBase:
         if not no_card_duplicates(self.player_hands):
             raise ValueError("Duplicate cards.")
 
-        self._init_solver_setup()
+        # Timings, assertion counts and solver statistics of this game.
+        self.statistics: CrewGameStatistics = CrewGameStatistics()
+
+        # The constraints of each rule family, to attribute the solver effort to
+        # the rules with crew_profile.
+        self.rule_constraints: dict[str, list[BoolRef]] = {}
+
+        with self._phase("rules"):
+            self._init_solver_setup()
         self._init_tasks_setup()
 
     def _init_solver_setup(self) -> None:
@@ -117,17 +213,18 @@ class CrewGameBase:
             Int(f"w_{i}") for i in range(1, self.NUMBER_OF_TRICKS + 1)
         ]
 
-        self.solver: Solver = Solver()
+        self.solver: Solver = self._create_solver()
 
         # Each card may occur only once.
-        self.solver.add(
+        self._add(
+            "distinct_cards",
             Distinct(
                 *[
                     card[0] * self.parameters.max_card_value + card[1]
                     for trick in self.cards
                     for card in trick
                 ]
-            )
+            ),
         )
 
         # The player with the highest trump card starts the first trick.
@@ -136,16 +233,18 @@ class CrewGameBase:
             and self.rules["highest_trump_starts_first_trick"]
         ):
             for i in range(self.parameters.number_of_players):
-                self.solver.add(
+                self._add(
+                    "first_player",
                     Implies(
                         (TRUMP_COLOUR, self.parameters.max_trump_value)
                         in self.player_hands[i],
                         self.starting_players[0] == i + 1,
-                    )
+                    ),
                 )
         elif self.initial_state.active_player:
-            self.solver.add(
-                self.starting_players[0] == self.initial_state.active_player
+            self._add(
+                "first_player",
+                self.starting_players[0] == self.initial_state.active_player,
             )
 
         for j in range(self.NUMBER_OF_TRICKS):
@@ -153,17 +252,16 @@ class CrewGameBase:
             starting_player: ArithRef = self.starting_players[j]
             active_colour: ArithRef = self.active_colours[j]
             trick_winner: ArithRef = self.trick_winners[j]
-            s: Solver = self.solver
 
             # Only valid player indices may be used.
-            s.add(0 < trick_winner)
-            s.add(trick_winner <= self.parameters.number_of_players)
-            s.add(0 < starting_player)
-            s.add(starting_player <= self.parameters.number_of_players)
+            self._add("domains", 0 < trick_winner)
+            self._add("domains", trick_winner <= self.parameters.number_of_players)
+            self._add("domains", 0 < starting_player)
+            self._add("domains", starting_player <= self.parameters.number_of_players)
 
             # Only valid colour indices may be used.
-            s.add(0 <= active_colour)
-            s.add(active_colour < self.parameters.number_of_colours)
+            self._add("domains", 0 <= active_colour)
+            self._add("domains", active_colour < self.parameters.number_of_colours)
 
             for i in range(self.parameters.number_of_players):
 
@@ -172,48 +270,55 @@ class CrewGameBase:
                 player: Player = i + 1
 
                 # Only valid colour indices may be used.
-                s.add(-1 <= colour)
-                s.add(colour < self.parameters.number_of_colours)
+                self._add("domains", -1 <= colour)
+                self._add("domains", colour < self.parameters.number_of_colours)
 
                 # Only valid card values may be used.
-                s.add(0 < value)
-                s.add(value <= self.parameters.max_card_value)
+                self._add("domains", 0 < value)
+                self._add("domains", value <= self.parameters.max_card_value)
 
                 # Only valid trump card values may be used.
-                s.add(
+                self._add(
+                    "domains",
                     Implies(
                         colour == TRUMP_COLOUR,
                         value <= self.parameters.max_trump_value,
-                    )
+                    ),
                 )
 
                 # Players may only play cards that they hold.
-                s.add(
+                self._add(
+                    "hands",
                     Or(
                         [
                             And(colour == c[0], value == c[1])
                             for c in self.player_hands[i]
                         ]
-                    )
+                    ),
                 )
 
                 # If a player wins a trick, that player is the starting player in the
                 # next trick.
                 if j + 1 != self.NUMBER_OF_TRICKS:
-                    s.add(
+                    self._add(
+                        "next_starting_player",
                         Implies(
                             trick_winner == player,
                             self.starting_players[j + 1] == player,
-                        )
+                        ),
                     )
 
                 # The colour played by the starting player is the active colour.
-                s.add(Implies(starting_player == player, active_colour == colour))
+                self._add(
+                    "active_colour",
+                    Implies(starting_player == player, active_colour == colour),
+                )
 
                 # Case 1: The player has played a trump card. If the player's card is
                 # the highest trump card in the trick, that player has won the trick.
                 if self.rules["use_trump_cards"]:
-                    s.add(
+                    self._add(
+                        "trump_winner",
                         Implies(
                             And(
                                 colour == TRUMP_COLOUR,
@@ -231,14 +336,15 @@ class CrewGameBase:
                                 ),
                             ),
                             trick_winner == player,
-                        )
+                        ),
                     )
 
                 # Case 2: The player has not played a trump card and no trump card is
                 # present in the trick. If the player's card is of the active colour
                 # and higher than all other cards of the active colour in the trick,
                 # that player has won the trick.
-                s.add(
+                self._add(
+                    "colour_winner",
                     Implies(
                         And(
                             colour == active_colour,
@@ -257,12 +363,13 @@ class CrewGameBase:
                             ),
                         ),
                         trick_winner == player,
-                    )
+                    ),
                 )
 
                 # If a player holds a card of the active colour, that player may only
                 # play a card of that colour.
-                s.add(
+                self._add(
+                    "follow_suit",
                     Implies(
                         Or(
                             [
@@ -271,12 +378,33 @@ class CrewGameBase:
                             ]
                         ),
                         colour == active_colour,
-                    )
+                    ),
                 )
 
+    def _create_solver(self) -> Solver:
+        solver: Solver
+        if self.solver_config.tactic:
+            tactics: list[Tactic] = [
+                Tactic(name) for name in self.solver_config.tactic.split("+")
+            ]
+            tactic: Tactic = Then(*tactics) if len(tactics) > 1 else tactics[0]
+            solver = tactic.solver()
+        else:
+            solver = Solver()
+        for name, value in self.solver_config.params.items():
+            solver.set(name, value)
+        return solver
+
     def _init_tasks_setup(self) -> None:
         self.task_cards: list[Card] = []
         self.tasks: list[list[ArithRef]] = []
+        # Per-trick indicators of the counting special tasks.
+        self.trick_indicators: list[list[BoolRef]] = []
+        # The earliest completion of the unordered tasks, for each absolute task
+        # order.
+        self.unordered_task_bounds: list[ArithRef] = []
+        # Assumptions enabling the tasks added with add_guarded_task.
+        self.task_guards: list[BoolRef] = []
 
     def _valid_card(self, card: Card) -> bool:
         if card[0] == TRUMP_COLOUR:
@@ -285,36 +413,356 @@ class CrewGameBase:
             return 0 < card[1] <= self.parameters.max_card_value  # type: ignore
         return False
 
-    def solve(self) -> None:
-        self.check_result = self.solver.check()
+    def solve(
+        self, timeout: float | None = None, rlimit: int | None = None
+    ) -> CheckSatResult:
+        """Check whether the game has a solution, within an optional budget of
+        seconds or z3 resource units.
+
+        Returns unknown if the budget is exhausted or the check is interrupted.
+        The constraints and learned lemmas are kept, so solve can be called again
+        with a larger budget to resume."""
+        with self._phase("check"):
+            self.check_result = self.check(timeout=timeout, rlimit=rlimit)
         self.is_solved = True
+        self.reason_unknown = (
+            self.solver.reason_unknown() if self.check_result == unknown else None
+        )
+        z3_statistics = self.solver.statistics()
+        self.statistics.solver = {
+            key: z3_statistics.get_key_value(key) for key in z3_statistics.keys()
+        }
+        return self.check_result
+
+    def check(
+        self,
+        *assumptions: BoolRef,
+        timeout: float | None = None,
+        rlimit: int | None = None,
+    ) -> CheckSatResult:
+        """Check the constraints under assumptions, within an optional budget.
+
+        Unlike solve, the result of the game is not changed. Without a budget, the
+        limits of the solver configuration apply."""
+        with self._check_lock:
+            if self._interrupted:
+                # The check after an interrupted check sometimes returns unsat for
+                # a satisfiable problem. Opening and closing a scope resets the
+                # state that the interrupt left behind.
+                self._interrupted = False
+                self.solver.push()
+                self.solver.pop()
+            if timeout is not None:
+                self.solver.set("timeout", max(1, int(timeout * 1000)))
+            if rlimit is not None:
+                self.solver.set("rlimit", rlimit)
+            self._checking = True
+        try:
+            return self.solver.check(*assumptions)
+        finally:
+            with self._check_lock:
+                self._checking = False
+                params: dict[str, Any] = self.solver_config.params
+                if timeout is not None:
+                    self.solver.set("timeout", params.get("timeout", _NO_TIMEOUT))
+                if rlimit is not None:
+                    self.solver.set("rlimit", params.get("rlimit", 0))
+
+    def interrupt(self) -> bool:
+        """Stop the running check of this game, which then returns unknown. May be
+        called from any thread. Returns whether a check was running.
+
+        Only the solver of this game is interrupted, and an interrupt that reaches
+        z3 after the check has returned is ignored."""
+        with self._check_lock:
+            if not self._checking:
+                return False
+            self.solver.interrupt()
+            self._interrupted = True
+            return True
+
+    def _add(self, family: str, *constraints: BoolRef | list[BoolRef]) -> None:
+        """Assert constraints of a rule family of RULE_FAMILIES."""
+        # Comparisons with non-z3 values may yield Python bools.
+        flat: list[BoolRef] = [
+            BoolVal(c) if isinstance(c, bool) else c
+            for constraint in constraints
+            for c in (constraint if isinstance(constraint, list) else [constraint])
+        ]
+        self.rule_constraints.setdefault(family, []).extend(flat)
+        self.statistics.assertions[family] = len(self.rule_constraints[family])
+        self.solver.add(flat)
+
+    @contextmanager
+    def _phase(self, name: str) -> Iterator[None]:
+        """Add the wall time of a block to the time of a phase."""
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.statistics.phase_seconds[name] = (
+                self.statistics.phase_seconds.get(name, 0.0)
+                + time.perf_counter()
+                - start
+            )
 
     def has_solution(self) -> bool | None:
-        return self.check_result == sat if self.is_solved else None
+        """Whether the game has a solution, or None if it hasn't been solved or the
+        solver couldn't decide, see reason_unknown."""
+        if not self.is_solved or self.check_result == unknown:
+            return None
+        return bool(self.check_result == sat)
+
+    def get_solution(
+        self, fields: Collection[str] = SOLUTION_FIELDS
+    ) -> CrewGameSolution:
+        """Extract the tricks of the solution from the solver model.
 
-    def get_solution(self) -> CrewGameSolution:
+        Only the listed fields of CrewGameTrick are read from the model, the
+        others are left as None."""
 
         if not self.is_solved:
             raise ValueError("This game hasn't been solved.")
+        if self.check_result == unknown:
+            raise ValueError(
+                f"The solver couldn't decide this game: {self.reason_unknown}."
+            )
         if not self.has_solution():
             raise ValueError("This game has no solution.")
-
-        tricks: list[CrewGameTrick] = []
+        if not set(fields) <= set(SOLUTION_FIELDS):
+            raise ValueError(f"Invalid solution fields: {fields}.")
 
         m: ModelRef = self.solver.model()
+        values: dict[str, int] = _model_ints(m)
+        ctx: Any = m.ctx.ref()
+
+        def value(variable: ArithRef) -> int:
+            # Variables that were eliminated from the model take any value.
+            name: str = Z3_get_symbol_string(
+                ctx, Z3_get_decl_name(ctx, Z3_get_app_decl(ctx, variable.as_ast()))
+            )
+            return values[name] if name in values else _model_int(m, variable)
+
+        tricks: list[CrewGameTrick] = []
         for j in range(self.NUMBER_OF_TRICKS):
-            ac: Colour = m.evaluate(self.active_colours[j]).as_long()
-            sp: Player = m.evaluate(self.starting_players[j]).as_long()
-            wp: Player = m.evaluate(self.trick_winners[j]).as_long()
-            cards: list[Card] = []
-            for i in range(self.parameters.number_of_players):
-                colour: Colour = m.evaluate(self.cards[j][i][0]).as_long()
-                value: int = m.evaluate(self.cards[j][i][1]).as_long()
-                cards.append((colour, value))
-            tricks.append(CrewGameTrick(cards, ac, sp, wp))
+            trick: CrewGameTrick = CrewGameTrick()
+            if "played_cards" in fields:
+                trick.played_cards = [
+                    (value(colour), value(card_value))
+                    for colour, card_value in self.cards[j]
+                ]
+            if "active_colour" in fields:
+                trick.active_colour = value(self.active_colours[j])
+            if "starting_player" in fields:
+                trick.starting_player = value(self.starting_players[j])
+            if "winning_player" in fields:
+                trick.winning_player = value(self.trick_winners[j])
+            tricks.append(trick)
 
         return CrewGameSolution(self.initial_state, tricks)
 
+    def observe_trick(
+        self,
+        played_cards: Sequence[Card | None],
+        starting_player: Player | None = None,
+    ) -> CheckSatResult:
+        """Fix the next trick to the cards observed at the table and check whether
+        the remaining tricks can still be played such that all tasks are completed.
+
+        played_cards is indexed by player, cards that haven't been played yet are
+        None. If the last observed trick is incomplete, it is replaced by the new
+        observation. The solver and its learned lemmas are reused between calls,
+        a solution for the remaining tricks can be retrieved with get_solution."""
+
+        if len(played_cards) != self.parameters.number_of_players:
+            raise ValueError("Number of cards doesn't match number of players.")
+        if self.observed_tricks and None in self.observed_tricks[-1]:
+            self.retract_trick()
+        if len(self.observed_tricks) == self.NUMBER_OF_TRICKS:
+            raise ValueError("All tricks have already been played.")
+
+        played_before: set[Card] = {
+            c for trick in self.observed_tricks for c in trick if c is not None
+        }
+        for i, card in enumerate(played_cards):
+            if card is None:
+                continue
+            if card not in self.player_hands[i]:
+                raise ValueError(f"Player {i + 1} doesn't hold card {card}.")
+            if card in played_before:
+                raise ValueError(f"Card {card} has already been played.")
+
+        j: int = len(self.observed_tricks)
+        self.solver.push()
+        self.observed_tricks.append(list(played_cards))
+        self.observed_starting_players.append(starting_player)
+        if starting_player is not None:
+            self.solver.add(self.starting_players[j] == starting_player)
+        for i, card in enumerate(played_cards):
+            if card is not None:
+                self.solver.add(self.cards[j][i][0] == card[0])
+                self.solver.add(self.cards[j][i][1] == card[1])
+
+        self.solve()
+        return self.check_result
+
+    def retract_trick(self) -> None:
+        """Remove the last observed trick."""
+        if not self.observed_tricks:
+            raise ValueError("No tricks have been observed.")
+        self.solver.pop()
+        self.observed_tricks.pop()
+        self.observed_starting_players.pop()
+        level: int = self.solver.num_scopes()
+        self._play_literals = {
+            key: (literal, literal_level)
+            for key, (literal, literal_level) in self._play_literals.items()
+            if literal_level <= level
+        }
+        self.is_solved = False
+        self.check_result = None
+
+    def retract_all_tricks(self) -> None:
+        """Remove all observed tricks, restoring the initial game state."""
+        while self.observed_tricks:
+            self.retract_trick()
+
+    def playable_cards(self, player: Player) -> dict[Card, CheckSatResult]:
+        """Determine which cards the given player can play next, such that all tasks
+        can still be completed.
+
+        The next card of a player is played in the first observed trick in which
+        the player hasn't played yet, or in the trick after the observed tricks.
+        All candidates are tested on the same solver: each satisfiable check
+        excludes the card played in its model, until the remaining candidates are
+        shown to be unplayable all at once. The solver result is reset, solve has
+        to be called again before get_solution."""
+
+        if not 0 < player <= self.parameters.number_of_players:
+            raise ValueError("Invalid player.")
+        i: int = player - 1
+        j: int = next(
+            (k for k, trick in enumerate(self.observed_tricks) if trick[i] is None),
+            len(self.observed_tricks),
+        )
+        if j == self.NUMBER_OF_TRICKS:
+            raise ValueError("The player has already played all cards.")
+
+        played: set[Card | None] = {trick[i] for trick in self.observed_tricks[:j]}
+        candidates: list[Card] = [c for c in self.player_hands[i] if c not in played]
+        self.is_solved = False
+        self.check_result = None
+
+        endgame: dict[Card, bool] | None = self._endgame_playable_cards(player, j)
+        if endgame is not None:
+            return {card: sat if endgame[card] else unsat for card in candidates}
+
+        literals: dict[Card, BoolRef] = {
+            card: self._play_literal(j, i, card) for card in candidates
+        }
+
+        results: dict[Card, CheckSatResult] = {}
+        while len(results) < len(candidates):
+            # Exclude all cards that are already known to be playable.
+            check_result: CheckSatResult = self.check(
+                *[Not(literals[card]) for card in results]
+            )
+            if check_result != sat:
+                for card in candidates:
+                    results.setdefault(card, check_result)
+                break
+            m: ModelRef = self.solver.model()
+            colour, value = self.cards[j][i]
+            results[(_model_int(m, colour), _model_int(m, value))] = sat
+
+        self.is_solved = False
+        self.check_result = None
+        return {card: results[card] for card in candidates}
+
+    def _endgame_playable_cards(
+        self, player: Player, trick_index: int
+    ) -> dict[Card, bool] | None:
+        """Answer playable_cards with the endgame search of crew_endgame, if at
+        most endgame_tricks tricks are left and the tasks of the game are known
+        from its initial state. The observed tricks are replayed on the positions
+        of the search, so repeated queries are mostly cache lookups."""
+        if (
+            self.NUMBER_OF_TRICKS - trick_index > self.endgame_tricks
+            or any(None in trick for trick in self.observed_tricks[:trick_index])
+            or not self._tasks_from_state
+            or self.task_guards
+            or len(self.task_cards) != len(self.initial_state.tasks)
+        ):
+            return None
+        search: EndgameSearch = EndgameSearch(self.parameters, self.initial_state)
+        position: EndgamePosition = search.initial_position()
+        for observed, starting_player in zip(
+            self.observed_tricks[:trick_index], self.observed_starting_players
+        ):
+            if position.leader is None and starting_player is None:
+                # Any player may have started the trick.
+                return None
+            played: list[Card] = [card for card in observed if card is not None]
+            next_position: EndgamePosition | None = search.play_trick(
+                position, played, starting_player
+            )
+            if next_position is None:
+                return {card: False for card in self.player_hands[player - 1]}
+            position = next_position
+
+        trick: list[Card | None] = [None] * self.parameters.number_of_players
+        starting_player = None
+        if trick_index < len(self.observed_tricks):
+            trick = self.observed_tricks[trick_index]
+            starting_player = self.observed_starting_players[trick_index]
+        return search.playable_cards(position, trick, player, starting_player)
+
+    def _play_literal(self, trick_index: int, player_index: int, card: Card) -> BoolRef:
+        key: tuple[int, int, Card] = (trick_index, player_index, card)
+        if key not in self._play_literals:
+            literal: BoolRef = Bool(
+                f"play_{trick_index + 1}_{player_index + 1}_{card[0]}_{card[1]}"
+            )
+            colour, value = self.cards[trick_index][player_index]
+            self.solver.add(literal == And(colour == card[0], value == card[1]))
+            self._play_literals[key] = (literal, self.solver.num_scopes())
+        return self._play_literals[key][0]
+
+
+def _check_task_order_constraint_types(tasks: list[Task]) -> None:
+    # All task order constraints must be of the same type.
+    constraint_types: list[bool] = [
+        t.relative_constraint for t in tasks if t.order_constraint
+    ]
+    if not (all(constraint_types) or not any(constraint_types)):
+        raise ValueError("Mixed task order constraint types.")
+
+
+def _model_ints(m: ModelRef) -> dict[str, int]:
+    """The values of the integer constants of a model by name. They are read in a
+    single pass over the model through the C API, which takes about half as long
+    as evaluating each variable in Python."""
+    ctx: Any = m.ctx.ref()
+    model: Any = m.model
+    values: dict[str, int] = {}
+    for i in range(Z3_model_get_num_consts(ctx, model)):
+        decl: Any = Z3_model_get_const_decl(ctx, model, i)
+        value: Any = Z3_model_get_const_interp(ctx, model, decl)
+        if (
+            Z3_get_ast_kind(ctx, value) == Z3_NUMERAL_AST
+            and Z3_get_sort_kind(ctx, Z3_get_sort(ctx, value)) == Z3_INT_SORT
+        ):
+            name: str = Z3_get_symbol_string(ctx, Z3_get_decl_name(ctx, decl))
+            values[name] = int(Z3_get_numeral_string(ctx, value))
+    return values
+
+
+def _model_int(m: ModelRef, variable: ArithRef) -> int:
+    """The value of an integer variable in a model. Variables that don't occur in
+    the model may take any value."""
+    value: int = m.evaluate(variable, model_completion=True).as_long()
+    return value
+
 
 class CrewGame(CrewGameBase):
     """The regular game "The Crew" for 3, 4 or 5 players.
@@ -330,6 +778,7 @@ class CrewGame(CrewGameBase):
         self,
         parameters: CrewGameParameters = DEFAULT_PARAMETERS,
         initial_state: CrewGameState = CrewGameState(),
+        solver_config: SolverConfig = DEFAULT_SOLVER_CONFIG,
     ) -> None:
 
         # Only standard parameters may be used.
@@ -341,20 +790,41 @@ class CrewGame(CrewGameBase):
         if parameters not in expected_parameters:
             raise ValueError("Invalid parameters.")
 
-        # All task order constraints must be of the same type.
-        constraint_types: list[bool] = [
-            t.relative_constraint for t in initial_state.tasks if t.order_constraint
-        ]
-        if not (all(constraint_types) or not any(constraint_types)):
-            raise ValueError("Mixed task order constraint types.")
+        _check_task_order_constraint_types(initial_state.tasks)
+
+        super().__init__(parameters, initial_state, solver_config)
+
+        self._init_game_tasks()
+
+    def set_tasks(
+        self, tasks: list[Task], special_tasks: list[SpecialTask] | None = None
+    ) -> None:
+        """Set the tasks of a game that has been created without any tasks.
+
+        This allows building the rule constraints for the dealt hands before the
+        tasks are known."""
 
-        super().__init__(parameters, initial_state)
+        if self.task_cards or self.trick_indicators or self.initial_state.tasks:
+            raise ValueError("The game already has tasks.")
+        if self.initial_state.special_tasks:
+            raise ValueError("The game already has tasks.")
+        _check_task_order_constraint_types(tasks)
 
+        self.initial_state.tasks = list(tasks)
+        self.initial_state.special_tasks = list(special_tasks or [])
+        self._init_game_tasks()
+
+    def _init_game_tasks(self) -> None:
+        with self._phase("tasks"):
+            self._add_game_tasks()
+        self._tasks_from_state = True
+
+    def _add_game_tasks(self) -> None:
         # Convert the task from a list[Task] to the formulas needed by the solver
         # First: standard task and order constraints
         ordered_tasks: list[Task] = []
         last_task: Task | None = None
-        for task in initial_state.tasks:
+        for task in self.initial_state.tasks:
             self.add_card_task(task.player, task.card)
             if task.order_constraint > 0:
                 ordered_tasks.append(task)
@@ -373,7 +843,7 @@ class CrewGame(CrewGameBase):
         if last_task:
             self.add_task_constraint_absolute_order_last(last_task.card)
         # Second: special tasks:
-        for special_task in initial_state.special_tasks:
+        for special_task in self.initial_state.special_tasks:
             match type(special_task).__name__:
                 case NoTricksWithValueTask.__name__:
                     special_task: NoTricksWithValueTask
@@ -395,7 +865,13 @@ class CrewGame(CrewGameBase):
                 case _:
                     raise NotImplementedError(type(special_task).__name__)
 
-    def add_card_task(self, tasked_player: int, card: Card | None = None) -> None:
+    def add_card_task(
+        self, tasked_player: int, card: Card | None = None, guard: BoolRef | None = None
+    ) -> None:
+        """Add a task, in which tasked_player has to win the trick with card.
+
+        If a guard is given, the task constraints only hold while the guard is
+        true, so the task can be enabled per check with an assumption."""
         task_card: Card
         if card:
             if not self._valid_card(card):
@@ -420,16 +896,18 @@ class CrewGame(CrewGameBase):
         # - the fourth stores the trick in which the task was completed
         new_task: list[ArithRef] = IntVector(f"task_{str(len(self.tasks) + 1)}", 4)
         self.tasks.append(new_task)
-        self.solver.add(new_task[0] == task_card[0])
-        self.solver.add(new_task[1] == task_card[1])
-        self.solver.add(new_task[2] == tasked_player)
-        self.solver.add(0 < new_task[3])
-        self.solver.add(new_task[3] <= self.NUMBER_OF_TRICKS)
+        constraints: list[BoolRef] = [
+            new_task[0] == task_card[0],
+            new_task[1] == task_card[1],
+            new_task[2] == tasked_player,
+            0 < new_task[3],
+            new_task[3] <= self.NUMBER_OF_TRICKS,
+        ]
 
         # If a trick contains the task card, that trick must be won by the
         # tasked player. The task is then completed.
         for j in range(self.NUMBER_OF_TRICKS):
-            self.solver.add(
+            constraints.append(
                 Implies(
                     Or(
                         [
@@ -437,9 +915,30 @@ class CrewGame(CrewGameBase):
                             for c in self.cards[j]
                         ]
                     ),
-                    And(self.trick_winners[j] == tasked_player, new_task[3] == j),
+                    And(self.trick_winners[j] == tasked_player, new_task[3] == j + 1),
                 )
             )
+        if guard is not None:
+            self._add("tasks", Implies(guard, And(constraints)))
+        else:
+            self._add("tasks", constraints)
+
+    def add_guarded_task(self, task: Task) -> BoolRef:
+        """Add a task that only applies while the returned guard is assumed.
+
+        The rule constraints stay loaded, so a growing set of tasks can be checked
+        with check(*guards) without rebuilding the game. Order constraints are not
+        supported, as they relate several tasks to each other."""
+
+        if task.order_constraint != 0:
+            raise ValueError("Guarded tasks can't have an order constraint.")
+        if task.player is None:
+            raise ValueError("Guarded tasks need a tasked player.")
+        guard: BoolRef = Bool(f"task_guard_{len(self.tasks) + 1}")
+        self.add_card_task(task.player, task.card, guard)
+        self.initial_state.tasks.append(task)
+        self.task_guards.append(guard)
+        return guard
 
     # parameter ordered_task: a tuple of task cards in the order, in which
     # they have to be fulfilled has no influence on the other task cards.
@@ -447,13 +946,11 @@ class CrewGame(CrewGameBase):
         assert 1 < len(ordered_tasks) <= len(self.tasks)
         assert all([self._valid_card(card) for card in ordered_tasks])
 
-        for i, o_task in enumerate(ordered_tasks[:-1]):
-            task_index: int = self.task_cards.index(o_task)
-            next_task_card: Card = ordered_tasks[i + 1]
-            next_task_index = self.task_cards.index(next_task_card)
-            # Using the fourth field of a task, which stores the trick in which it is
-            # completed.
-            self.solver.add(self.tasks[task_index][3] <= self.tasks[next_task_index][3])
+        # Using the fourth field of a task, which stores the trick in which it is
+        # completed.
+        completions: list[ArithRef] = self._task_completions(ordered_tasks)
+        for completion, next_completion in zip(completions, completions[1:]):
+            self._add("task_order", completion <= next_completion)
 
     # Parameter ordered_task: a tuple of task cards, in the order in which they have to
     # be completed. All other tasks must be completed after all tasks with an absolute
@@ -464,20 +961,45 @@ class CrewGame(CrewGameBase):
         if not all([self._valid_card(card) for card in ordered_tasks]):
             raise ValueError("Invalid task card.")
 
-        # Absolute order is specified as a set of relative order constraints.
+        # The ordered tasks form a chain, which has to be completed before the
+        # earliest completion of all unordered tasks. This needs a linear number of
+        # constraints instead of constraining each ordered task against each
+        # unordered task.
         if len(ordered_tasks) > 1:
             self.add_task_constraint_relative_order(ordered_tasks)
-        for i, o_task in enumerate(ordered_tasks):
-            for u_task in [u_t for u_t in self.task_cards if u_t not in ordered_tasks]:
-                self.add_task_constraint_relative_order([o_task, u_task])
+        ordered_cards: set[Card] = set(ordered_tasks)
+        unordered_tasks: list[Card] = [
+            card for card in self.task_cards if card not in ordered_cards
+        ]
+        if unordered_tasks:
+            earliest_unordered_completion: ArithRef = Int(
+                f"first_unordered_task_{len(self.unordered_task_bounds) + 1}"
+            )
+            self.unordered_task_bounds.append(earliest_unordered_completion)
+            self._add(
+                "task_order",
+                self._task_completions(ordered_tasks[-1:])[0]
+                <= earliest_unordered_completion,
+            )
+            for completion in self._task_completions(unordered_tasks):
+                self._add("task_order", earliest_unordered_completion <= completion)
 
     def add_task_constraint_absolute_order_last(self, task: Card) -> None:
         if not self._valid_card(task):
             raise ValueError("Invalid task card.")
 
-        # Absolute order is specified as a set of relative order constraints.
-        for u_task in [u_t for u_t in self.task_cards if u_t != task]:
-            self.add_task_constraint_relative_order([u_task, task])
+        last_completion: ArithRef = self._task_completions([task])[0]
+        for completion in self._task_completions(
+            [card for card in self.task_cards if card != task]
+        ):
+            self._add("task_order", completion <= last_completion)
+
+    def _task_completions(self, task_cards: list[Card]) -> list[ArithRef]:
+        """The variables storing the tricks in which the given tasks are completed."""
+        task_indices: dict[Card, int] = {
+            card: i for i, card in enumerate(self.task_cards)
+        }
+        return [self.tasks[task_indices[card]][3] for card in task_cards]
 
     def add_special_task_no_tricks_value(self, forbidden_value: int) -> None:
         if not 0 < forbidden_value <= self.parameters.max_card_value:
@@ -487,42 +1009,52 @@ class CrewGame(CrewGameBase):
         # This implementation only works for the highest value the colours
         for j in range(self.NUMBER_OF_TRICKS):
             for i in range(self.parameters.number_of_players):
-                self.solver.add(
+                self._add(
+                    "special_tasks",
                     Implies(
                         self.cards[j][i][1] == forbidden_value,
                         self.cards[j][i][0] != self.active_colours[j],
-                    )
+                    ),
                 )
 
     def add_special_task_assign_trick(self, player: Player, trick_number: int) -> None:
-        self.solver.add(self.trick_winners[trick_number - 1] == player)
+        self._add("special_tasks", self.trick_winners[trick_number - 1] == player)
 
     def add_special_task_forbid_trick(self, player: Player, trick_number: int) -> None:
-        self.solver.add(self.trick_winners[trick_number - 1] != player)
+        self._add("special_tasks", self.trick_winners[trick_number - 1] != player)
 
     # A number of tricks has to be won with a specific value. Trump cards do not count.
     def add_special_task_tricks_with_specific_value(
         self, value: int, number: int = 1
     ) -> None:
-        # idea: we could use this Int Variable to print task completion markers
-        trick_number_helper_variable = [Int(f"helper_{i}") for i in range(number)]
-        self.solver.add(Distinct(trick_number_helper_variable))
-        self.solver.add(
-            And(
-                [
-                    Or(
-                        [
-                            And(
-                                self.cards[j][k][1] == value,
-                                self.trick_winners[j] == k + 1,
-                                self.cards[j][k][0] != TRUMP_COLOUR,
-                                trick_number_helper_variable[i] == j,
-                            )
-                            for k in range(self.parameters.number_of_players)
-                            for j in range(self.NUMBER_OF_TRICKS)
-                        ]
-                    )
-                    for i in range(number)
-                ]
-            )
+        # idea: we could use the trick indicators to print task completion markers
+        indicators: list[BoolRef] = self._add_trick_indicators(
+            [
+                Or(
+                    [
+                        And(
+                            self.cards[j][k][1] == value,
+                            self.trick_winners[j] == k + 1,
+                            self.cards[j][k][0] != TRUMP_COLOUR,
+                        )
+                        for k in range(self.parameters.number_of_players)
+                    ]
+                )
+                for j in range(self.NUMBER_OF_TRICKS)
+            ]
         )
+        self._add("special_tasks", AtLeast(*indicators, number))
+
+    # Counting special tasks are expressed with one Boolean indicator per trick,
+    # which is true iff the trick fulfills the given condition. The number of
+    # fulfilling tricks can then be constrained with pseudo-Boolean constraints.
+    def _add_trick_indicators(self, conditions: list[BoolRef]) -> list[BoolRef]:
+        assert len(conditions) == self.NUMBER_OF_TRICKS
+        indicators: list[BoolRef] = [
+            Bool(f"special_{len(self.trick_indicators) + 1}_{j}")
+            for j in range(1, self.NUMBER_OF_TRICKS + 1)
+        ]
+        self.trick_indicators.append(indicators)
+        for indicator, condition in zip(indicators, conditions):
+            self._add("special_tasks", indicator == condition)
+        return indicators
@@ -0,0 +1,569 @@
+import json
+import multiprocessing
+import queue
+import threading
+import time
+from enum import Enum, IntEnum, auto
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from typing import TYPE_CHECKING, Any
+
+from .crew_endgame import ENDGAME_CACHE
+from .crew_json import (
+    game_state_from_dict,
+    game_state_to_dict,
+    parameters_from_dict,
+    parameters_to_dict,
+    solution_from_dict,
+    solution_to_dict,
+    task_from_dict,
+    task_to_dict,
+)
+from .crew_playout import find_witness
+from .crew_rules import verify_solution
+from .crew_tasks import Task
+from .crew_types import Card
+from .crew_utils import CrewGameParameters, CrewGameSolution, CrewGameState
+
+if TYPE_CHECKING:
+    from z3 import BoolRef, CheckSatResult
+
+    from .crew_game import CrewGame
+
+# Worker processes are started with "spawn", because forking a process with
+# running server threads is not safe.
+_mp_context = multiprocessing.get_context("spawn")
+
+
+class JobStatus(Enum):
+    QUEUED = auto()
+    BUILDING = auto()
+    SOLVING = auto()
+    FINISHED = auto()
+    FAILED = auto()
+    CANCELLED = auto()
+
+
+# The time in seconds that workers search a solution with playouts, before they
+# build the constraints. Jobs read it when they are created, 0 disables the
+# search.
+WITNESS_TIME_LIMIT: float = 0.1
+
+# The longest round of a task check of a prebuilt game that is still undecided,
+# in seconds.
+MAX_TASK_CHECK_ROUND: float = 16.0
+
+# Job states that can't change anymore.
+FINAL_JOB_STATES: tuple[JobStatus, ...] = (
+    JobStatus.FINISHED,
+    JobStatus.FAILED,
+    JobStatus.CANCELLED,
+)
+
+
+def _solve_worker(
+    connection: Connection,
+    parameters: dict[str, int],
+    state: dict[str, Any],
+    timeout: float | None,
+    witness_time_limit: float,
+    wait_for_tasks: bool = False,
+) -> None:
+    """Entry point of a worker process, which builds and solves a single game.
+
+    Status changes and the result are sent as (message, payload) tuples. If
+    wait_for_tasks is set, the rules for the hands in state are built first, then
+    the worker answers task checks until a ("solve", (state, timeout)) message
+    with the tasks arrives. The time spent building and checking the constraints
+    is sent before the result.
+
+    Before the constraints are built, the worker searches a solution with
+    playouts for witness_time_limit seconds, and sends it if it finds one."""
+    try:
+        connection.send(("status", JobStatus.BUILDING.name))
+        timings: dict[str, float] = {}
+        game_state: CrewGameState = game_state_from_dict(state)
+        if not wait_for_tasks and _send_witness(
+            connection,
+            parameters_from_dict(parameters),
+            game_state,
+            witness_time_limit,
+            timings,
+        ):
+            return
+        start: float = time.perf_counter()
+        # z3 is only loaded by workers that build the constraints.
+        from .crew_game import CrewGame
+
+        game: CrewGame = CrewGame(parameters_from_dict(parameters), game_state)
+        timings["build"] = time.perf_counter() - start
+        if wait_for_tasks:
+            solve_request: tuple[
+                dict[str, Any], float | None
+            ] | None = _serve_task_checks(connection, game)
+            if solve_request is None:
+                # The prebuilt game has been closed.
+                return
+            state, timeout = solve_request
+            game_state = game_state_from_dict(state)
+            if _send_witness(
+                connection, game.parameters, game_state, witness_time_limit, timings
+            ):
+                return
+            start = time.perf_counter()
+            game = _add_final_tasks(game, game_state)
+            timings["build"] += time.perf_counter() - start
+        connection.send(("status", JobStatus.SOLVING.name))
+        start = time.perf_counter()
+        game.solve(timeout)
+        timings["check"] = time.perf_counter() - start
+        connection.send(("timings", timings))
+        connection.send(
+            (
+                "finished",
+                (
+                    str(game.check_result),
+                    solution_to_dict(game.get_solution())
+                    if game.has_solution()
+                    else None,
+                ),
+            )
+        )
+    except Exception as e:
+        connection.send(("failed", repr(e)))
+    finally:
+        connection.close()
+
+
+def _send_witness(
+    connection: Connection,
+    parameters: CrewGameParameters,
+    state: CrewGameState,
+    time_limit: float,
+    timings: dict[str, float],
+) -> bool:
+    """Search a solution with playouts for time_limit seconds and send it. Returns
+    whether one was found."""
+    if time_limit <= 0:
+        return False
+    start: float = time.perf_counter()
+    solution: CrewGameSolution | None = find_witness(
+        parameters, state, time_limit=time_limit
+    )
+    timings["witness"] = time.perf_counter() - start
+    connection.send(("endgame cache", ENDGAME_CACHE.stats()))
+    if solution is None:
+        return False
+    connection.send(("timings", timings))
+    connection.send(("finished", ("sat", solution_to_dict(solution))))
+    return True
+
+
+def _serve_task_checks(
+    connection: Connection, game: "CrewGame"
+) -> tuple[dict[str, Any], float | None] | None:
+    """Answer ("check", (tasks, timeout, check_id)) messages of a prebuilt game
+    until the ("solve", (state, timeout)) message arrives, and return its payload.
+    Returns None if the connection is closed before.
+
+    Each checked task is added to the game once, guarded by an assumption. Order
+    constraints are ignored, so only an unsat result is definite. A check
+    that is still running when the next message arrives is interrupted, and
+    checks that are superseded by a newer message are skipped.
+
+    A check that is undecided after its timeout is answered with unknown, and
+    continues in rounds of twice the time, up to MAX_TASK_CHECK_ROUND seconds,
+    until it is decided or the next message arrives."""
+
+    messages: queue.Queue[tuple[str, Any]] = queue.Queue()
+
+    def receive() -> None:
+        try:
+            while True:
+                message: tuple[str, Any] = connection.recv()
+                game.interrupt()
+                messages.put(message)
+                if message[0] == "solve":
+                    return
+        except (EOFError, OSError):
+            messages.put(("closed", None))
+
+    threading.Thread(target=receive, daemon=True).start()
+
+    guards: dict[tuple[Card, int | None], BoolRef] = {}
+    while True:
+        message, payload = messages.get()
+        if message == "solve":
+            solve: tuple[dict[str, Any], float | None] = payload
+            return solve
+        if message == "closed":
+            return None
+        if not messages.empty():
+            continue
+
+        tasks, timeout, check_id = payload
+        assumptions: list[BoolRef] = []
+        try:
+            for task in map(task_from_dict, tasks):
+                key: tuple[Card, int | None] = (task.card, task.player)
+                if key not in guards:
+                    guards[key] = game.add_guarded_task(Task(task.card, task.player))
+                assumptions.append(guards[key])
+        except ValueError:
+            # A card was taken as task for different players.
+            connection.send(("checked", (check_id, "unknown")))
+            continue
+        rounds: int = 0
+        while True:
+            check_result: CheckSatResult = game.check(*assumptions, timeout=timeout)
+            result: str = str(check_result)
+            rounds += 1
+            if result != "unknown" or rounds == 1:
+                connection.send(("checked", (check_id, result)))
+            if result != "unknown" or not messages.empty():
+                break
+            timeout = min(2 * timeout, MAX_TASK_CHECK_ROUND)
+
+
+def _add_final_tasks(game: "CrewGame", state: CrewGameState) -> "CrewGame":
+    """Add the final tasks to a prebuilt game.
+
+    If all tasks have been checked before, their guards are asserted. Tasks with
+    order constraints or special tasks need a fresh game, unless no task has been
+    added to the prebuilt game yet."""
+
+    if not game.task_guards:
+        game.set_tasks(state.tasks, state.special_tasks)
+        return game
+
+    guards: dict[tuple[Card, int | None], BoolRef] = {
+        (task.card, task.player): guard
+        for task, guard in zip(game.initial_state.tasks, game.task_guards)
+    }
+    if state.special_tasks or any(
+        task.order_constraint != 0 or (task.card, task.player) not in guards
+        for task in state.tasks
+    ):
+        state.hands = game.initial_state.hands
+        state.active_player = game.initial_state.active_player
+        return type(game)(game.parameters, state, game.solver_config)
+
+    game.solver.add([guards[task.card, task.player] for task in state.tasks])
+    game.initial_state.tasks = list(state.tasks)
+    return game
+
+
+class PrebuiltGame:
+    """A worker process that builds the rule constraints of a game as soon as the
+    hands are known, while the tasks are still being chosen.
+
+    Until it is handed over to the SolverJob for the same hands, which then only
+    adds the task constraints before solving, the worker can check whether the
+    tasks chosen so far can still be completed."""
+
+    def __init__(self, parameters: CrewGameParameters, state: CrewGameState) -> None:
+        if state.hands is None:
+            raise ValueError("Hands not specified.")
+        self.parameters: CrewGameParameters = parameters
+        self.state: CrewGameState = CrewGameState(state.hands, state.active_player)
+
+        self.connection: Connection
+        worker_connection: Connection
+        self.connection, worker_connection = _mp_context.Pipe()
+        self.process: BaseProcess = _mp_context.Process(
+            target=_solve_worker,
+            args=(
+                worker_connection,
+                parameters_to_dict(self.parameters),
+                game_state_to_dict(self.state),
+                None,
+                WITNESS_TIME_LIMIT,
+                True,
+            ),
+            daemon=True,
+        )
+        self.process.start()
+        worker_connection.close()
+        # The id of the latest task check.
+        self.check_id: int = 0
+
+    def check_tasks(self, tasks: list[Task], timeout: float) -> int:
+        """Start checking whether the game can be solved with the given tasks. A
+        running check is cancelled. If the check is undecided after timeout
+        seconds, its result is unknown at first, and sat or unsat once the check
+        that continues in the worker has decided it.
+
+        Returns the id of the check."""
+        self.check_id += 1
+        self.connection.send(
+            ("check", ([task_to_dict(t) for t in tasks], timeout, self.check_id))
+        )
+        return self.check_id
+
+    def poll_check(self) -> tuple[int, str] | None:
+        """Return the id and latest result of the latest check without blocking,
+        or None if there is no new result. Results of cancelled checks are
+        dropped."""
+        result: tuple[int, str] | None = None
+        try:
+            while self.connection.poll():
+                message, payload = self.connection.recv()
+                if message == "checked" and payload[0] == self.check_id:
+                    result = payload[0], payload[1]
+        except (EOFError, OSError):
+            pass
+        return result
+
+    def matches(self, parameters: CrewGameParameters, state: CrewGameState) -> bool:
+        return (
+            self.process.is_alive()
+            and parameters == self.parameters
+            and state.hands == self.state.hands
+            and state.active_player == self.state.active_player
+        )
+
+    def close(self) -> None:
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout=1)
+        self.connection.close()
+
+
+class SolverJob:
+    """A game that is solved in a separate worker process.
+
+    Solving doesn't block the calling thread, and the job can be cancelled at any
+    time by terminating the worker. The owner has to call poll regularly to
+    receive status updates and the result."""
+
+    def __init__(
+        self,
+        parameters: CrewGameParameters,
+        state: CrewGameState,
+        timeout: float | None = None,
+        prebuilt: PrebuiltGame | None = None,
+    ) -> None:
+        self.parameters: CrewGameParameters = parameters
+        self.state: CrewGameState = state
+        # The time budget of the solver in seconds, None for no limit.
+        self.timeout: float | None = timeout
+        self.witness_time_limit: float = WITNESS_TIME_LIMIT
+        # A worker that already built the rules for the hands of the game. The job
+        # takes ownership of it.
+        self.prebuilt: PrebuiltGame | None = (
+            prebuilt
+            if prebuilt is not None and prebuilt.matches(parameters, state)
+            else None
+        )
+        if prebuilt is not None and self.prebuilt is None:
+            prebuilt.close()
+        self.status: JobStatus = JobStatus.QUEUED
+
+        # The solver result: "sat", "unsat" or "unknown" if the time budget ran out.
+        self.check_result: str | None = None
+        # The solution as JSON compatible dict, None if the game has no solution.
+        self.result: dict[str, Any] | None = None
+        # The error message of a failed job.
+        self.error: str | None = None
+        # The time the worker spent building and checking the constraints, in
+        # seconds, by phase.
+        self.timings: dict[str, float] = {}
+        # The entries, hits and misses of the endgame cache of the worker.
+        self.endgame_cache: dict[str, int] = {}
+
+        self.start_time: float | None = None
+        self.end_time: float | None = None
+
+        self._process: BaseProcess | None = None
+        self._connection: Connection | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINAL_JOB_STATES
+
+    @property
+    def elapsed(self) -> float:
+        if self.start_time is None:
+            return 0.0
+        return (self.end_time or time.monotonic()) - self.start_time
+
+    def progress(self) -> dict[str, Any]:
+        return {"status": self.status.name, "elapsed": round(self.elapsed, 1)}
+
+    def start(self) -> None:
+        if self.status != JobStatus.QUEUED:
+            raise ValueError(f"Job can't be started in status {self.status.name}.")
+        self.start_time = time.monotonic()
+        self.status = JobStatus.BUILDING
+        if self.prebuilt is not None and self.prebuilt.process.is_alive():
+            self._process = self.prebuilt.process
+            self._connection = self.prebuilt.connection
+            self._connection.send(
+                ("solve", (game_state_to_dict(self.state), self.timeout))
+            )
+            return
+        if self.prebuilt is not None:
+            self.prebuilt.close()
+
+        self._connection, worker_connection = _mp_context.Pipe(duplex=False)
+        self._process = _mp_context.Process(
+            target=_solve_worker,
+            args=(
+                worker_connection,
+                parameters_to_dict(self.parameters),
+                game_state_to_dict(self.state),
+                self.timeout,
+                self.witness_time_limit,
+            ),
+            daemon=True,
+        )
+        self._process.start()
+        worker_connection.close()
+
+    def poll(self) -> bool:
+        """Process all messages from the worker without blocking.
+
+        Returns whether the job is done."""
+        connection: Connection | None = self._connection
+        if self.done or connection is None:
+            return self.done
+        try:
+            while not self.done and connection.poll():
+                message, payload = connection.recv()
+                match message:
+                    case "status":
+                        self.status = JobStatus[payload]
+                    case "timings":
+                        self.timings = payload
+                    case "endgame cache":
+                        self.endgame_cache = payload
+                    case "finished":
+                        self.check_result, self.result = payload
+                        self.error = self._verify_result()
+                        self._finish(
+                            JobStatus.FAILED if self.error else JobStatus.FINISHED
+                        )
+                    case "failed":
+                        self.error = payload
+                        self._finish(JobStatus.FAILED)
+        except EOFError:
+            # The worker exited without sending a result.
+            self.error = "Solver process exited unexpectedly."
+            self._finish(JobStatus.FAILED)
+        return self.done
+
+    def _verify_result(self) -> str | None:
+        """Replay the solution received from the worker on the state of the job,
+        and return why it is invalid, or None."""
+        if self.result is None:
+            return None
+        solution: CrewGameSolution = solution_from_dict(self.result)
+        if self.state.hands is not None:
+            solution.initial_state = self.state
+        violation: str | None = verify_solution(self.parameters, solution)
+        return f"Invalid solution: {violation}" if violation else None
+
+    def cancel(self) -> None:
+        if self.done:
+            return
+        if self.status == JobStatus.QUEUED and self.prebuilt is not None:
+            self.prebuilt.close()
+        if self._process is not None and self._process.is_alive():
+            self._process.terminate()
+        self._finish(JobStatus.CANCELLED)
+
+    def _finish(self, status: JobStatus) -> None:
+        self.status = status
+        self.end_time = time.monotonic()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        if self._process is not None:
+            self._process.join(timeout=1)
+            self._process = None
+
+
+class JobPriority(IntEnum):
+    """Priorities of queued jobs, lower values are started first."""
+
+    QUICK_CHECK = 0
+    NORMAL = 1
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the job queue is full."""
+
+
+def job_key(
+    parameters: CrewGameParameters, state: CrewGameState, timeout: float | None
+) -> str:
+    """A key identifying all jobs that would compute the same result."""
+    return json.dumps(
+        [parameters_to_dict(parameters), game_state_to_dict(state), timeout],
+        sort_keys=True,
+    )
+
+
+class WorkerPool:
+    """Runs solver jobs on a fixed number of worker processes.
+
+    The pool only runs jobs, they are queued, merged and prioritised by the job
+    queue of the server. The owner has to call poll regularly, all methods may be
+    called from different threads."""
+
+    def __init__(self, max_workers: int) -> None:
+        if max_workers < 1:
+            raise ValueError("At least one worker is required.")
+        self.max_workers: int = max_workers
+
+        self._lock: threading.Lock = threading.Lock()
+        self._running: list[SolverJob] = []
+
+    @property
+    def free_workers(self) -> int:
+        return self.max_workers - len(self._running)
+
+    def start(
+        self,
+        parameters: CrewGameParameters,
+        state: CrewGameState,
+        timeout: float | None = None,
+        prebuilt: PrebuiltGame | None = None,
+    ) -> SolverJob:
+        """Start solving a game on a free worker.
+
+        The pool takes ownership of the prebuilt worker, if any."""
+        with self._lock:
+            if len(self._running) >= self.max_workers:
+                if prebuilt is not None:
+                    prebuilt.close()
+                raise ValueError("All workers are busy.")
+            job: SolverJob = SolverJob(parameters, state, timeout, prebuilt)
+            job.start()
+            self._running.append(job)
+            return job
+
+    def cancel(self, job: SolverJob) -> None:
+        with self._lock:
+            job.cancel()
+            if job in self._running:
+                self._running.remove(job)
+
+    def running_jobs(self) -> list[SolverJob]:
+        with self._lock:
+            return list(self._running)
+
+    def poll(self) -> list[SolverJob]:
+        """Update all running jobs.
+
+        Returns the jobs that have finished or failed since the last call."""
+        with self._lock:
+            done: list[SolverJob] = [job for job in self._running if job.poll()]
+            for job in done:
+                self._running.remove(job)
+            return done
+
+    def shutdown(self) -> None:
+        """Cancel all running jobs."""
+        for job in self.running_jobs():
+            self.cancel(job)
@@ -0,0 +1,142 @@
+from typing import Any
+
+from .crew_tasks import (
+    AssignTrickToPlayer,
+    NoTricksWithValueTask,
+    NullGame,
+    SpecialTask,
+    Task,
+    WinTricksWithSpecificValues,
+)
+from .crew_types import Card
+from .crew_utils import (
+    CrewGameParameters,
+    CrewGameSolution,
+    CrewGameState,
+    CrewGameTrick,
+)
+
+# Special task types that can be converted from and to JSON, by class name.
+SPECIAL_TASK_TYPES: dict[str, type[SpecialTask]] = {
+    t.__name__: t
+    for t in (
+        NoTricksWithValueTask,
+        AssignTrickToPlayer,
+        NullGame,
+        WinTricksWithSpecificValues,
+    )
+}
+
+
+def card_from_json(card: list[int]) -> Card:
+    return card[0], card[1]
+
+
+def parameters_to_dict(parameters: CrewGameParameters) -> dict[str, int]:
+    return {
+        "number_of_players": parameters.number_of_players,
+        "number_of_colours": parameters.number_of_colours,
+        "max_card_value": parameters.max_card_value,
+        "max_trump_value": parameters.max_trump_value,
+    }
+
+
+def parameters_from_dict(data: dict[str, int]) -> CrewGameParameters:
+    return CrewGameParameters(
+        data["number_of_players"],
+        data["number_of_colours"],
+        data["max_card_value"],
+        data["max_trump_value"],
+    )
+
+
+def task_to_dict(task: Task) -> dict[str, Any]:
+    return {
+        "card": list(task.card),
+        "player": task.player,
+        "order_constraint": task.order_constraint,
+        "relative_constraint": task.relative_constraint,
+    }
+
+
+def task_from_dict(data: dict[str, Any]) -> Task:
+    return Task(
+        card_from_json(data["card"]),
+        data.get("player"),
+        data.get("order_constraint", 0),
+        data.get("relative_constraint", False),
+    )
+
+
+def special_task_to_dict(task: SpecialTask) -> dict[str, Any]:
+    if type(task).__name__ not in SPECIAL_TASK_TYPES:
+        raise NotImplementedError(type(task).__name__)
+    data: dict[str, Any] = {"type": type(task).__name__}
+    data.update({k: v for k, v in vars(task).items() if k != "description"})
+    return data
+
+
+def special_task_from_dict(data: dict[str, Any]) -> SpecialTask:
+    arguments: dict[str, Any] = dict(data)
+    task_type: str = arguments.pop("type")
+    if task_type not in SPECIAL_TASK_TYPES:
+        raise ValueError(f"Unknown special task type: {task_type!r}.")
+    return SPECIAL_TASK_TYPES[task_type](**arguments)
+
+
+def game_state_to_dict(state: CrewGameState) -> dict[str, Any]:
+    return {
+        "hands": [[list(c) for c in hand] for hand in state.hands]
+        if state.hands
+        else None,
+        "active_player": state.active_player,
+        "tasks": [task_to_dict(t) for t in state.tasks],
+        "special_tasks": [special_task_to_dict(t) for t in state.special_tasks],
+    }
+
+
+def game_state_from_dict(data: dict[str, Any]) -> CrewGameState:
+    return CrewGameState(
+        [[card_from_json(c) for c in hand] for hand in data["hands"]]
+        if data.get("hands")
+        else None,
+        data.get("active_player"),
+        [task_from_dict(t) for t in data.get("tasks", [])],
+        [special_task_from_dict(t) for t in data.get("special_tasks", [])],
+    )
+
+
+def trick_to_dict(trick: CrewGameTrick) -> dict[str, Any]:
+    return {
+        "played_cards": [list(c) for c in trick.played_cards]
+        if trick.played_cards is not None
+        else None,
+        "active_colour": trick.active_colour,
+        "starting_player": trick.starting_player,
+        "winning_player": trick.winning_player,
+    }
+
+
+def trick_from_dict(data: dict[str, Any]) -> CrewGameTrick:
+    return CrewGameTrick(
+        [card_from_json(c) for c in data["played_cards"]]
+        if data.get("played_cards") is not None
+        else None,
+        data.get("active_colour"),
+        data.get("starting_player"),
+        data.get("winning_player"),
+    )
+
+
+def solution_to_dict(solution: CrewGameSolution) -> dict[str, Any]:
+    return {
+        "initial_state": game_state_to_dict(solution.initial_state),
+        "tricks": [trick_to_dict(t) for t in solution.tricks],
+    }
+
+
+def solution_from_dict(data: dict[str, Any]) -> CrewGameSolution:
+    return CrewGameSolution(
+        game_state_from_dict(data["initial_state"]),
+        [trick_from_dict(t) for t in data["tricks"]],
+    )
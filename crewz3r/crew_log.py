@@ -0,0 +1,149 @@
+import json
+import logging
+import sys
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, TextIO
+
+# Attributes of each log record that the event loggers add.
+_ROOM: str = "crewz3r_room"
+_FIELDS: str = "crewz3r_fields"
+
+
+class EventLogger:
+    """Logs events with a message, a room and further fields as JSON values.
+
+    Messages are formatted with %-style arguments, which are only formatted if
+    the event is logged at all, so large states can be passed to debug()
+    without cost at higher levels."""
+
+    def __init__(self, name: str, context: dict[str, Any] | None = None) -> None:
+        self.logger: logging.Logger = logging.getLogger(name)
+        self.context: dict[str, Any] = context or {}
+
+    def bind(self, **context: Any) -> "EventLogger":
+        """Return a logger which adds the given fields, e.g. room, to each event."""
+        return EventLogger(self.logger.name, self.context | context)
+
+    def enabled(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
+
+    def log(self, level: int, message: str, *args: Any, **fields: Any) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        fields = self.context | fields
+        room: str | None = fields.pop("room", None)
+        self.logger.log(
+            level,
+            message,
+            *args,
+            extra={_ROOM: room, _FIELDS: fields},
+            stacklevel=3,
+        )
+
+    def debug(self, message: str, *args: Any, **fields: Any) -> None:
+        self.log(logging.DEBUG, message, *args, **fields)
+
+    def info(self, message: str, *args: Any, **fields: Any) -> None:
+        self.log(logging.INFO, message, *args, **fields)
+
+    def warning(self, message: str, *args: Any, **fields: Any) -> None:
+        self.log(logging.WARNING, message, *args, **fields)
+
+    def error(self, message: str, *args: Any, **fields: Any) -> None:
+        self.log(logging.ERROR, message, *args, **fields)
+
+
+def get_logger(name: str) -> EventLogger:
+    return EventLogger(name)
+
+
+def event_from_record(record: logging.LogRecord) -> dict[str, Any]:
+    """The JSON compatible event of a log record."""
+    event: dict[str, Any] = {
+        "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+        "level": record.levelname,
+        "logger": record.name,
+        "message": record.getMessage(),
+    }
+    room: str | None = getattr(record, _ROOM, None)
+    if room is not None:
+        event["room"] = room
+    event.update(getattr(record, _FIELDS, {}))
+    if record.exc_info:
+        event["exception"] = logging.Formatter().formatException(record.exc_info)
+    return event
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each log record as one line of JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(event_from_record(record), default=str)
+
+
+class RoomEventBuffer(logging.Handler):
+    """Keeps the most recent events of each room in memory, for post-mortems. The
+    events of the rooms that were logged to least recently are dropped first."""
+
+    def __init__(
+        self, capacity: int, max_rooms: int = 1000, level: int = logging.NOTSET
+    ) -> None:
+        super().__init__(level)
+        self.capacity: int = capacity
+        self.max_rooms: int = max_rooms
+        self._events: OrderedDict[str, deque[dict[str, Any]]] = OrderedDict()
+        self._events_lock: threading.Lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        room: str | None = getattr(record, _ROOM, None)
+        if room is None:
+            return
+        # Values are converted right away, since the logged states are mutable.
+        event: dict[str, Any] = json.loads(
+            json.dumps(event_from_record(record), default=str)
+        )
+        with self._events_lock:
+            if room not in self._events:
+                self._events[room] = deque(maxlen=self.capacity)
+                if len(self._events) > self.max_rooms:
+                    self._events.popitem(last=False)
+            self._events.move_to_end(room)
+            self._events[room].append(event)
+
+    def events(self, room: str) -> list[dict[str, Any]]:
+        with self._events_lock:
+            return list(self._events.get(room, ()))
+
+    def clear(self, room: str) -> None:
+        with self._events_lock:
+            self._events.pop(room, None)
+
+
+def configure_logging(
+    level: int | str = logging.INFO,
+    room_buffer: int = 0,
+    buffer_level: int | str = logging.INFO,
+    stream: TextIO = sys.stdout,
+) -> RoomEventBuffer | None:
+    """Log the events of crewz3r as JSON lines to stream. If room_buffer is
+    positive, the last room_buffer events of each room are also kept in memory;
+    the buffer is returned."""
+    logger: logging.Logger = logging.getLogger("crewz3r")
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.propagate = False
+
+    stream_handler: logging.StreamHandler[TextIO] = logging.StreamHandler(stream)
+    stream_handler.setLevel(level)
+    stream_handler.setFormatter(JsonFormatter())
+    logger.addHandler(stream_handler)
+
+    buffer: RoomEventBuffer | None = None
+    if room_buffer > 0:
+        buffer = RoomEventBuffer(room_buffer)
+        buffer.setLevel(buffer_level)
+        logger.addHandler(buffer)
+    logger.setLevel(min(handler.level for handler in logger.handlers))
+    return buffer
@@ -0,0 +1,229 @@
+import bisect
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+# Upper bounds of the default histogram buckets, in seconds.
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    60.0,
+    300.0,
+)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues) -> str:
+    if not names:
+        return ""
+    pairs: str = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """A metric with a value per combination of label values.
+
+    Updating a metric only takes a lock and a dict lookup, so metrics can be
+    collected on hot paths."""
+
+    type_name: str = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labels: tuple[str, ...] = ()
+    ) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labels: tuple[str, ...] = labels
+        self._lock: threading.Lock = threading.Lock()
+
+    def _label_values(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"Expected the labels {self.labels} for {self.name}.")
+        return tuple(str(labels[n]) for n in self.labels)
+
+    def samples(self) -> Iterator[tuple[str, LabelValues, float]]:
+        """The samples of the metric as (name suffix, label values, value)."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines: list[str] = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for suffix, values, value in self.samples():
+            names: tuple[str, ...] = self.labels
+            if suffix == "_bucket":
+                names = self.labels + ("le",)
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(names, values)} "
+                f"{_format_value(value)}"
+            )
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labels: tuple[str, ...] = ()
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key: LabelValues = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._label_values(labels), 0.0)
+
+    def samples(self) -> Iterator[tuple[str, LabelValues, float]]:
+        with self._lock:
+            values: list[tuple[LabelValues, float]] = list(self._values.items())
+        for key, value in values:
+            yield "_total", key, value
+
+
+class Gauge(Metric):
+    """A value that can go up and down. If a function is given, it is called to
+    get the value when the metrics are rendered."""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        function: Callable[[], float] | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.function: Callable[[], float] | None = function
+        self._values: dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key: LabelValues = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> Iterator[tuple[str, LabelValues, float]]:
+        if self.function is not None:
+            yield "", (), self.function()
+            return
+        with self._lock:
+            values: list[tuple[LabelValues, float]] = list(self._values.items())
+        for key, value in values:
+            yield "", key, value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label values: the count of each bucket, the sum and the count.
+        self._values: dict[LabelValues, tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key: LabelValues = self._label_values(labels)
+        index: int = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall time of a block."""
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        return self._values.get(self._label_values(labels), ([], 0.0, 0))[2]
+
+    def samples(self) -> Iterator[tuple[str, LabelValues, float]]:
+        with self._lock:
+            values = [(k, (list(c), t, n)) for k, (c, t, n) in self._values.items()]
+        for key, (counts, total, count) in values:
+            cumulative: int = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", key + (_format_value(bound),), cumulative
+            yield "_sum", key, total
+            yield "_count", key, count
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format."""
+        return "\n".join(m.render() for m in self.metrics.values()) + "\n"
+
+
+# The metrics of this process.
+REGISTRY: MetricsRegistry = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labels: tuple[str, ...] = ()) -> Counter:
+    metric: Counter = Counter(name, documentation, labels)
+    REGISTRY.register(metric)
+    return metric
+
+
+def gauge(
+    name: str, documentation: str, function: Callable[[], float] | None = None
+) -> Gauge:
+    metric: Gauge = Gauge(name, documentation, function=function)
+    REGISTRY.register(metric)
+    return metric
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labels: tuple[str, ...] = (),
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+) -> Histogram:
+    metric: Histogram = Histogram(name, documentation, labels, buckets)
+    REGISTRY.register(metric)
+    return metric
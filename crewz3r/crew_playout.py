@@ -0,0 +1,243 @@
+"""Search for a solution of a game with fast random playouts, without z3.
+
+Each playout plays legal cards on the encoded hands of crew_rules, weighted by
+heuristics: task cards are delayed until the tasks before them are completed,
+the tasked player tries to win a trick with its task card, and the other players
+try not to. Playouts are abandoned as soon as a task or special task fails, and
+a finished playout is only returned if verify_solution accepts it. The last
+tricks are searched exactly with crew_endgame. Many easy games are solved like
+this in a fraction of the time z3 needs to build the constraints."""
+
+import random
+import time
+
+from .crew_endgame import (
+    ENDGAME_CACHE,
+    EndgameCache,
+    EndgamePosition,
+    EndgameSearch,
+)
+from .crew_rules import (
+    VALUE_BITS,
+    card_rank,
+    colour_mask,
+    decode_card,
+    verify_solution,
+)
+from .crew_types import Player
+from .crew_utils import (
+    CrewGameParameters,
+    CrewGameSolution,
+    CrewGameState,
+    CrewGameTrick,
+)
+
+# The default number of playouts of find_witness.
+DEFAULT_PLAYOUTS: int = 1000
+
+# The number of last tricks that playouts search exactly. Searching more tricks
+# solves more games, but allows less playouts per second.
+PLAYOUT_ENDGAME_TRICKS: int = 2
+
+# Factors of the weight of a card, by whether it helps completing the tasks.
+_HELPS: float = 10.0
+_HURTS: float = 0.1
+_BLOCKED: float = 0.01
+
+_VALUE: int = (1 << VALUE_BITS) - 1
+
+
+class Playouts:
+    """Random playouts of a game with tasks and special tasks. The hands, tasks
+    and special tasks are encoded once, so each playout only works on integers."""
+
+    def __init__(
+        self,
+        parameters: CrewGameParameters,
+        state: CrewGameState,
+        rng: random.Random | None = None,
+        endgame_tricks: int = PLAYOUT_ENDGAME_TRICKS,
+        cache: EndgameCache = ENDGAME_CACHE,
+    ) -> None:
+        self.parameters: CrewGameParameters = parameters
+        self.state: CrewGameState = state
+        self.rng: random.Random = rng or random.Random()
+        # The last endgame_tricks tricks are searched exactly. The endgame search
+        # also encodes the tasks and special tasks for the playouts.
+        self.endgame_tricks: int = endgame_tricks
+        self.endgame: EndgameSearch = EndgameSearch(parameters, state, cache)
+        position: EndgamePosition = self.endgame.initial_position()
+        self.hands: list[int] = list(position.hands)
+        self.first_player: Player | None = position.leader
+        self.number_of_tricks: int = self.endgame.number_of_tricks
+        self.trump_cards: int = self.endgame.trump_cards
+        self.tasks: dict[int, tuple[Player, int]] = self.endgame.tasks
+        self.predecessors: list[int] = self.endgame.predecessors
+        self.null_players: set[Player] = self.endgame.null_players
+        self.assigned_tricks: dict[int, Player] = self.endgame.assigned_tricks
+        self.forbidden_values: set[int] = self.endgame.forbidden_values
+        self.winning_values: set[int] = {
+            value for value, _ in self.endgame.winning_values
+        }
+
+    def playout(self, greedy: bool = False) -> CrewGameSolution | None:
+        """Play one game, choosing each card at random by its weight, or the card
+        with the highest weight if greedy. Returns the game if it is a solution."""
+        hands: list[int] = list(self.hands)
+        number_of_players: int = self.parameters.number_of_players
+        leader: Player | None = self.first_player
+        completed: int = 0
+        # The tricks won towards each WinTricksWithSpecificValues task.
+        won: list[int] = [0] * len(self.endgame.winning_values)
+        tricks: list[CrewGameTrick] = []
+
+        for number in range(1, self.number_of_tricks + 1):
+            if self.number_of_tricks - number < self.endgame_tricks:
+                rest: list[CrewGameTrick] | None = self.endgame.solution(
+                    EndgamePosition(tuple(hands), leader, number, completed, tuple(won))
+                )
+                if rest is None:
+                    return None
+                tricks += rest
+                break
+            if leader is None:
+                leader = 1 if greedy else self.rng.randint(1, number_of_players)
+            codes: list[int] = [0] * number_of_players
+            lead: int = 0
+            best: int = -1
+            winner: Player = leader
+            # The players of the task cards in the trick so far.
+            tasked: set[Player] = set()
+            assigned: Player | None = self.assigned_tricks.get(number)
+            for offset in range(number_of_players):
+                player: Player = (leader + offset - 1) % number_of_players + 1
+                hand: int = hands[player - 1]
+                legal: int
+                if offset == 0:
+                    legal = hand & ~self.trump_cards
+                    if not legal:
+                        return None
+                else:
+                    legal = hand & colour_mask((lead >> VALUE_BITS) - 1) or hand
+
+                cards: list[int] = []
+                weights: list[float] = []
+                while legal:
+                    bit: int = legal & -legal
+                    legal ^= bit
+                    code: int = bit.bit_length() - 1
+                    rank: int = card_rank(code, lead if offset else code)
+                    weight: float = 1.0
+                    wins: bool = rank > best
+                    task: tuple[Player, int] | None = self.tasks.get(code)
+                    if task is not None:
+                        if self.predecessors[task[1]] & ~completed:
+                            weight *= _BLOCKED
+                        elif task[0] == player:
+                            weight *= _HELPS if wins else _HURTS
+                        else:
+                            # Cards of other players' tasks are given to them,
+                            # while they win the trick or haven't played yet.
+                            gives: bool = not wins and (
+                                winner == task[0] or not codes[task[0] - 1]
+                            )
+                            weight *= _HELPS if gives else _HURTS
+                    if tasked:
+                        weight *= _HELPS if (player in tasked) == wins else _HURTS
+                    if wins and (
+                        player in self.null_players
+                        or assigned is not None
+                        and assigned != player
+                    ):
+                        weight *= _HURTS
+                    value: int = code & _VALUE
+                    if rank >= 0 and code >> VALUE_BITS != 0:
+                        if value in self.forbidden_values:
+                            weight *= _BLOCKED
+                        if wins and value in self.winning_values:
+                            weight *= _HELPS
+                    if (
+                        wins
+                        and offset
+                        and codes[winner - 1] & _VALUE in (self.winning_values)
+                    ):
+                        weight *= _HURTS
+                    cards.append(code)
+                    weights.append(weight)
+
+                code = self._choose(cards, weights, greedy)
+                hands[player - 1] &= ~(1 << code)
+                codes[player - 1] = code
+                if offset == 0:
+                    lead = code
+                rank = card_rank(code, lead)
+                if rank > best:
+                    best, winner = rank, player
+                task = self.tasks.get(code)
+                if task is not None:
+                    tasked.add(task[0])
+
+            for code in codes:
+                task = self.tasks.get(code)
+                if task is not None:
+                    if task[0] != winner:
+                        return None
+                    completed |= 1 << task[1]
+            for code in codes:
+                task = self.tasks.get(code)
+                if task is not None and self.predecessors[task[1]] & ~completed:
+                    return None
+            if winner in self.null_players or assigned not in (None, winner):
+                return None
+            for k, (value, _) in enumerate(self.endgame.winning_values):
+                if codes[winner - 1] & _VALUE == value and best <= _VALUE:
+                    won[k] += 1
+            tricks.append(
+                CrewGameTrick(
+                    [decode_card(code) for code in codes],
+                    (lead >> VALUE_BITS) - 1,
+                    leader,
+                    winner,
+                )
+            )
+            leader = winner
+
+        solution: CrewGameSolution = CrewGameSolution(self.state, tricks)
+        if verify_solution(self.parameters, solution) is not None:
+            return None
+        return solution
+
+    def _choose(self, cards: list[int], weights: list[float], greedy: bool) -> int:
+        if greedy:
+            return cards[weights.index(max(weights))]
+        threshold: float = self.rng.random() * sum(weights)
+        for code, weight in zip(cards, weights):
+            threshold -= weight
+            if threshold < 0:
+                return code
+        return cards[-1]
+
+
+def find_witness(
+    parameters: CrewGameParameters,
+    state: CrewGameState,
+    playouts: int = DEFAULT_PLAYOUTS,
+    time_limit: float | None = None,
+    seed: int | None = None,
+) -> CrewGameSolution | None:
+    """Search a solution with a greedy playout followed by up to playouts - 1
+    random playouts, and at most time_limit seconds. Returns None if no playout
+    solves the game, which doesn't mean that the game has no solution."""
+    if state.hands is None or any(task.player is None for task in state.tasks):
+        return None
+    search: Playouts = Playouts(parameters, state, random.Random(seed))
+    end: float | None = (
+        time.perf_counter() + time_limit if time_limit is not None else None
+    )
+    for i in range(playouts):
+        solution: CrewGameSolution | None = search.playout(greedy=i == 0)
+        if solution is not None:
+            return solution
+        if end is not None and time.perf_counter() > end:
+            break
+    return None
@@ -1,6 +1,11 @@
 from .crew_tasks import SpecialTask, Task
 from .crew_types import Card, CardDistribution, Colour, Player
-from .crew_utils import CrewGameParameters, CrewGameSolution, CrewGameState
+from .crew_utils import (
+    CrewGameParameters,
+    CrewGameSolution,
+    CrewGameState,
+    CrewGameStatistics,
+)
 
 COLOUR_NAMES = ("R", "G", "B", "Y", "P", "N", "X")
 
@@ -181,12 +186,29 @@ def print_table(
     print()
 
 
+def print_statistics(statistics: CrewGameStatistics) -> None:
+    print("Phases:", end=" ")
+    print(", ".join(f"{p} {t:.3f}s" for p, t in statistics.phase_seconds.items()))
+    print("Assertions:", end=" ")
+    print(", ".join(f"{f} {n}" for f, n in statistics.assertions.items()))
+    if statistics.solver:
+        print("Solver:", end=" ")
+        print(", ".join(f"{k} {v}" for k, v in statistics.solver.items()))
+
+
 def print_solution(solution: CrewGameSolution) -> None:
     task_cards: list[Card] = [
         t.card for t in solution.initial_state.tasks if type(t) == Task
     ]
     table_lines: list[list[str]] = []
     for j, trick in enumerate(solution.tricks):
+        if (
+            trick.played_cards is None
+            or trick.active_colour is None
+            or trick.starting_player is None
+            or trick.winning_player is None
+        ):
+            raise ValueError("Incomplete trick in solution.")
         task_completed: bool = False
         ac: Colour = trick.active_colour
         sp: Player = trick.starting_player
@@ -220,7 +242,7 @@ def print_solution(solution: CrewGameSolution) -> None:
         table_line.append(t)
         table_lines.append(table_line)
 
-    number_of_players = len(solution.tricks[0].played_cards)
+    number_of_players = len(solution.tricks[0].played_cards)  # type: ignore
     headers: list[str] = (
         [table_column_headers["trick_number"]]
         + [table_column_headers["starting_player"]]
@@ -0,0 +1,253 @@
+"""Attribute the solver effort of games to the rule families of their constraints.
+
+Run with `python -m crewz3r.crew_profile --examples 3`, or profile the slowest
+games of a benchmark with `--results results.json --worst 3`."""
+
+import argparse
+import json
+import sys
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from z3 import (
+    Z3_OP_AND,
+    Z3_OP_FALSE,
+    Z3_OP_IMPLIES,
+    Z3_OP_ITE,
+    Z3_OP_NOT,
+    Z3_OP_OR,
+    Z3_OP_PB_AT_LEAST,
+    Z3_OP_PB_AT_MOST,
+    Z3_OP_PB_EQ,
+    Z3_OP_PB_GE,
+    Z3_OP_PB_LE,
+    Z3_OP_TRUE,
+    Z3_OP_XOR,
+    Bool,
+    BoolRef,
+    CheckSatResult,
+    ExprRef,
+    Implies,
+    Solver,
+    is_app,
+    is_bool,
+    is_eq,
+    unsat,
+)
+
+from .crew_benchmark import (
+    DEFAULT_SEED,
+    BenchmarkInstance,
+    benchmark_instances,
+    parse_numbers,
+)
+from .crew_example_games import EXAMPLE_GAME_NUMBERS
+from .crew_game import CrewGameBase
+
+# Operators that combine Boolean formulas. All other Boolean terms are literals.
+_CONNECTIVES: frozenset[int] = frozenset(
+    (
+        Z3_OP_AND,
+        Z3_OP_OR,
+        Z3_OP_NOT,
+        Z3_OP_IMPLIES,
+        Z3_OP_XOR,
+        Z3_OP_ITE,
+        Z3_OP_TRUE,
+        Z3_OP_FALSE,
+        Z3_OP_PB_AT_LEAST,
+        Z3_OP_PB_AT_MOST,
+        Z3_OP_PB_EQ,
+        Z3_OP_PB_GE,
+        Z3_OP_PB_LE,
+    )
+)
+
+
+@dataclass
+class RuleFamilyProfile:
+    """The size of the constraints of a rule family and its share in the result.
+
+    in_core tells whether the family is part of the unsat core of an unsat game.
+    The leave_out fields hold the result and time of the check without the
+    family, if leave-one-out attribution was run."""
+
+    family: str
+    assertions: int
+    ast_nodes: int
+    literals: int
+    in_core: bool | None = None
+    leave_out_result: str | None = None
+    leave_out_seconds: float | None = None
+
+
+@dataclass
+class RuleProfile:
+    result: str
+    check_seconds: float
+    families: list[RuleFamilyProfile] = field(default_factory=list)
+
+
+def constraint_size(constraints: Iterable[ExprRef]) -> tuple[int, int]:
+    """The number of distinct AST nodes and distinct literals of constraints."""
+    seen: set[int] = set()
+    literals: int = 0
+    stack: list[ExprRef] = list(constraints)
+    while stack:
+        expression: ExprRef = stack.pop()
+        if expression.get_id() in seen:
+            continue
+        seen.add(expression.get_id())
+        if is_bool(expression) and is_app(expression):
+            kind: int = expression.decl().kind()
+            boolean_equality: bool = is_eq(expression) and is_bool(expression.arg(0))
+            if kind not in _CONNECTIVES and not boolean_equality:
+                literals += 1
+        if is_app(expression):
+            stack.extend(expression.children())
+    return len(seen), literals
+
+
+def _tracked_solver(
+    game: CrewGameBase, timeout: float | None
+) -> tuple[Solver, dict[str, BoolRef]]:
+    """A solver with the rules of game, where each rule family only holds while
+    its tracking literal is assumed."""
+    solver: Solver = Solver()
+    if timeout is not None:
+        solver.set("timeout", int(timeout * 1000))
+    literals: dict[str, BoolRef] = {}
+    for family, constraints in game.rule_constraints.items():
+        literals[family] = Bool(f"rule_{family}")
+        solver.add([Implies(literals[family], c) for c in constraints])
+    # Guarded tasks only hold while their guard is assumed.
+    solver.add(game.task_guards)
+    return solver, literals
+
+
+def _timed_check(
+    solver: Solver, assumptions: list[BoolRef]
+) -> tuple[CheckSatResult, float]:
+    start: float = time.perf_counter()
+    result: CheckSatResult = solver.check(*assumptions)
+    return result, time.perf_counter() - start
+
+
+def profile_rules(
+    game: CrewGameBase, leave_one_out: bool = False, timeout: float | None = None
+) -> RuleProfile:
+    """Check the rules of a game with a tracking literal per rule family.
+
+    The unsat core of an unsat game names the families that contradict each
+    other. With leave_one_out, the game is checked again without each family on
+    a fresh solver: families that make an unsat game sat are necessary for the
+    contradiction, and families whose removal speeds up the check make the game
+    hard. Constraints added after building the game, e.g. observed tricks, are
+    not included. The families are ranked by whether the result changes without
+    them and the time saved without them, or else by whether they are in the
+    unsat core and their size."""
+    solver, literals = _tracked_solver(game, timeout)
+    result, seconds = _timed_check(solver, list(literals.values()))
+    core: set[str] = (
+        {str(literal) for literal in solver.unsat_core()} if result == unsat else set()
+    )
+
+    profile: RuleProfile = RuleProfile(str(result), seconds)
+    for family, constraints in game.rule_constraints.items():
+        ast_nodes, literal_count = constraint_size(constraints)
+        family_profile: RuleFamilyProfile = RuleFamilyProfile(
+            family, len(constraints), ast_nodes, literal_count
+        )
+        if result == unsat:
+            family_profile.in_core = str(literals[family]) in core
+        if leave_one_out:
+            solver, _ = _tracked_solver(game, timeout)
+            leave_out_result, family_profile.leave_out_seconds = _timed_check(
+                solver, [literal for f, literal in literals.items() if f != family]
+            )
+            family_profile.leave_out_result = str(leave_out_result)
+        profile.families.append(family_profile)
+
+    if leave_one_out:
+        profile.families.sort(
+            key=lambda f: (f.leave_out_result == profile.result, f.leave_out_seconds)
+        )
+    else:
+        profile.families.sort(key=lambda f: (not f.in_core, -f.ast_nodes))
+    return profile
+
+
+def format_profile(profile: RuleProfile) -> str:
+    lines: list[str] = [
+        f"Result: {profile.result} in {profile.check_seconds:.3f}s",
+        f"{'Family':<22} {'Assertions':>10} {'AST nodes':>10} {'Literals':>9} "
+        f"{'Core':>5} {'Without':>8} {'Time':>9}",
+    ]
+    for f in profile.families:
+        in_core: str = "" if f.in_core is None else ("yes" if f.in_core else "no")
+        without: str = f.leave_out_result or ""
+        seconds: str = (
+            f"{f.leave_out_seconds:.3f}s" if f.leave_out_seconds is not None else ""
+        )
+        lines.append(
+            f"{f.family:<22} {f.assertions:>10} {f.ast_nodes:>10} {f.literals:>9} "
+            f"{in_core:>5} {without:>8} {seconds:>9}"
+        )
+    return "\n".join(lines)
+
+
+def worst_instances(results: dict[str, Any], number: int) -> list[BenchmarkInstance]:
+    """The instances of a benchmark report with the slowest checks."""
+    slowest: list[dict[str, Any]] = sorted(
+        results["results"], key=lambda r: r["check_seconds"], reverse=True
+    )
+    return [
+        BenchmarkInstance(r["kind"], r["number"], r["players"])
+        for r in slowest[:number]
+    ]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--examples",
+        type=parse_numbers,
+        default=EXAMPLE_GAME_NUMBERS,
+        help="comma separated numbers of the example games (default: all)",
+    )
+    parser.add_argument(
+        "--random", type=int, default=0, help="number of random mission 26 deals"
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--results", help="profile games of this benchmark report")
+    parser.add_argument(
+        "--worst", type=int, default=3, help="number of slowest games of --results"
+    )
+    parser.add_argument("--leave-one-out", action="store_true")
+    parser.add_argument(
+        "--timeout", type=float, default=60.0, help="timeout of each check in seconds"
+    )
+    arguments = parser.parse_args(argv)
+
+    instances: list[BenchmarkInstance]
+    if arguments.results:
+        with open(arguments.results) as file:
+            instances = worst_instances(json.load(file), arguments.worst)
+    else:
+        instances = benchmark_instances(
+            arguments.examples, arguments.random, arguments.seed
+        )
+    for instance in instances:
+        profile: RuleProfile = profile_rules(
+            instance.create_game(), arguments.leave_one_out, arguments.timeout
+        )
+        print(f"{instance.name}:")
+        print(format_profile(profile), end="\n\n")
+        sys.stdout.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""The rules of the game in plain Python, on a compact representation of the cards.
+
+A card is encoded as the integer (colour + 1) << 4 | value, so trump cards have
+the colour bits 0, and a set of cards, e.g. a hand, as a bitset of card codes.
+The rules follow the solver model of crew_game, so they serve as a cheap oracle
+for its solutions: a trick can't be started with a trump card, and tasks with
+order constraints may be completed in the same trick."""
+
+from collections.abc import Iterable
+
+from .crew_tasks import (
+    AssignTrickToPlayer,
+    NoTricksWithValueTask,
+    NullGame,
+    SpecialTask,
+    Task,
+    WinTricksWithSpecificValues,
+)
+from .crew_types import Card, Player
+from .crew_utils import TRUMP_COLOUR, CrewGameParameters, CrewGameSolution, get_deck
+
+# The number of bits of the value of an encoded card.
+VALUE_BITS: int = 4
+
+# The value bits of an encoded card.
+_VALUE: int = (1 << VALUE_BITS) - 1
+
+# The bits of all cards of one colour, shifted to the colour by colour_mask.
+_COLOUR_CARDS: int = (1 << (1 << VALUE_BITS)) - 1
+
+
+def encode_card(card: Card) -> int:
+    if not 0 < card[1] <= _VALUE or card[0] < TRUMP_COLOUR:
+        raise ValueError(f"Invalid card: ({card[0]}, {card[1]})")
+    return (card[0] + 1) << VALUE_BITS | card[1]
+
+
+def decode_card(code: int) -> Card:
+    return (code >> VALUE_BITS) - 1, code & _VALUE
+
+
+def card_mask(cards: Iterable[Card]) -> int:
+    """The bitset of the codes of cards."""
+    mask: int = 0
+    for card in cards:
+        mask |= 1 << encode_card(card)
+    return mask
+
+
+def colour_mask(colour: int) -> int:
+    """The bitset of all card codes of a colour, TRUMP_COLOUR for trump cards."""
+    return _COLOUR_CARDS << ((colour + 1) << VALUE_BITS)
+
+
+def card_rank(code: int, lead: int) -> int:
+    """The rank of an encoded card in a trick started with the encoded card lead:
+    trump cards rank above the cards of the colour of lead, other cards are -1."""
+    colour: int = code >> VALUE_BITS
+    if colour == 0:
+        return (code & _VALUE) + _VALUE
+    if colour == lead >> VALUE_BITS:
+        return code & _VALUE
+    return -1
+
+
+def trick_winner(codes: list[int], starting_player: Player) -> Player:
+    """The player who wins a trick of encoded cards, indexed by player: the player
+    of the highest trump card, or else of the highest card of the colour of the
+    starting player's card."""
+    lead: int = codes[starting_player - 1]
+    ranks: list[int] = [card_rank(code, lead) for code in codes]
+    return ranks.index(max(ranks)) + 1
+
+
+def first_starting_player(
+    parameters: CrewGameParameters, hand_masks: list[int], active_player: Player | None
+) -> Player | None:
+    """The player starting the first trick: the active player, or else the holder
+    of the highest trump card. None if any player may start."""
+    if active_player:
+        return active_player
+    if parameters.max_trump_value > 0:
+        highest_trump: int = 1 << encode_card(
+            (TRUMP_COLOUR, parameters.max_trump_value)
+        )
+        for i, mask in enumerate(hand_masks):
+            if mask & highest_trump:
+                return i + 1
+    return None
+
+
+def task_predecessors(tasks: list[Task]) -> list[int]:
+    """The bitset of the indices of the tasks that have to be completed before, or
+    in the same trick as each task, as in the solver model."""
+    ordered: list[int] = sorted(
+        (i for i, task in enumerate(tasks) if task.order_constraint > 0),
+        key=lambda i: tasks[i].order_constraint,
+    )
+    predecessors: list[int] = [0] * len(tasks)
+    chain: int = 0
+    for i in ordered:
+        predecessors[i] = chain
+        chain |= 1 << i
+    if ordered and not tasks[ordered[0]].relative_constraint:
+        for i, task in enumerate(tasks):
+            if task.order_constraint <= 0:
+                predecessors[i] |= chain
+    for i, task in enumerate(tasks):
+        if task.order_constraint == -1:
+            predecessors[i] |= ((1 << len(tasks)) - 1) & ~(1 << i)
+    return predecessors
+
+
+def verify_solution(
+    parameters: CrewGameParameters, solution: CrewGameSolution
+) -> str | None:
+    """Replay the tricks of a solution on the hands of its initial state and
+    return the first rule or task that is violated, or None if the solution is
+    valid.
+
+    The active colour, starting and winning player of a trick are compared with
+    the replay unless they are None. Cards that aren't in the deck of the
+    parameters are reported as violations as well."""
+    state = solution.initial_state
+    if state.hands is None:
+        return "The initial state has no hands."
+    number_of_players: int = parameters.number_of_players
+    if len(state.hands) != number_of_players:
+        return "The number of hands doesn't match the number of players."
+    if len(solution.tricks) != len(state.hands[0]):
+        return f"Expected {len(state.hands[0])} tricks, got {len(solution.tricks)}."
+
+    # All cards are checked against the deck before they are encoded.
+    deck: set[Card] = set(get_deck(parameters))
+    for i, hand in enumerate(state.hands):
+        for card in hand:
+            if tuple(card) not in deck:
+                return f"Player {i + 1} holds {card}, which isn't in the deck."
+    for task in state.tasks:
+        if task.player is None:
+            return f"{task} has no player."
+        if tuple(task.card) not in deck:
+            return f"The card of {task} isn't in the deck."
+    for number, trick in enumerate(solution.tricks, 1):
+        if trick.played_cards is None or len(trick.played_cards) != number_of_players:
+            return f"Trick {number} doesn't contain a card of each player."
+        for card in trick.played_cards:
+            if tuple(card) not in deck:
+                return f"{card} in trick {number} isn't in the deck."
+
+    hands: list[int] = [card_mask(hand) for hand in state.hands]
+    task_cards: dict[int, Task] = {encode_card(task.card): task for task in state.tasks}
+    starting_player: Player | None = first_starting_player(
+        parameters, hands, state.active_player
+    )
+    # The trick in which each task card was played, counted from 1.
+    completions: dict[int, int] = {}
+    # The encoded cards, the card of the starting player and the winner of each
+    # replayed trick.
+    played: list[list[int]] = []
+    leads: list[int] = []
+    winners: list[Player] = []
+
+    for number, trick in enumerate(solution.tricks, 1):
+        cards: list[Card] = trick.played_cards or []
+        if trick.starting_player is None:
+            if starting_player is None:
+                return f"The starting player of trick {number} is unknown."
+        elif starting_player is None:
+            starting_player = trick.starting_player
+        elif trick.starting_player != starting_player:
+            return (
+                f"Trick {number} is started by player {trick.starting_player} "
+                f"instead of player {starting_player}."
+            )
+        if not 0 < starting_player <= number_of_players:
+            return f"Invalid starting player of trick {number}: {starting_player}."
+
+        codes: list[int] = []
+        for i, card in enumerate(cards):
+            code: int = encode_card(card)
+            if not hands[i] >> code & 1:
+                return f"Player {i + 1} doesn't hold {card} in trick {number}."
+            hands[i] &= ~(1 << code)
+            codes.append(code)
+
+        lead: int = codes[starting_player - 1]
+        lead_colour: int = (lead >> VALUE_BITS) - 1
+        if lead_colour == TRUMP_COLOUR:
+            return f"Trick {number} is started with a trump card."
+        if trick.active_colour is not None and trick.active_colour != lead_colour:
+            return (
+                f"The active colour of trick {number} is {trick.active_colour} "
+                f"instead of {lead_colour}."
+            )
+        follow: int = colour_mask(lead_colour)
+        for i, code in enumerate(codes):
+            if not follow >> code & 1 and hands[i] & follow:
+                return f"Player {i + 1} doesn't follow suit in trick {number}."
+
+        winner: Player = trick_winner(codes, starting_player)
+        if trick.winning_player is not None and trick.winning_player != winner:
+            return (
+                f"Trick {number} is won by player {winner} instead of player "
+                f"{trick.winning_player}."
+            )
+        for code in codes:
+            if code in task_cards:
+                completions[code] = number
+        played.append(codes)
+        leads.append(lead)
+        winners.append(winner)
+        starting_player = winner
+
+    for code, task in task_cards.items():
+        if code not in completions:
+            return f"{task} isn't completed."
+        if winners[completions[code] - 1] != task.player:
+            return f"{task} isn't completed by the tasked player."
+    order_violation: str | None = _verify_task_order(state.tasks, completions)
+    if order_violation is not None:
+        return order_violation
+    for special_task in state.special_tasks:
+        if not _special_task_fulfilled(special_task, played, leads, winners):
+            return f"Special task not fulfilled: {special_task.description}"
+    return None
+
+
+def _verify_task_order(tasks: list[Task], completions: dict[int, int]) -> str | None:
+    """Check the order constraints as the solver model does: ordered tasks are
+    completed in their order, with an absolute order before all other tasks, and
+    the last task after all other tasks."""
+
+    def completion(task: Task) -> int:
+        return completions[encode_card(task.card)]
+
+    ordered: list[Task] = sorted(
+        (task for task in tasks if task.order_constraint > 0),
+        key=lambda t: t.order_constraint,
+    )
+    for task, next_task in zip(ordered, ordered[1:]):
+        if completion(task) > completion(next_task):
+            return f"{next_task} is completed before {task}."
+    if ordered and not ordered[0].relative_constraint:
+        for task in tasks:
+            if task.order_constraint <= 0 and completion(task) < completion(
+                ordered[-1]
+            ):
+                return f"{task} is completed before {ordered[-1]}."
+    for last in tasks:
+        if last.order_constraint != -1:
+            continue
+        for task in tasks:
+            if completion(task) > completion(last):
+                return f"{task} is completed after {last}."
+    return None
+
+
+def _special_task_fulfilled(
+    special_task: SpecialTask,
+    played: list[list[int]],
+    leads: list[int],
+    winners: list[Player],
+) -> bool:
+    match special_task:
+        case NoTricksWithValueTask():
+            # As in the solver model, no card of the value may be played in the
+            # colour of the trick, which only works for the highest value.
+            return not any(
+                code & _VALUE == special_task.forbidden_value
+                and code >> VALUE_BITS == lead >> VALUE_BITS
+                for codes, lead in zip(played, leads)
+                for code in codes
+            )
+        case AssignTrickToPlayer():
+            return (
+                0 < special_task.trick_number <= len(winners)
+                and winners[special_task.trick_number - 1] == special_task.player
+            )
+        case NullGame():
+            return special_task.player not in winners
+        case WinTricksWithSpecificValues():
+            won: int = 0
+            for codes, winner in zip(played, winners):
+                code: int = codes[winner - 1]
+                if code >> VALUE_BITS != 0 and code & _VALUE == special_task.value:
+                    won += 1
+            return won >= special_task.number
+    raise NotImplementedError(type(special_task).__name__)
@@ -0,0 +1,348 @@
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager
+from typing import Any
+
+# Statuses of a job in the job queue that can't change anymore.
+FINAL_JOB_STATUSES: tuple[str, ...] = ("FINISHED", "FAILED", "CANCELLED")
+
+
+class StateStore(ABC):
+    """The state of the server that is shared between all server processes: the
+    state of each room and the queue of solver jobs.
+
+    Rooms and jobs are stored as JSON compatible dicts, so all values returned
+    are copies. Reads and writes inside a lock block are atomic across threads
+    and processes, all methods may be called from different threads."""
+
+    @abstractmethod
+    def lock(self) -> AbstractContextManager[None]:
+        """Context manager for a block of atomic reads and writes. Locks may be
+        nested."""
+
+    @abstractmethod
+    def get_room(self, name: str) -> dict[str, Any] | None:
+        ...
+
+    @abstractmethod
+    def put_room(self, name: str, data: dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def delete_room(self, name: str) -> None:
+        ...
+
+    @abstractmethod
+    def room_count(self) -> int:
+        ...
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> dict[str, Any] | None:
+        ...
+
+    @abstractmethod
+    def put_job(self, job: dict[str, Any]) -> None:
+        """Add or update a job. A job has at least the fields "id", "key",
+        "priority", "status" and "worker"."""
+
+    @abstractmethod
+    def find_job(self, key: str) -> dict[str, Any] | None:
+        """Return an unfinished job with the given key, if any."""
+
+    @abstractmethod
+    def queued_jobs(self) -> list[dict[str, Any]]:
+        """All queued jobs, by priority and in the order they were added."""
+
+    @abstractmethod
+    def claim_jobs(self, worker: str, limit: int) -> list[dict[str, Any]]:
+        """Take up to limit queued jobs to be run by worker, in queue order. Jobs
+        that are pinned to another worker are skipped."""
+
+    @abstractmethod
+    def assigned_jobs(self) -> list[dict[str, Any]]:
+        """All unfinished jobs that are claimed by or pinned to a worker."""
+
+    @abstractmethod
+    def prune_jobs(self, max_finished: int) -> None:
+        """Delete the oldest finished jobs, until at most max_finished are left."""
+
+
+class MemoryStore(StateStore):
+    """A store for a single server process."""
+
+    def __init__(self) -> None:
+        self._lock: threading.RLock = threading.RLock()
+        self._rooms: dict[str, str] = {}
+        # Jobs in the order they were added.
+        self._jobs: dict[str, str] = {}
+        # The columns of the jobs table of the SQLite store for each job, so the
+        # queue is read without decoding the jobs: the order in which the job was
+        # added, its key, priority, status and worker.
+        self._columns: dict[str, tuple[int, str, int, str, str | None]] = {}
+        self._unfinished: set[str] = set()
+        self._unfinished_by_key: dict[str, str] = {}
+        self._queued: set[str] = set()
+        self._seq: int = 0
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        with self._lock:
+            yield
+
+    def get_room(self, name: str) -> dict[str, Any] | None:
+        with self._lock:
+            data: str | None = self._rooms.get(name)
+        return json.loads(data) if data is not None else None
+
+    def put_room(self, name: str, data: dict[str, Any]) -> None:
+        with self._lock:
+            self._rooms[name] = json.dumps(data)
+
+    def delete_room(self, name: str) -> None:
+        with self._lock:
+            self._rooms.pop(name, None)
+
+    def room_count(self) -> int:
+        return len(self._rooms)
+
+    def get_job(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            data: str | None = self._jobs.get(job_id)
+        return json.loads(data) if data is not None else None
+
+    def put_job(self, job: dict[str, Any]) -> None:
+        job_id: str = job["id"]
+        data: str = json.dumps(job)
+        with self._lock:
+            if job_id in self._columns:
+                seq, key = self._columns[job_id][:2]
+                if self._unfinished_by_key.get(key) == job_id:
+                    del self._unfinished_by_key[key]
+            else:
+                self._seq += 1
+                seq = self._seq
+            self._jobs[job_id] = data
+            self._columns[job_id] = (
+                seq,
+                job["key"],
+                job["priority"],
+                job["status"],
+                job["worker"],
+            )
+            if job["status"] not in FINAL_JOB_STATUSES:
+                self._unfinished.add(job_id)
+                self._unfinished_by_key.setdefault(job["key"], job_id)
+            else:
+                self._unfinished.discard(job_id)
+            if job["status"] == "QUEUED":
+                self._queued.add(job_id)
+            else:
+                self._queued.discard(job_id)
+
+    def find_job(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            job_id: str | None = self._unfinished_by_key.get(key)
+            return self.get_job(job_id) if job_id is not None else None
+
+    def queued_jobs(self) -> list[dict[str, Any]]:
+        with self._lock:
+            data: list[str] = [self._jobs[job_id] for job_id in self._queue()]
+        return [json.loads(job) for job in data]
+
+    def claim_jobs(self, worker: str, limit: int) -> list[dict[str, Any]]:
+        with self._lock:
+            claimed: list[dict[str, Any]] = []
+            for job_id in self._queue():
+                if len(claimed) == limit:
+                    break
+                if self._columns[job_id][4] not in (None, worker):
+                    continue
+                job: dict[str, Any] = json.loads(self._jobs[job_id])
+                job["worker"] = worker
+                job["status"] = "BUILDING"
+                self.put_job(job)
+                claimed.append(job)
+        return claimed
+
+    def assigned_jobs(self) -> list[dict[str, Any]]:
+        with self._lock:
+            data: list[str] = [
+                self._jobs[job_id]
+                for job_id in self._unfinished
+                if self._columns[job_id][4] is not None
+            ]
+        return [json.loads(job) for job in data]
+
+    def prune_jobs(self, max_finished: int) -> None:
+        with self._lock:
+            finished: list[str] = [
+                job_id
+                for job_id, columns in self._columns.items()
+                if columns[3] in FINAL_JOB_STATUSES
+            ]
+            for job_id in finished[: max(0, len(finished) - max_finished)]:
+                del self._jobs[job_id]
+                del self._columns[job_id]
+
+    def _queue(self) -> list[str]:
+        """The ids of the queued jobs, by priority and in the order they were
+        added."""
+        return sorted(
+            self._queued,
+            key=lambda job_id: (self._columns[job_id][2], self._columns[job_id][0]),
+        )
+
+
+class SQLiteStore(StateStore):
+    """A store in an SQLite database, which can be shared by several server
+    processes on the same host."""
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        # Each thread uses its own connection.
+        self._local: threading.local = threading.local()
+        connection: sqlite3.Connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        with self.lock():
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rooms (name TEXT PRIMARY KEY, data TEXT)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE, key TEXT, "
+                "priority INTEGER, status TEXT, worker TEXT, data TEXT)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, priority, seq)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        if not hasattr(self._local, "connection"):
+            self._local.connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            self._local.depth = 0
+        connection: sqlite3.Connection = self._local.connection
+        return connection
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        connection: sqlite3.Connection = self._connection()
+        if self._local.depth == 0:
+            # Take the write lock of the database right away, so the reads in the
+            # block can't be outdated by other processes.
+            connection.execute("BEGIN IMMEDIATE")
+        self._local.depth += 1
+        try:
+            yield
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                connection.execute("ROLLBACK")
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            connection.execute("COMMIT")
+
+    def _query(self, sql: str, *parameters: Any) -> list[tuple[Any, ...]]:
+        return self._connection().execute(sql, parameters).fetchall()
+
+    def get_room(self, name: str) -> dict[str, Any] | None:
+        rows = self._query("SELECT data FROM rooms WHERE name = ?", name)
+        return json.loads(rows[0][0]) if rows else None
+
+    def put_room(self, name: str, data: dict[str, Any]) -> None:
+        self._query(
+            "INSERT OR REPLACE INTO rooms (name, data) VALUES (?, ?)",
+            name,
+            json.dumps(data),
+        )
+
+    def delete_room(self, name: str) -> None:
+        self._query("DELETE FROM rooms WHERE name = ?", name)
+
+    def room_count(self) -> int:
+        count: int = self._query("SELECT COUNT(*) FROM rooms")[0][0]
+        return count
+
+    def get_job(self, job_id: str) -> dict[str, Any] | None:
+        rows = self._query("SELECT data FROM jobs WHERE id = ?", job_id)
+        return json.loads(rows[0][0]) if rows else None
+
+    def put_job(self, job: dict[str, Any]) -> None:
+        with self.lock():
+            values: tuple[Any, ...] = (
+                job["key"],
+                job["priority"],
+                job["status"],
+                job["worker"],
+                json.dumps(job),
+                job["id"],
+            )
+            if self._query("SELECT 1 FROM jobs WHERE id = ?", job["id"]):
+                self._query(
+                    "UPDATE jobs SET key = ?, priority = ?, status = ?, worker = ?, "
+                    "data = ? WHERE id = ?",
+                    *values,
+                )
+            else:
+                self._query(
+                    "INSERT INTO jobs (key, priority, status, worker, data, id) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    *values,
+                )
+
+    def find_job(self, key: str) -> dict[str, Any] | None:
+        rows = self._query(
+            "SELECT data FROM jobs WHERE key = ? AND status NOT IN (?, ?, ?)",
+            key,
+            *FINAL_JOB_STATUSES,
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    def queued_jobs(self) -> list[dict[str, Any]]:
+        rows = self._query(
+            "SELECT data FROM jobs WHERE status = 'QUEUED' ORDER BY priority, seq"
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def claim_jobs(self, worker: str, limit: int) -> list[dict[str, Any]]:
+        with self.lock():
+            claimed: list[dict[str, Any]] = [
+                job
+                for job in self.queued_jobs()
+                if job["worker"] is None or job["worker"] == worker
+            ][:limit]
+            for job in claimed:
+                job["worker"] = worker
+                job["status"] = "BUILDING"
+                self.put_job(job)
+        return claimed
+
+    def assigned_jobs(self) -> list[dict[str, Any]]:
+        rows = self._query(
+            "SELECT data FROM jobs "
+            "WHERE worker IS NOT NULL AND status NOT IN (?, ?, ?)",
+            *FINAL_JOB_STATUSES,
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def prune_jobs(self, max_finished: int) -> None:
+        self._query(
+            "DELETE FROM jobs WHERE seq IN (SELECT seq FROM jobs "
+            "WHERE status IN (?, ?, ?) ORDER BY seq DESC LIMIT -1 OFFSET ?)",
+            *FINAL_JOB_STATUSES,
+            max_finished,
+        )
+
+
+def create_store(url: str) -> StateStore:
+    """Create a store from a URL: "memory" or "sqlite:///<path>"."""
+    if url == "memory":
+        return MemoryStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url.removeprefix("sqlite:///"))
+    raise ValueError(f"Unknown state store: {url!r}.")
@@ -0,0 +1,212 @@
+"""Sweep z3 solver configurations over a corpus of games, by number of players.
+
+Run with `python -m crewz3r.crew_tuning --random 10 --output tuning.json`."""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import statistics
+import sys
+import time
+from typing import Any
+
+from .crew_benchmark import DEFAULT_SEED, BenchmarkInstance, parse_numbers
+from .crew_utils import PLAYER_PARAMETERS, SolverConfig
+
+# The configurations compared by default: the arithmetic solver, phase selection,
+# restart strategy, random seed and tactics preprocessing the constraints.
+CONFIGURATIONS: dict[str, SolverConfig] = {
+    config.name: config
+    for config in (
+        SolverConfig(),
+        SolverConfig("arith_simplex", params={"smt.arith.solver": 2}),
+        SolverConfig("arith_lp", params={"smt.arith.solver": 6}),
+        SolverConfig("phase_false", params={"smt.phase_selection": 0}),
+        SolverConfig("phase_random", params={"smt.phase_selection": 5}),
+        SolverConfig("restart_luby", params={"smt.restart_strategy": 2}),
+        SolverConfig("restart_fixed", params={"smt.restart_strategy": 3}),
+        SolverConfig("seed_1", params={"smt.random_seed": 1}),
+        SolverConfig("seed_2", params={"smt.random_seed": 2}),
+        SolverConfig("preprocess", "simplify+solve-eqs+propagate-values+smt"),
+        SolverConfig("cardinality", "simplify+propagate-values+lia2card+smt"),
+    )
+}
+
+
+def tuning_instances(
+    players: tuple[int, ...] = (3, 4, 5),
+    random_games: int = 5,
+    seed: int = DEFAULT_SEED,
+    examples: tuple[int, ...] = (),
+) -> list[BenchmarkInstance]:
+    return [BenchmarkInstance("example", n) for n in examples] + [
+        BenchmarkInstance("random", seed + i, p)
+        for p in players
+        for i in range(random_games)
+    ]
+
+
+def run_configuration(
+    arguments: tuple[SolverConfig, BenchmarkInstance, float]
+) -> dict[str, Any]:
+    """Solve a game with a solver configuration and return the check time."""
+    config, instance, timeout = arguments
+    game = instance.create_game(config)
+    start: float = time.perf_counter()
+    game.solve(timeout)
+    return {
+        "config": config.name,
+        "instance": instance.name,
+        "players": game.parameters.number_of_players,
+        "result": str(game.check_result),
+        "check_seconds": time.perf_counter() - start,
+    }
+
+
+def sweep(
+    configs: list[SolverConfig],
+    instances: list[BenchmarkInstance],
+    timeout: float,
+    workers: int,
+) -> list[dict[str, Any]]:
+    """Solve each instance with each configuration, in parallel."""
+    runs: list[dict[str, Any]] = []
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers) as pool:
+        for run in pool.imap_unordered(
+            run_configuration,
+            [(c, i, timeout) for i, c in itertools.product(instances, configs)],
+        ):
+            print(
+                f"{run['instance']:<30} {run['config']:<15} {run['result']:<8} "
+                f"{run['check_seconds']:7.3f}s",
+                file=sys.stderr,
+            )
+            runs.append(run)
+    return runs
+
+
+def _percentile_95(times: list[float]) -> float:
+    if len(times) < 2:
+        return times[0]
+    return statistics.quantiles(times, n=20, method="inclusive")[18]
+
+
+def summarize(runs: list[dict[str, Any]]) -> dict[str, Any]:
+    """The median and 95th percentile check time of each configuration and the
+    recommended configuration, by number of players. Runs that timed out count
+    with their time until the timeout. The recommended configuration has the
+    fewest timeouts, then the lowest median and 95th percentile.
+
+    Instances for which configurations found contradicting results are listed
+    as conflicts."""
+    summary: dict[str, Any] = {"players": {}, "conflicts": []}
+    for players in sorted({r["players"] for r in runs}):
+        configs: dict[str, dict[str, Any]] = {}
+        for name in dict.fromkeys(r["config"] for r in runs):
+            selected = [
+                r for r in runs if r["players"] == players and r["config"] == name
+            ]
+            times: list[float] = [r["check_seconds"] for r in selected]
+            configs[name] = {
+                "median": statistics.median(times),
+                "p95": _percentile_95(times),
+                "timeouts": sum(r["result"] == "unknown" for r in selected),
+                "runs": len(selected),
+            }
+        recommended: str = min(
+            configs,
+            key=lambda n: (
+                configs[n]["timeouts"],
+                configs[n]["median"],
+                configs[n]["p95"],
+            ),
+        )
+        summary["players"][str(players)] = {
+            "configs": configs,
+            "recommended": recommended,
+        }
+
+    for instance in dict.fromkeys(r["instance"] for r in runs):
+        results: set[str] = {
+            r["result"]
+            for r in runs
+            if r["instance"] == instance and r["result"] != "unknown"
+        }
+        if len(results) > 1:
+            summary["conflicts"].append(instance)
+    return summary
+
+
+def format_summary(summary: dict[str, Any]) -> str:
+    lines: list[str] = []
+    for players, entry in summary["players"].items():
+        lines.append(f"{players} players, recommended: {entry['recommended']}")
+        lines.append(
+            f"  {'Configuration':<15} {'Median':>9} {'p95':>9} {'Timeouts':>9}"
+        )
+        ranked = sorted(entry["configs"].items(), key=lambda c: c[1]["median"])
+        for name, c in ranked:
+            lines.append(
+                f"  {name:<15} {c['median']:8.3f}s {c['p95']:8.3f}s "
+                f"{c['timeouts']:>4}/{c['runs']:<4}"
+            )
+    for instance in summary["conflicts"]:
+        lines.append(f"Conflicting results for {instance}.")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--players",
+        type=parse_numbers,
+        default=tuple(PLAYER_PARAMETERS),
+        help="comma separated numbers of players (default: 3,4,5)",
+    )
+    parser.add_argument(
+        "--random", type=int, default=5, help="number of random games per players"
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument(
+        "--examples",
+        type=parse_numbers,
+        default=(),
+        help="comma separated numbers of example games to include",
+    )
+    parser.add_argument(
+        "--configs",
+        default=",".join(CONFIGURATIONS),
+        help="comma separated names of the configurations (default: all)",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=30.0, help="solver timeout in seconds"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=max(1, (multiprocessing.cpu_count() or 2) // 2)
+    )
+    parser.add_argument("--output", help="write the runs and summary as JSON")
+    arguments = parser.parse_args(argv)
+
+    configs: list[SolverConfig] = [
+        CONFIGURATIONS[name] for name in arguments.configs.split(",") if name
+    ]
+    runs: list[dict[str, Any]] = sweep(
+        configs,
+        tuning_instances(
+            arguments.players, arguments.random, arguments.seed, arguments.examples
+        ),
+        arguments.timeout,
+        arguments.workers,
+    )
+    summary: dict[str, Any] = summarize(runs)
+    print(format_summary(summary))
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump({"summary": summary, "runs": runs}, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -69,6 +69,13 @@ THREE_PLAYER_PARAMETERS: CrewGameParameters = CrewGameParameters(3, 3, 9, 3)
 FIVE_PLAYER_PARAMETERS: CrewGameParameters = CrewGameParameters(5, 4, 9, 4)
 DEFAULT_PARAMETERS: CrewGameParameters = FOUR_PLAYER_PARAMETERS
 
+# The parameters of the base game, by number of players.
+PLAYER_PARAMETERS: dict[int, CrewGameParameters] = {
+    3: THREE_PLAYER_PARAMETERS,
+    4: FOUR_PLAYER_PARAMETERS,
+    5: FIVE_PLAYER_PARAMETERS,
+}
+
 
 @dataclass
 class CrewGameState:
@@ -85,12 +92,14 @@ class CrewGameState:
 
 @dataclass
 class CrewGameTrick:
-    """A single trick within a game."""
+    """A single trick within a game.
+
+    Fields that were not extracted from a solution are set to None."""
 
-    played_cards: list[Card]
-    active_colour: Colour
-    starting_player: Player
-    winning_player: Player
+    played_cards: list[Card] | None = None
+    active_colour: Colour | None = None
+    starting_player: Player | None = None
+    winning_player: Player | None = None
 
 
 @dataclass
@@ -102,6 +111,38 @@ class CrewGameSolution:
     tricks: list[CrewGameTrick]
 
 
+@dataclass
+class CrewGameStatistics:
+    """Where the effort of building and solving a game goes.
+
+    phase_seconds holds the time spent in each phase: "rules", "tasks" and
+    "check". assertions holds the number of constraints added by each rule
+    family, and solver the z3 statistics of the last check, e.g. conflicts,
+    decisions, memory and time."""
+
+    phase_seconds: dict[str, float] = field(default_factory=dict)
+    assertions: dict[str, int] = field(default_factory=dict)
+    solver: dict[str, int | float] = field(default_factory=dict)
+
+
+@dataclass
+class SolverConfig:
+    """The configuration of the z3 solver of a game.
+
+    tactic is a z3 tactic, or several tactics joined by "+", from which the solver
+    is created, e.g. "simplify+solve-eqs+propagate-values+smt". params are set on
+    the solver, e.g. {"smt.arith.solver": 2, "random_seed": 3}. Solvers created
+    from tactics are meant for solving a game once: they don't keep learned
+    lemmas between checks."""
+
+    name: str = "default"
+    tactic: str | None = None
+    params: dict[str, Any] = field(default_factory=dict)
+
+
+DEFAULT_SOLVER_CONFIG: SolverConfig = SolverConfig()
+
+
 def get_deck_without_trump(parameters: CrewGameParameters) -> list[Card]:
     return [
         (color, value)
@@ -118,7 +159,10 @@ def get_deck(parameters: CrewGameParameters) -> list[Card]:
     ]
 
 
-def deal_cards(parameters: CrewGameParameters) -> CardDistribution:
+def deal_cards(
+    parameters: CrewGameParameters, rng: random.Random | None = None
+) -> CardDistribution:
+    """Deal random hands. Pass a seeded rng to get reproducible deals."""
     number_of_cards: int = (
         parameters.number_of_colours * parameters.max_card_value
         + parameters.max_trump_value
@@ -129,7 +173,9 @@ def deal_cards(parameters: CrewGameParameters) -> CardDistribution:
     remaining_cards: list[Card] = get_deck(parameters)
     hands: list[Hand] = []
     for i in range(parameters.number_of_players):
-        hand: list[Card] = sorted(random.sample(remaining_cards, number_of_tricks))
+        hand: list[Card] = sorted(
+            (rng or random).sample(remaining_cards, number_of_tricks)
+        )
         for card in hand:
             remaining_cards.remove(card)
         hands.append(hand)
@@ -1,11 +1,61 @@
+"""Solve games from the command line.
+
+Batch mode reads games as JSON lines from a file or standard input, or deals them
+for a mission and a range of seeds, and writes one JSON result line per game as
+soon as it is solved:
+
+    python -m crewz3r.main --input games.jsonl --workers 4 --timeout 60
+    python -m crewz3r.main --mission 26 --seeds 1-100 --unordered
+
+A game has the fields of a game state and optionally "id", "parameters" and
+"timeout", as in the solve API of the server. A single game can be printed as
+tables instead with --print, or by its number with --example."""
+
+import argparse
+import json
+import multiprocessing
+import sys
 import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import TYPE_CHECKING, Any, TextIO
+
+from .crew_example_games import example_game, mission_26_state, random_game_state
+from .crew_json import (
+    game_state_from_dict,
+    game_state_to_dict,
+    parameters_from_dict,
+    parameters_to_dict,
+    solution_to_dict,
+)
+from .crew_playout import find_witness
+from .crew_print import print_initial_game_state, print_solution, print_statistics
+from .crew_rules import verify_solution
+from .crew_utils import (
+    DEFAULT_PARAMETERS,
+    PLAYER_PARAMETERS,
+    CrewGameParameters,
+    CrewGameSolution,
+    CrewGameState,
+)
+
+if TYPE_CHECKING:
+    from .crew_game import CrewGame
+
+# The solver backends: playouts followed by z3 for the games they don't solve,
+# only z3, or only playouts, which can't prove that a game has no solution.
+BACKENDS: tuple[str, ...] = ("auto", "z3", "playouts")
+
+# The time in seconds that the auto backend searches with playouts before z3.
+AUTO_PLAYOUT_TIME_LIMIT: float = 0.1
 
-from .crew_example_games import random_game_mission_26
-from .crew_game import CrewGame
-from .crew_print import print_initial_game_state, print_solution
+# The missions that can be dealt by seed, with their default number of players.
+MISSIONS: dict[str, tuple[Callable[[CrewGameParameters, int], CrewGameState], int]] = {
+    "26": (mission_26_state, 5),
+    "random": (random_game_state, 4),
+}
 
 
-def run_game(game: CrewGame) -> None:
+def run_game(game: "CrewGame", show_statistics: bool = False) -> None:
     print_initial_game_state(game.parameters, game.initial_state)
 
     start_time: float = time.time()
@@ -14,37 +64,245 @@ def run_game(game: CrewGame) -> None:
 
     duration: float = time.time() - start_time
     print(f"\nSolving took {int(duration // 60)}m {duration % 60:.1f}s.")
+    if show_statistics:
+        print_statistics(game.statistics)
 
     if game.has_solution():
         print_solution(game.get_solution())
+    elif game.has_solution() is None:
+        print(f"The solver couldn't decide the game: {game.reason_unknown}.")
     else:
         print("No solution exists.")
 
 
-def run_n_random_games(number: int) -> None:
-    games_with_solution = 0
-    for i in range(1, number + 1):
-        game = random_game_mission_26()
-        run_game(game)
-        if game.has_solution():
-            games_with_solution += 1
-        print(f"Intermediate Result: {i}/{number} game solved.")
-        print(f"{games_with_solution} of them had a solution")
+def parse_seeds(text: str) -> tuple[int, ...]:
+    """Parse comma separated seeds and inclusive ranges like 1-100."""
+    seeds: list[int] = []
+    for part in text.split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        seeds.extend(range(int(first), int(last or first) + 1))
+    return tuple(seeds)
+
+
+def mission_games(
+    mission: str, seeds: Iterable[int], players: int | None = None
+) -> Iterator[str]:
+    """The deals of a mission for each seed, as JSON lines."""
+    deal, default_players = MISSIONS[mission]
+    parameters: CrewGameParameters = PLAYER_PARAMETERS[players or default_players]
+    for seed in seeds:
+        game: dict[str, Any] = {
+            "id": f"mission {mission} seed {seed}",
+            "parameters": parameters_to_dict(parameters),
+        }
+        game.update(game_state_to_dict(deal(parameters, seed)))
+        yield json.dumps(game)
+
+
+def read_game(line: str) -> tuple[CrewGameParameters, CrewGameState, dict[str, Any]]:
+    """The parameters and state of a game given as JSON line, and its fields."""
+    data: Any = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("Expected a game state.")
+    parameters: CrewGameParameters = (
+        parameters_from_dict(data["parameters"])
+        if "parameters" in data
+        else DEFAULT_PARAMETERS
+    )
+    return parameters, game_state_from_dict(data), data
+
+
+def solve_game(
+    parameters: CrewGameParameters,
+    state: CrewGameState,
+    backend: str = "auto",
+    timeout: float | None = None,
+) -> dict[str, Any]:
+    """Solve a game with a backend and return the result, the backend that decided
+    it and the solution. A playout that solves the game is returned as sat."""
+    result: dict[str, Any] = {
+        "result": "unknown",
+        "backend": backend,
+        "reason_unknown": None,
+        "solution": None,
+    }
+    start: float = time.perf_counter()
+    if backend in ("auto", "playouts"):
+        solution: CrewGameSolution | None = find_witness(
+            parameters,
+            state,
+            time_limit=AUTO_PLAYOUT_TIME_LIMIT if backend == "auto" else timeout,
+        )
+        if solution is not None:
+            result.update(
+                result="sat", backend="playouts", solution=solution_to_dict(solution)
+            )
+            return result
+        if backend == "playouts":
+            result["reason_unknown"] = "no playout solved the game"
+            return result
+    if timeout is not None:
+        timeout = max(0.0, timeout - (time.perf_counter() - start))
+    # z3 is only loaded for the games that the playouts don't solve.
+    from .crew_game import CrewGame
+
+    game: CrewGame = CrewGame(parameters, state)
+    game.solve(timeout)
+    result.update(
+        result=str(game.check_result),
+        backend="z3",
+        reason_unknown=game.reason_unknown,
+    )
+    if game.has_solution():
+        solution = game.get_solution()
+        violation: str | None = verify_solution(parameters, solution)
+        if violation is not None:
+            raise ValueError(f"Invalid solution: {violation}")
+        result["solution"] = solution_to_dict(solution)
+    return result
+
+
+def solve_line(arguments: tuple[int, str, str, float | None]) -> dict[str, Any]:
+    """Solve the game of a JSON line and return its result line. Invalid games and
+    errors of the solver are reported in the field "error"."""
+    index, line, backend, timeout = arguments
+    result: dict[str, Any] = {"index": index, "id": None}
+    start: float = time.perf_counter()
+    try:
+        parameters, state, data = read_game(line)
+        result["id"] = data.get("id")
+        if data.get("timeout") is not None:
+            timeout = float(data["timeout"])
+        result.update(solve_game(parameters, state, backend, timeout))
+        result["error"] = None
+    except Exception as e:
+        result.update(result=None, error=repr(e))
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def solve_lines(
+    lines: Iterable[str],
+    backend: str = "auto",
+    timeout: float | None = None,
+    workers: int = 1,
+    ordered: bool = True,
+) -> Iterator[dict[str, Any]]:
+    """Solve the games of JSON lines and yield their results as they finish. Blank
+    lines are skipped, and the index of a game counts the other lines from 0.
+
+    With more than one worker the games are solved in parallel processes, and
+    unless ordered, the results are yielded in the order in which they finish."""
+    tasks: Iterator[tuple[int, str, str, float | None]] = (
+        (index, line, backend, timeout)
+        for index, line in enumerate(line for line in lines if line.strip())
+    )
+    if workers <= 1:
+        yield from map(solve_line, tasks)
+        return
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers) as pool:
+        if ordered:
+            yield from pool.imap(solve_line, tasks)
+        else:
+            yield from pool.imap_unordered(solve_line, tasks)
+
+
+def write_results(results: Iterable[dict[str, Any]], file: TextIO) -> int:
+    """Write each result as JSON line and return the number of errors."""
+    errors: int = 0
+    for result in results:
+        file.write(json.dumps(result) + "\n")
+        file.flush()
+        if result["error"] is not None:
+            errors += 1
+    return errors
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        "--input",
+        default="-",
+        help="file with one game per line, - for standard input (default)",
+    )
+    source.add_argument("--mission", choices=MISSIONS, help="deal games of a mission")
+    source.add_argument(
+        "--example", type=int, help="print an example game and its solution"
+    )
+    parser.add_argument(
+        "--seeds",
+        type=parse_seeds,
+        default=(1,),
+        help="seeds of the mission deals, e.g. 1-100 or 1,5,7 (default: 1)",
+    )
+    parser.add_argument(
+        "--players",
+        type=int,
+        choices=PLAYER_PARAMETERS,
+        help="number of players of the mission deals",
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default="auto")
+    parser.add_argument(
+        "--timeout", type=float, help="solver timeout in seconds per game"
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="write the results in the order in which they finish",
+    )
+    parser.add_argument(
+        "--print",
+        action="store_true",
+        help="print a single game and its solution as tables",
+    )
+    parser.add_argument(
+        "--statistics", action="store_true", help="print the solver statistics"
+    )
+    arguments = parser.parse_args(argv)
+
+    if arguments.example is not None:
+        run_game(example_game(arguments.example), arguments.statistics)
+        return 0
+
+    lines: Iterable[str]
+    if arguments.mission:
+        lines = mission_games(arguments.mission, arguments.seeds, arguments.players)
+    elif arguments.input == "-":
+        lines = sys.stdin
+    else:
+        with open(arguments.input) as file:
+            lines = file.readlines()
+
+    if arguments.print:
+        games: list[str] = [line for line in lines if line.strip()]
+        if len(games) != 1:
+            parser.error(f"--print needs a single game, got {len(games)}.")
+        parameters, state, _ = read_game(games[0])
+        from .crew_game import CrewGame
 
+        run_game(CrewGame(parameters, state), arguments.statistics)
+        return 0
 
-def main() -> None:
-    # run_game(example_game(1))
-    # run_game(example_game(2))
-    # run_game(example_game(3))
-    # run_game(example_game(4))
-    # run_game(random_game())
-    # run_game(example_game(7))
-    # for game_state in all_task_distributions(
-    #    game.player_hands, game.initial_state.tasks, game.parameters
-    # ):
-    #    run_game(CrewGame(game.parameters, game_state))
-    run_n_random_games(100)
+    errors: int = write_results(
+        solve_lines(
+            lines,
+            arguments.backend,
+            arguments.timeout,
+            arguments.workers,
+            not arguments.unordered,
+        ),
+        sys.stdout,
+    )
+    if errors:
+        print(f"{errors} games failed.", file=sys.stderr)
+        return 1
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,15 +1,54 @@
+import functools
+import inspect
 import json
-from dataclasses import dataclass
+import os
+import secrets
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from enum import Enum, auto
-
-from flask import Flask, render_template, request
-from flask_socketio import SocketIO, emit
-
+from typing import Any
+
+from flask import (
+    Flask,
+    Response,
+    jsonify,
+    render_template,
+    request,
+    stream_with_context,
+)
+from flask_socketio import SocketIO, emit, join_room, leave_room
+
+from .crew_jobs import (
+    FINAL_JOB_STATES,
+    JobPriority,
+    JobStatus,
+    PrebuiltGame,
+    QueueFullError,
+    SolverJob,
+    WorkerPool,
+    job_key,
+)
+from .crew_json import (
+    card_from_json,
+    game_state_from_dict,
+    game_state_to_dict,
+    parameters_from_dict,
+    parameters_to_dict,
+    task_from_dict,
+    task_to_dict,
+)
+from .crew_log import RoomEventBuffer, configure_logging, get_logger
+from .crew_metrics import REGISTRY, counter, gauge, histogram
+from .crew_store import FINAL_JOB_STATUSES, StateStore, create_store
 from .crew_tasks import Task
 from .crew_types import Card, CardDistribution
 from .crew_utils import (
     DEFAULT_PARAMETERS,
+    PLAYER_PARAMETERS,
     CrewGameParameters,
+    CrewGameState,
     get_deck,
     get_deck_without_trump,
     no_card_duplicates,
@@ -25,27 +64,197 @@ class UserStatus(Enum):
     AWAITING_RESULT = auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class User:
     sid: str
     name: str
     status: UserStatus
     player_index: int | None = None
+    room: str | None = None
+
+
+@dataclass(slots=True)
+class GameSession:
+    """The state of the game at a single table, shared by all users in a room.
+
+    It is kept in the state store, so it can be changed by any server process."""
+
+    room: str
+    users: dict[str, User] = field(default_factory=dict)
+    parameters: CrewGameParameters | None = None
+    all_possible_cards: list[Card] = field(default_factory=list)
+    all_possible_tasks: list[Card] = field(default_factory=list)
+    # The cards or tasks the players currently select from, and its version,
+    # which is incremented with every change.
+    deck: list[Card] = field(default_factory=list)
+    deck_version: int = 0
+    card_distribution: CardDistribution = field(default_factory=list)
+    chosen_tasks: list[Task] = field(default_factory=list)
+    # The id of the solver job the room is waiting for.
+    solver_job: str | None = None
+    # The server process that builds the rules for the selected hands, while the
+    # tasks are being chosen.
+    prebuilt_worker: str | None = None
+    # The id of the job checking the chosen tasks, if the room has no prebuilt
+    # game.
+    task_check_job: str | None = None
+
+    @property
+    def in_progress(self) -> bool:
+        return any(u.status != UserStatus.CONNECTED for u in self.users.values())
+
+
+@dataclass(slots=True)
+class LocalGame:
+    """A prebuilt game of a room, which is owned by this server process."""
+
+    prebuilt_game: PrebuiltGame
+    # The number of chosen tasks of the latest check, and the id of the check
+    # while it is running.
+    checked_tasks: int = 0
+    task_check: int | None = None
 
 
 # define websocket server
 app: Flask = Flask(__name__)
-socketio: SocketIO = SocketIO(app, cors_allowed_origins="*")
+# With several server processes, broadcasts are passed on through the message
+# queue, e.g. "redis://localhost:6379".
+socketio: SocketIO = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    message_queue=os.environ.get("CREWZ3R_MESSAGE_QUEUE"),
+)
 
 COLOUR_NAMES = {-1: "Trumpf", 0: "Rot", 1: "Grün", 2: "Blau", 3: "Gelb"}
 
-all_possible_cards: list[Card]
-all_possible_tasks: list[Card]
-card_distribution: CardDistribution
-chosen_tasks: list[Task] = []
-
+# Time between two progress events of a running solver, in seconds.
+SOLVER_HEARTBEAT_INTERVAL: float = 1.0
+# Time between two checks for messages from the solver processes, in seconds.
+SOLVER_POLL_INTERVAL: float = 0.1
+# Number of games that are solved in parallel by each server process.
+SOLVER_WORKERS: int = max(1, (os.cpu_count() or 2) // 2)
+# Number of games that may wait for a free solver worker.
+MAX_QUEUED_SOLVER_JOBS: int = 32
+# Number of games that each server process builds while their tasks are being
+# chosen, each in a process of its own. The least recently used game is closed
+# first, its room is then solved without a prebuilt game.
+MAX_PREBUILT_GAMES: int = SOLVER_WORKERS
+# Time budget for checking the tasks chosen so far, in seconds. The checks of
+# prebuilt games go on after an unknown result, until they are decided.
+TASK_CHECK_TIMEOUT: float = 1.0
+# Time in seconds after which the jobs claimed by or pinned to a server process
+# are taken back, unless the process renews their lease with its heartbeat.
+JOB_LEASE_SECONDS: float = 30.0
+# Number of server processes that may stop while running a job before it fails.
+MAX_JOB_ATTEMPTS: int = 2
+
+# Maximum length of a room name.
+MAX_ROOM_NAME_LENGTH: int = 64
+
+# Number of finished jobs that are kept for polling. The oldest finished jobs are
+# forgotten first.
+MAX_FINISHED_JOBS: int = 1000
+
+# The state of all rooms and the solver job queue, shared by all server processes
+# using the same store: "memory" for a single process, or "sqlite:///<path>".
+store: StateStore = create_store(os.environ.get("CREWZ3R_STATE_STORE", "memory"))
+
+# Identifies this server process in the job queue.
+WORKER_ID: str = secrets.token_hex(8)
+
+# The users connected to this server process, by session id. Their status in a
+# game is stored in the state of their room.
 users: dict[str, User] = {}
 
+# The prebuilt games owned by this server process, by room name, from the least
+# to the most recently used.
+local_games: dict[str, LocalGame] = {}
+
+# Runs the solver jobs claimed by this server process.
+worker_pool: WorkerPool = WorkerPool(SOLVER_WORKERS)
+solver_dispatcher_started: bool = False
+
+# Logs JSON lines, configured in main(). Full game states are only logged at the
+# debug level.
+log = get_logger("crewz3r.server")
+
+# The recent events of each room, if enabled in main().
+room_events: RoomEventBuffer | None = None
+
+
+# ***********************************************************
+#        metrics
+# ***********************************************************
+
+# The metrics of each server process are served on its /metrics endpoint.
+socketio_events = counter(
+    "crewz3r_socketio_events", "Received Socket.IO events, by event.", ("event",)
+)
+handler_seconds = histogram(
+    "crewz3r_socketio_handler_seconds",
+    "Time spent handling Socket.IO events, by event.",
+    ("event",),
+)
+gauge(
+    "crewz3r_connected_users",
+    "Users connected to this server process.",
+    lambda: len(users),
+)
+gauge("crewz3r_rooms", "Rooms with at least one user.", lambda: store.room_count())
+gauge(
+    "crewz3r_solver_queue_length",
+    "Solver jobs waiting for a worker.",
+    lambda: len(store.queued_jobs()),
+)
+gauge(
+    "crewz3r_solver_jobs_running",
+    "Solver jobs running in this server process.",
+    lambda: len(worker_pool.running_jobs()),
+)
+gauge(
+    "crewz3r_prebuilt_games",
+    "Games built by this server process while their tasks are being chosen.",
+    lambda: len(local_games),
+)
+solver_jobs = counter(
+    "crewz3r_solver_jobs", "Solver jobs run to completion, by status.", ("status",)
+)
+solver_job_seconds = histogram(
+    "crewz3r_solver_job_seconds", "Wall time of solver jobs, from start to result."
+)
+solver_phase_seconds = histogram(
+    "crewz3r_solver_phase_seconds",
+    "Wall time of the solver workers by phase: playouts, building or checking the "
+    "rules.",
+    ("phase",),
+)
+cache_requests = counter(
+    "crewz3r_cache_requests",
+    "Lookups of reusable solver work by cache and result: hit or miss.",
+    ("cache", "result"),
+)
+
+Handler = Callable[..., Any]
+
+
+def on_event(event: str) -> Callable[[Handler], Handler]:
+    """Register a Socket.IO event handler, which is counted and timed."""
+
+    def decorator(handler: Handler) -> Handler:
+        # Flask-SocketIO passes optional arguments, e.g. to connect handlers.
+        parameter_count: int = len(inspect.signature(handler).parameters)
+
+        @functools.wraps(handler)
+        def instrumented(*args: Any) -> Any:
+            socketio_events.inc(event=event)
+            with handler_seconds.time(event=event):
+                return handler(*args[:parameter_count])
+
+        socketio.on(event)(instrumented)
+        return handler
+
+    return decorator
+
 
 # ***********************************************************
 #        helper functions
@@ -56,77 +265,741 @@ def get_sid() -> str:
     return request.sid  # type: ignore
 
 
-def get_user_list() -> dict[str, str]:
-    return {user.sid: user.name for user in users.values()}
+def get_user() -> User:
+    return users[get_sid()]
+
+
+def user_to_dict(user: User) -> dict[str, Any]:
+    return {
+        "sid": user.sid,
+        "name": user.name,
+        "status": user.status.name,
+        "player_index": user.player_index,
+        "room": user.room,
+    }
+
+
+def user_from_dict(data: dict[str, Any]) -> User:
+    return User(
+        data["sid"],
+        data["name"],
+        UserStatus[data["status"]],
+        data["player_index"],
+        data["room"],
+    )
+
+
+def session_to_dict(session: GameSession) -> dict[str, Any]:
+    return {
+        "room": session.room,
+        "users": [user_to_dict(u) for u in session.users.values()],
+        "parameters": parameters_to_dict(session.parameters)
+        if session.parameters is not None
+        else None,
+        "all_possible_cards": session.all_possible_cards,
+        "all_possible_tasks": session.all_possible_tasks,
+        "deck": session.deck,
+        "deck_version": session.deck_version,
+        "card_distribution": session.card_distribution,
+        "chosen_tasks": [task_to_dict(t) for t in session.chosen_tasks],
+        "solver_job": session.solver_job,
+        "prebuilt_worker": session.prebuilt_worker,
+        "task_check_job": session.task_check_job,
+    }
+
+
+def session_from_dict(data: dict[str, Any]) -> GameSession:
+    return GameSession(
+        data["room"],
+        {u["sid"]: user_from_dict(u) for u in data["users"]},
+        parameters_from_dict(data["parameters"])
+        if data["parameters"] is not None
+        else None,
+        [card_from_json(c) for c in data["all_possible_cards"]],
+        [card_from_json(c) for c in data["all_possible_tasks"]],
+        [card_from_json(c) for c in data["deck"]],
+        data["deck_version"],
+        [[card_from_json(c) for c in hand] for hand in data["card_distribution"]],
+        [task_from_dict(t) for t in data["chosen_tasks"]],
+        data["solver_job"],
+        data["prebuilt_worker"],
+        data.get("task_check_job"),
+    )
+
+
+def load_session(room: str) -> GameSession | None:
+    """Read the state of a room, without locking it."""
+    data: dict[str, Any] | None = store.get_room(room)
+    return session_from_dict(data) if data is not None else None
 
 
-def send_user_list() -> None:
-    emit("user list", json.dumps(get_user_list()), broadcast=True)
+@contextmanager
+def open_session(room: str, create: bool = False) -> Iterator[GameSession | None]:
+    """Load the state of a room, and save the changes at the end of the block.
+
+    No other thread or server process can change the room in between. A room
+    without users is deleted."""
+    with store.lock():
+        session: GameSession | None = load_session(room)
+        if session is None and create:
+            session = GameSession(room)
+        yield session
+        if session is not None and session.users:
+            store.put_room(room, session_to_dict(session))
+        elif session is not None:
+            store.delete_room(room)
+
+
+def get_user_list(session: GameSession) -> dict[str, str]:
+    return {user.sid: user.name for user in session.users.values()}
+
+
+def send_user_list(session: GameSession) -> None:
+    emit("user list", json.dumps(get_user_list(session)), to=session.room)
 
 
 def card_string(card: Card) -> str:
     return f"({COLOUR_NAMES[card[0]]}, {card[1]})"
 
 
+def send_deck_snapshot(session: GameSession, to: str) -> None:
+    snapshot: dict[str, Any] = {"version": session.deck_version, "cards": session.deck}
+    emit("cards snapshot", json.dumps(snapshot), to=to)
+
+
+def set_deck(session: GameSession, deck: list[Card]) -> None:
+    session.deck = deck
+    session.deck_version += 1
+    send_deck_snapshot(session, session.room)
+
+
+def remove_from_deck(session: GameSession, card: Card) -> None:
+    """Remove a card from the current deck and send the change to all clients."""
+    session.deck.remove(card)
+    session.deck_version += 1
+    removal: dict[str, Any] = {"version": session.deck_version, "card": card}
+    emit("card removed", json.dumps(removal), to=session.room)
+
+
+def submit_job(
+    parameters: CrewGameParameters,
+    state: CrewGameState,
+    timeout: float | None = None,
+    priority: JobPriority = JobPriority.NORMAL,
+    room: str | None = None,
+    worker: str | None = None,
+    task_check: bool = False,
+) -> dict[str, Any]:
+    """Add a game to the job queue, or return the unfinished job of the same game.
+
+    A job that is pinned to a worker is only run by that server process. The
+    result of a task check is sent to its rooms as "task check" event instead of
+    a solution. Raises a QueueFullError when too many jobs are waiting."""
+
+    # Jobs of games without hands are never merged, as their cards are dealt
+    # randomly.
+    key: str = (
+        job_key(parameters, state, timeout)
+        if state.hands is not None
+        else secrets.token_hex(8)
+    )
+    if task_check:
+        key = f"task check {key}"
+    with store.lock():
+        job: dict[str, Any] | None = store.find_job(key)
+        cache_requests.inc(
+            cache="solver_jobs", result="hit" if job is not None else "miss"
+        )
+        if job is not None:
+            if room is not None and room not in job["rooms"]:
+                job["rooms"].append(room)
+            if job["status"] == JobStatus.QUEUED.name:
+                job["priority"] = min(job["priority"], int(priority))
+            store.put_job(job)
+            return job
+
+        if len(store.queued_jobs()) >= MAX_QUEUED_SOLVER_JOBS:
+            raise QueueFullError(
+                f"The solver queue is full ({MAX_QUEUED_SOLVER_JOBS} waiting games)."
+            )
+        job = {
+            "id": secrets.token_urlsafe(8),
+            "key": key,
+            "priority": int(priority),
+            "status": JobStatus.QUEUED.name,
+            "worker": worker,
+            # The time until which the worker must renew its claim of the job.
+            "lease": time.time() + JOB_LEASE_SECONDS if worker is not None else None,
+            "attempts": 0,
+            "submitted_by": WORKER_ID,
+            # The rooms waiting for the result. Jobs submitted through the API are
+            # run even if no room waits for them.
+            "rooms": [room] if room is not None else [],
+            "api": room is None,
+            "task_check": task_check,
+            "parameters": parameters_to_dict(parameters),
+            "state": game_state_to_dict(state),
+            "timeout": timeout,
+            "elapsed": 0.0,
+            "check_result": None,
+            "result": None,
+            "error": None,
+        }
+        store.put_job(job)
+        store.prune_jobs(MAX_FINISHED_JOBS)
+    return job
+
+
+def leave_job(room: str, job_id: str) -> bool:
+    """Stop waiting for a job with a room. The job itself is only cancelled if no
+    other room waits for its result. Returns False if the job has already
+    finished."""
+    with store.lock():
+        job: dict[str, Any] | None = store.get_job(job_id)
+        if job is None or job["status"] in FINAL_JOB_STATUSES:
+            return False
+        if room in job["rooms"]:
+            job["rooms"].remove(room)
+        if not job["rooms"] and not job["api"]:
+            # A running job is stopped by the server process running it.
+            job["status"] = JobStatus.CANCELLED.name
+        store.put_job(job)
+    return True
+
+
+def cancel_solver_job(session: GameSession) -> None:
+    """Stop waiting for the solver job of a session."""
+    job_id: str | None = session.solver_job
+    session.solver_job = None
+    if job_id is None or not leave_job(session.room, job_id):
+        return
+    log.info("Solver cancelled.", room=session.room, job=job_id)
+    socketio.emit("solver cancelled", to=session.room)
+
+
+def cancel_task_check(session: GameSession) -> None:
+    """Stop waiting for the check of the chosen tasks of a session."""
+    job_id: str | None = session.task_check_job
+    session.task_check_job = None
+    if job_id is not None:
+        leave_job(session.room, job_id)
+
+
+def close_prebuilt_game(session: GameSession) -> None:
+    """Stop building the rules for the hands of a session. A prebuilt game of
+    another server process is closed by that process."""
+    session.prebuilt_worker = None
+    local: LocalGame | None = local_games.pop(session.room, None)
+    if local is not None:
+        local.prebuilt_game.close()
+
+
+def prebuild_game(session: GameSession) -> None:
+    """Start building the rules for the hands of a session in this server process.
+    With MAX_PREBUILT_GAMES games already, the least recently used one is closed,
+    and its room is solved from scratch."""
+    assert session.parameters is not None
+    close_prebuilt_game(session)
+    while local_games and len(local_games) >= MAX_PREBUILT_GAMES:
+        room: str = next(iter(local_games))
+        with open_session(room) as other:
+            if other is not None and other.prebuilt_worker == WORKER_ID:
+                other.prebuilt_worker = None
+        local_games.pop(room).prebuilt_game.close()
+        log.info("Prebuilt game closed for room %r.", session.room, room=room)
+    local_games[session.room] = LocalGame(
+        PrebuiltGame(
+            session.parameters,
+            CrewGameState([list(hand) for hand in session.card_distribution]),
+        )
+    )
+    session.prebuilt_worker = WORKER_ID
+    ensure_solver_dispatcher()
+
+
+def check_chosen_tasks(room: str, tasks: list[Task]) -> None:
+    """Check whether the chosen tasks can still be completed, if the prebuilt game
+    of the room is owned by this server process. A running check of the previous
+    tasks is cancelled."""
+    local: LocalGame | None = local_games.get(room)
+    if local is not None and tasks and len(tasks) != local.checked_tasks:
+        # The game is the most recently used one now.
+        local_games[room] = local_games.pop(room)
+        local.checked_tasks = len(tasks)
+        local.task_check = local.prebuilt_game.check_tasks(tasks, TASK_CHECK_TIMEOUT)
+
+
+def submit_task_check(session: GameSession) -> None:
+    """Check the chosen tasks of a room without a prebuilt game with a quick check
+    in the job queue. The check of the previous tasks is cancelled."""
+    assert session.parameters is not None
+    cancel_task_check(session)
+    if not session.chosen_tasks:
+        return
+    try:
+        job: dict[str, Any] = submit_job(
+            session.parameters,
+            CrewGameState(
+                hands=[list(hand) for hand in session.card_distribution],
+                tasks=list(session.chosen_tasks),
+            ),
+            TASK_CHECK_TIMEOUT,
+            JobPriority.QUICK_CHECK,
+            room=session.room,
+            task_check=True,
+        )
+    except QueueFullError as e:
+        log.info("Task check skipped: %s", e, room=session.room)
+        return
+    session.task_check_job = job["id"]
+    ensure_solver_dispatcher()
+
+
+def submit_solver_job(session: GameSession, state: CrewGameState) -> None:
+    assert session.parameters is not None
+    try:
+        job: dict[str, Any] = submit_job(
+            session.parameters,
+            state,
+            room=session.room,
+            worker=session.prebuilt_worker,
+        )
+    except QueueFullError as e:
+        log.warning("Solver job rejected: %s", e, room=session.room)
+        # The players may try again by finishing the task selection again.
+        for u in session.users.values():
+            if u.status == UserStatus.AWAITING_RESULT:
+                u.status = UserStatus.TASK_SELECTION_FINISHED
+        emit("solver rejected", str(e), to=session.room)
+        return
+
+    session.solver_job = job["id"]
+    if job["worker"] != session.prebuilt_worker:
+        # The room waits for the job of another room, which has the same game.
+        close_prebuilt_game(session)
+
+    log.info("Solver job queued.", room=session.room, job=session.solver_job)
+
+    emit("solver started", to=session.room)
+    ensure_solver_dispatcher()
+
+
+def ensure_solver_dispatcher() -> None:
+    global solver_dispatcher_started
+
+    if not solver_dispatcher_started:
+        solver_dispatcher_started = True
+        socketio.start_background_task(run_solver_dispatcher)
+
+
+def emit_to_job_rooms(job: dict[str, Any], event: str, *args: Any) -> None:
+    for room in job["rooms"]:
+        socketio.emit(event, *args, to=room)
+
+
+def start_claimed_job(job: dict[str, Any]) -> SolverJob:
+    """Run a job from the job queue on a worker of this server process."""
+    prebuilt: PrebuiltGame | None = None
+    for room in job["rooms"] if not job.get("task_check") else []:
+        local: LocalGame | None = local_games.pop(room, None)
+        if local is not None:
+            prebuilt = local.prebuilt_game
+            break
+    solver_job: SolverJob = worker_pool.start(
+        parameters_from_dict(job["parameters"]),
+        game_state_from_dict(job["state"]),
+        job["timeout"],
+        prebuilt=prebuilt,
+    )
+    if not job["api"] and not job.get("task_check"):
+        cache_requests.inc(
+            cache="prebuilt_games",
+            result="hit" if solver_job.prebuilt is not None else "miss",
+        )
+    return solver_job
+
+
+def update_job(job_id: str, solver_job: SolverJob) -> dict[str, Any] | None:
+    """Store the status and result of a job that runs in this server process."""
+    with store.lock():
+        job: dict[str, Any] | None = store.get_job(job_id)
+        if job is None or job["worker"] != WORKER_ID:
+            # The job has been taken over by another server process.
+            return None
+        if job["status"] != JobStatus.CANCELLED.name:
+            job["status"] = solver_job.status.name
+        job["elapsed"] = round(solver_job.elapsed, 3)
+        job["check_result"] = solver_job.check_result
+        job["result"] = solver_job.result
+        job["error"] = solver_job.error
+        store.put_job(job)
+    return job
+
+
+def finish_job(job_id: str, solver_job: SolverJob) -> None:
+    solver_jobs.inc(status=solver_job.status.name)
+    solver_job_seconds.observe(solver_job.elapsed)
+    for phase, seconds in solver_job.timings.items():
+        solver_phase_seconds.observe(seconds, phase=phase)
+    for result, key in (("hit", "hits"), ("miss", "misses")):
+        if solver_job.endgame_cache.get(key):
+            cache_requests.inc(
+                solver_job.endgame_cache[key], cache="endgame", result=result
+            )
+
+    job: dict[str, Any] | None = update_job(job_id, solver_job)
+    if job is None:
+        return
+    if job.get("task_check"):
+        send_task_check(job)
+        release_job_rooms(job)
+        return
+    match solver_job.status:
+        case JobStatus.FINISHED:
+            log.info(
+                "Solver finished after %.1fs.",
+                solver_job.elapsed,
+                job=job_id,
+                rooms=job["rooms"],
+                timings=solver_job.timings,
+            )
+            emit_to_job_rooms(job, "solver finished", json.dumps(solver_job.result))
+        case JobStatus.FAILED:
+            log.error(
+                "Solver failed: %s", solver_job.error, job=job_id, rooms=job["rooms"]
+            )
+            emit_to_job_rooms(job, "solver failed", solver_job.error)
+    release_job_rooms(job)
+
+
+def send_task_check(job: dict[str, Any]) -> None:
+    """Send the result of a finished task check job: sat, unsat or unknown."""
+    result: str = (
+        job["check_result"]
+        if job["status"] == JobStatus.FINISHED.name and job["check_result"]
+        else "unknown"
+    )
+    log.info("Task check: %s.", result, job=job["id"], rooms=job["rooms"])
+    emit_to_job_rooms(job, "task check", result)
+
+
+def release_job_rooms(job: dict[str, Any]) -> None:
+    """Stop the rooms of a finished job from waiting for it."""
+    for room in job["rooms"]:
+        with open_session(room) as session:
+            if session is None:
+                continue
+            if session.solver_job == job["id"]:
+                session.solver_job = None
+            if session.task_check_job == job["id"]:
+                session.task_check_job = None
+
+
+def renew_job_leases() -> None:
+    """Extend the leases of the jobs claimed by or pinned to this server process."""
+    with store.lock():
+        for job in store.assigned_jobs():
+            if job["worker"] == WORKER_ID:
+                job["lease"] = time.time() + JOB_LEASE_SECONDS
+                store.put_job(job)
+
+
+def expire_job_leases() -> None:
+    """Take back the jobs of server processes that stopped renewing their leases.
+    Pinned jobs may then be run by any process. Running jobs are queued again, or
+    fail once MAX_JOB_ATTEMPTS processes have stopped while running them."""
+    now: float = time.time()
+    failed: list[dict[str, Any]] = []
+    with store.lock():
+        for job in store.assigned_jobs():
+            if job.get("lease") is not None and job["lease"] >= now:
+                continue
+            log.warning(
+                "Solver job lease of %s expired.",
+                job["worker"],
+                job=job["id"],
+                status=job["status"],
+            )
+            job["worker"] = None
+            job["lease"] = None
+            if job["status"] != JobStatus.QUEUED.name:
+                job["attempts"] = job.get("attempts", 0) + 1
+                if job["attempts"] < MAX_JOB_ATTEMPTS:
+                    job["status"] = JobStatus.QUEUED.name
+                else:
+                    job["status"] = JobStatus.FAILED.name
+                    job["error"] = "The solver worker stopped responding."
+                    failed.append(job)
+            store.put_job(job)
+    for job in failed:
+        if job.get("task_check"):
+            send_task_check(job)
+        else:
+            emit_to_job_rooms(job, "solver failed", job["error"])
+        release_job_rooms(job)
+
+
+def poll_local_game(room: str) -> None:
+    """Start a check when the chosen tasks of a room with a prebuilt game have
+    changed, and send the result once it has finished."""
+    local: LocalGame | None = local_games.get(room)
+    if local is None:
+        return
+    session: GameSession | None = load_session(room)
+    if session is None or session.prebuilt_worker != WORKER_ID:
+        # The game has ended on another server process.
+        local_games.pop(room, None)
+        local.prebuilt_game.close()
+        return
+
+    check_chosen_tasks(room, session.chosen_tasks)
+    result: tuple[int, str] | None = local.prebuilt_game.poll_check()
+    if result is None or result[0] != local.task_check:
+        return
+    if result[1] != "unknown":
+        # An unknown check continues until it is decided or the tasks change.
+        local.task_check = None
+    log.info("Task check: %s.", result[1], room=room)
+    socketio.emit("task check", result[1], to=room)
+
+
+def run_solver_dispatcher() -> None:
+    """Background task running the queued solver jobs on the workers of this server
+    process. It sends queue positions, progress events and the results to the
+    waiting rooms, and the results of the checks of the chosen tasks."""
+
+    running: dict[SolverJob, str] = {}
+    queue_positions: dict[str, int] = {}
+    last_heartbeat: float = 0.0
+    while True:
+        free_workers: int = worker_pool.free_workers
+        if free_workers > 0:
+            with store.lock():
+                claimed: list[dict[str, Any]] = store.claim_jobs(
+                    WORKER_ID, free_workers
+                )
+                for job in claimed:
+                    job["lease"] = time.time() + JOB_LEASE_SECONDS
+                    store.put_job(job)
+            for job in claimed:
+                running[start_claimed_job(job)] = job["id"]
+
+        for solver_job, job_id in list(running.items()):
+            record: dict[str, Any] | None = store.get_job(job_id)
+            if (
+                record is None
+                or record["status"] == JobStatus.CANCELLED.name
+                or record["worker"] != WORKER_ID
+            ):
+                worker_pool.cancel(solver_job)
+                running.pop(solver_job)
+
+        for solver_job in worker_pool.poll():
+            if solver_job.status in FINAL_JOB_STATES and solver_job in running:
+                finish_job(running.pop(solver_job), solver_job)
+
+        # Each server process sends the queue positions of the jobs submitted by
+        # its clients. The rooms don't wait for task checks.
+        positions: dict[str, int] = {}
+        for i, job in enumerate(store.queued_jobs()):
+            if job["submitted_by"] == WORKER_ID and not job.get("task_check"):
+                positions[job["id"]] = i + 1
+                if queue_positions.get(job["id"]) != i + 1:
+                    emit_to_job_rooms(job, "solver queued", i + 1)
+        queue_positions = positions
+
+        if time.monotonic() - last_heartbeat >= SOLVER_HEARTBEAT_INTERVAL:
+            renew_job_leases()
+            expire_job_leases()
+            for solver_job, job_id in running.items():
+                updated: dict[str, Any] | None = update_job(job_id, solver_job)
+                if updated is not None and not updated.get("task_check"):
+                    emit_to_job_rooms(
+                        updated, "solver progress", json.dumps(solver_job.progress())
+                    )
+            last_heartbeat = time.monotonic()
+
+        for room in list(local_games):
+            poll_local_game(room)
+
+        socketio.sleep(SOLVER_POLL_INTERVAL)
+
+
+def leave_session(user: User) -> None:
+    room: str | None = user.room
+    if room is None:
+        return
+
+    leave_room(room, sid=user.sid)
+    user.room = None
+
+    with open_session(room) as session:
+        if session is None:
+            return
+        member: User | None = session.users.pop(user.sid, None)
+
+        log.info("User %r left the room.", user.name, room=room, sid=user.sid)
+
+        if not session.users:
+            cancel_task_check(session)
+            cancel_solver_job(session)
+            close_prebuilt_game(session)
+        else:
+            if member is not None and member.player_index is not None:
+                # The game can't be continued without this player.
+                end_session_game(session)
+            send_user_list(session)
+
+    if store.get_room(room) is None:
+        log.info("Room closed.", room=room, rooms=store.room_count())
+
+
+def end_session_game(session: GameSession) -> None:
+    cancel_task_check(session)
+    cancel_solver_job(session)
+    close_prebuilt_game(session)
+
+    for u in session.users.values():
+        u.status = UserStatus.CONNECTED
+        u.player_index = None
+    session.chosen_tasks = []
+
+    log.info("Ending the game.", room=session.room)
+
+    emit("game ended", to=session.room)
+
+
 # ***********************************************************
 #        start page
 # ***********************************************************
 
 
-@socketio.on("connect")
+@on_event("connect")
 def connect() -> None:
 
-    global users
-
     sid: str = get_sid()
     users[sid] = User(sid, "", UserStatus.CONNECTED)
 
-    print(f"New connection: {sid}, user count: {len(users)}.")
-    print("Users:", users, sep="\n")
+    log.info("New connection.", sid=sid, users=len(users))
 
-    send_user_list()
 
-
-@socketio.on("update name")
+@on_event("update name")
 def update_name(name: str) -> None:
 
-    sid: str = get_sid()
+    user: User = get_user()
 
-    print(f"User {sid!r} updated name from {users[sid].name!r} to {name!r}.")
+    log.info("User %r renamed to %r.", user.name, name, sid=user.sid)
 
-    users[sid].name = name
-    send_user_list()
+    user.name = name
+    if user.room is None:
+        return
+    with open_session(user.room) as session:
+        if session is not None and user.sid in session.users:
+            session.users[user.sid].name = name
+            send_user_list(session)
 
 
-@socketio.on("start card selection")
-def start_card_selection() -> None:
+@on_event("create room")
+def create_room() -> None:
 
-    global all_possible_cards, card_distribution, users
+    room: str = secrets.token_urlsafe(6)
+    while store.get_room(room) is not None:
+        room = secrets.token_urlsafe(6)
+    join_game_room(room)
 
-    player_count = len(users)
-    parameters: CrewGameParameters = DEFAULT_PARAMETERS
-    try:
-        parameters.number_of_players = player_count
-    except ValueError as e:
-        print(f"Invalid player count:\n{e!r}")
-        emit("not enough players")
+
+@on_event("join room")
+def join_game_room(room: str) -> None:
+
+    user: User = get_user()
+
+    if not room or len(room) > MAX_ROOM_NAME_LENGTH:
+        emit("room error", "Ungültiger Raumname.")
         return
 
-    all_possible_cards = get_deck(parameters)
-    all_possible_tasks = get_deck_without_trump(parameters)
-    card_distribution = [[] for _ in range(player_count)]
+    with store.lock():
+        existing: GameSession | None = load_session(room)
+        if existing is not None and user.room == room:
+            emit("room joined", room)
+            send_user_list(existing)
+            if existing.in_progress:
+                send_deck_snapshot(existing, user.sid)
+            return
+        if existing is not None and existing.in_progress:
+            emit("room error", "In diesem Raum läuft bereits ein Spiel.")
+            return
+
+        leave_session(user)
+        with open_session(room, create=True) as session:
+            assert session is not None
+            session.users[user.sid] = User(
+                user.sid, user.name, UserStatus.CONNECTED, room=room
+            )
+            user.room = room
+            join_room(room)
+
+            log.info(
+                "User %r joined the room.",
+                user.name,
+                room=room,
+                sid=user.sid,
+                users=len(session.users),
+            )
+
+            emit("room joined", room)
+            send_user_list(session)
+
+    if existing is None:
+        log.info("Room created.", room=room, rooms=store.room_count())
+
+
+@on_event("leave room")
+def leave_game_room() -> None:
+
+    leave_session(get_user())
+
+
+@on_event("start card selection")
+def start_card_selection() -> None:
 
-    for i, user in enumerate(users.values()):
-        if user.status == UserStatus.CONNECTED:
-            user.status = UserStatus.CARD_SELECTION
-            user.player_index = i
+    room: str | None = get_user().room
+    if room is None:
+        emit("room error", "Kein Raum ausgewählt.")
+        return
 
-    print("Starting card selection.")
-    print("Parameters:", parameters, sep="\n")
-    print("Users:", users, sep="\n")
+    with open_session(room) as session:
+        assert session is not None
+        player_count = len(session.users)
+        if player_count not in PLAYER_PARAMETERS:
+            log.warning("Invalid player count: %d", player_count, room=session.room)
+            emit("not enough players")
+            return
+        session.parameters = PLAYER_PARAMETERS[player_count]
+
+        session.all_possible_cards = get_deck(session.parameters)
+        session.all_possible_tasks = get_deck_without_trump(session.parameters)
+        session.card_distribution = [[] for _ in range(player_count)]
+        session.chosen_tasks = []
+
+        for i, user in enumerate(session.users.values()):
+            if user.status == UserStatus.CONNECTED:
+                user.status = UserStatus.CARD_SELECTION
+                user.player_index = i
+
+        log.info("Starting card selection.", room=session.room)
+        log.debug(
+            "Parameters: %s, users: %s",
+            session.parameters,
+            session.users,
+            room=session.room,
+        )
 
-    emit("card selection started", json.dumps(get_user_list()), broadcast=True)
-    emit("cards updated", json.dumps(list(all_possible_cards)), broadcast=True)
+        emit(
+            "card selection started",
+            json.dumps(get_user_list(session)),
+            to=session.room,
+        )
+        set_deck(session, session.all_possible_cards)
 
 
 # ***********************************************************
@@ -134,154 +1007,353 @@ def start_card_selection() -> None:
 # ***********************************************************
 
 # when one player adds a card to its deck remove it from possible cards
-@socketio.on("card_or_task taken")
+@on_event("card_or_task taken")
 def card_or_task_taken(card_str: str) -> None:
-    sid: str = get_sid()
-    user = users[sid]
+    user: User = get_user()
     card: Card = tuple(json.loads(card_str))
 
-    if user.status == UserStatus.CARD_SELECTION:
-        card_taken(card, user)
-    elif user.status == UserStatus.TASK_SELECTION:
-        task_taken(card, user)
-    else:
-        print(
-            f"Warning: {user.name} ({user.sid}) "
-            f"tried to take a card in status {user.status}"
-        )
-
-
-def card_taken(card: Card, user: User) -> None:
-
-    global all_possible_cards, card_distribution
+    if user.room is None:
+        log.warning("User %r took a card outside a room.", user.name, sid=user.sid)
+        return
 
-    if card not in all_possible_cards:
-        print(f"Unavailable card {card} was taken by {user.name} ({user.sid}).")
+    with open_session(user.room) as session:
+        if session is None or user.sid not in session.users:
+            return
+        user = session.users[user.sid]
+        if user.status == UserStatus.CARD_SELECTION:
+            card_taken(session, card, user)
+        elif user.status == UserStatus.TASK_SELECTION:
+            task_taken(session, card, user)
+        else:
+            log.warning(
+                "User %r took a card in status %s.",
+                user.name,
+                user.status.name,
+                room=session.room,
+                sid=user.sid,
+            )
+
+
+def card_taken(session: GameSession, card: Card, user: User) -> None:
+
+    if card not in session.deck:
+        log.warning(
+            "Unavailable card %s was taken by %r.",
+            card,
+            user.name,
+            room=session.room,
+            sid=user.sid,
+        )
+        # The client may have missed that the card was taken.
+        send_deck_snapshot(session, user.sid)
         return
 
     player = user.player_index
+    # Users select cards and tasks only after they have joined the game.
+    assert player is not None
 
-    all_possible_cards.remove(card)
-    emit("cards updated", json.dumps(list(all_possible_cards)), broadcast=True)
+    remove_from_deck(session, card)
 
-    card_distribution[player].append(card)
+    session.card_distribution[player].append(card)
 
-    print(f"Card {card} was taken by {user.name} ({user.sid}).")
-    print("Card distribution:", card_distribution, sep="\n")
+    log.info(
+        "Card %s was taken by %r.", card, user.name, room=session.room, sid=user.sid
+    )
+    log.debug("Card distribution: %s", session.card_distribution, room=session.room)
 
-    selected_cards = ", ".join(card_string(card) for card in card_distribution[player])
+    selected_cards = ", ".join(
+        card_string(card) for card in session.card_distribution[player]
+    )
     emit("selected cards updated", selected_cards)
 
 
-@socketio.on("finish card selection")
-def finish_card_selection() -> None:
+@on_event("resync")
+def resync() -> None:
 
-    global all_possible_cards, card_distribution
+    room: str | None = get_user().room
+    session: GameSession | None = load_session(room) if room is not None else None
+    if session is not None:
+        send_deck_snapshot(session, get_sid())
 
-    sid: str = get_sid()
-
-    if users[sid].status == UserStatus.CARD_SELECTION:
-        users[sid].status = UserStatus.CARD_SELECTION_FINISHED
-        print(f"User {users[sid].name!r} ({sid!r}) finished card selection.")
-
-    if all(u.status == UserStatus.CARD_SELECTION_FINISHED for u in users.values()):
-        print("Card selection finished for all users.")
-        if no_card_duplicates(card_distribution):
-            for user in users.values():
-                if user.status == UserStatus.CARD_SELECTION_FINISHED:
-                    user.status = UserStatus.TASK_SELECTION
-
-            print("Starting task selection.")
-            print("Users:", users, sep="\n")
-
-            emit("task selection started", broadcast=True)
-            emit("cards updated", json.dumps(list(all_possible_tasks)), broadcast=True)
-        else:
-            print("ERROR: duplicate cards.")
-            emit("end game")
 
+@on_event("finish card selection")
+def finish_card_selection() -> None:
 
-@socketio.on("task taken")
-def task_taken(card: Card, user: User) -> None:
-    global all_possible_tasks, chosen_tasks
+    room: str | None = get_user().room
+    if room is None:
+        return
 
-    if card not in all_possible_tasks:
-        print(f"Unavailable task {card} was taken by {user.name} ({user.sid}).")
+    with open_session(room) as session:
+        assert session is not None
+        user: User = session.users[get_sid()]
+        if user.status == UserStatus.CARD_SELECTION:
+            user.status = UserStatus.CARD_SELECTION_FINISHED
+            log.info(
+                "User %r finished card selection.",
+                user.name,
+                room=session.room,
+                sid=user.sid,
+            )
+
+        if all(
+            u.status == UserStatus.CARD_SELECTION_FINISHED
+            for u in session.users.values()
+        ):
+            log.info("Card selection finished for all users.", room=session.room)
+            if no_card_duplicates(session.card_distribution):
+                for u in session.users.values():
+                    if u.status == UserStatus.CARD_SELECTION_FINISHED:
+                        u.status = UserStatus.TASK_SELECTION
+
+                # The hands are fixed now, so the rules of the game can be built
+                # while the players choose their tasks.
+                prebuild_game(session)
+
+                log.info("Starting task selection.", room=session.room)
+                log.debug("Users: %s", session.users, room=session.room)
+
+                emit("task selection started", to=session.room)
+                set_deck(session, session.all_possible_tasks)
+            else:
+                log.error("Duplicate cards.", room=session.room)
+                emit("end game")
+
+
+def task_taken(session: GameSession, card: Card, user: User) -> None:
+
+    if card not in session.deck:
+        log.warning(
+            "Unavailable task %s was taken by %r.",
+            card,
+            user.name,
+            room=session.room,
+            sid=user.sid,
+        )
+        send_deck_snapshot(session, user.sid)
         return
 
     player = user.player_index
+    # Users select cards and tasks only after they have joined the game.
+    assert player is not None
 
-    all_possible_tasks.remove(card)
-    emit("cards updated", json.dumps(list(all_possible_tasks)), broadcast=True)
+    remove_from_deck(session, card)
 
-    chosen_tasks.append(Task(card, player))
+    session.chosen_tasks.append(Task(card, player + 1))
+
+    log.info(
+        "Task %s was taken by %r.", card, user.name, room=session.room, sid=user.sid
+    )
+    log.debug("Chosen tasks: %s", session.chosen_tasks, room=session.room)
 
-    print(f"Task {card} was taken by {user.name} ({user.sid}).")
-    print("Chosen tasks:", chosen_tasks, sep="\n")
+    # A prebuilt game of another server process is checked by its dispatcher.
+    check_chosen_tasks(session.room, session.chosen_tasks)
+    if session.prebuilt_worker is None:
+        submit_task_check(session)
 
     selected_tasks = ", ".join(
-        [card_string(t.card) for t in chosen_tasks if t.player == player]
+        [card_string(t.card) for t in session.chosen_tasks if t.player == player + 1]
     )
     emit("selected tasks updated", selected_tasks)
 
 
-@socketio.on("finish task selection")
+@on_event("finish task selection")
 def finish_task_selection() -> None:
 
-    sid: str = get_sid()
+    room: str | None = get_user().room
+    if room is None:
+        return
 
-    if users[sid].status == UserStatus.TASK_SELECTION:
-        users[sid].status = UserStatus.TASK_SELECTION_FINISHED
-        print(f"User {users[sid].name!r} ({sid!r}) finished task selection.")
+    with open_session(room) as session:
+        assert session is not None
+        if session.parameters is None:
+            return
+        user: User = session.users[get_sid()]
+        if user.status == UserStatus.TASK_SELECTION:
+            user.status = UserStatus.TASK_SELECTION_FINISHED
+            log.info(
+                "User %r finished task selection.",
+                user.name,
+                room=session.room,
+                sid=user.sid,
+            )
+
+        if all(
+            u.status == UserStatus.TASK_SELECTION_FINISHED
+            for u in session.users.values()
+        ):
+            log.info("Task selection finished for all users.", room=session.room)
+            if True:  # TODO: check for duplicates
+                for u in session.users.values():
+                    if u.status == UserStatus.TASK_SELECTION_FINISHED:
+                        u.status = UserStatus.AWAITING_RESULT
+
+                cancel_task_check(session)
+                cancel_solver_job(session)
+                submit_solver_job(
+                    session,
+                    CrewGameState(
+                        hands=[list(hand) for hand in session.card_distribution],
+                        tasks=list(session.chosen_tasks),
+                    ),
+                )
+            else:
+                log.error("Duplicate tasks.", room=session.room)
+                emit("end game")
+
+
+@on_event("end game")
+def end_game() -> None:
+
+    room: str | None = get_user().room
+    if room is None:
+        return
+    with open_session(room) as session:
+        if session is not None:
+            end_session_game(session)
 
-    if all(u.status == UserStatus.TASK_SELECTION_FINISHED for u in users.values()):
-        print("Task selection finished for all users.")
-        if True:  # TODO: check for duplicates
-            for user in users.values():
-                if user.status == UserStatus.TASK_SELECTION_FINISHED:
-                    user.status = UserStatus.AWAITING_RESULT
 
-            # TODO: start solver
+@on_event("disconnect")
+def disconnect() -> None:
 
-            print("Starting solver.")
+    sid: str = get_sid()
+    user: User = users[sid]
+    leave_session(user)
+    users.pop(sid)
 
-            emit("solver started")
-        else:
-            print("ERROR: duplicate tasks.")
-            emit("end game")
+    log.info("User %r disconnected.", user.name, sid=sid, users=len(users))
 
 
-@socketio.on("end game")
-def end_game() -> None:
+@app.route("/")
+def index() -> str:
+    return render_template("index.html")
 
-    for u in users.values():
-        u.status = UserStatus.CONNECTED
-        u.player_index = None
 
-    print("Ending the game.")
+# ***********************************************************
+#        solve API
+# ***********************************************************
 
-    emit("game ended", broadcast=True)
 
+def api_error(message: str, status: int) -> tuple[Response, int]:
+    return jsonify({"error": message}), status
 
-@socketio.on("disconnect")
-def disconnect() -> None:
 
-    global users
+def api_job_to_dict(job: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "elapsed": job["elapsed"],
+        "check_result": job["check_result"],
+        "solution": job["result"],
+        "error": job["error"],
+    }
 
-    sid: str = get_sid()
-    users.pop(sid)
-    send_user_list()
 
-    print(f"User {users[sid].name!r} ({sid!r}) disconnected, user count: {len(users)}.")
+@app.route("/api/jobs", methods=["POST"])
+def submit_api_jobs() -> tuple[Response, int]:
+    """Queue one game or a list of games to be solved.
 
+    A game is a game state as JSON object, with the optional fields "parameters"
+    and "timeout" in seconds. Returns the id of the job, or the ids of all jobs in
+    the order of the games."""
+    data: Any = request.get_json(silent=True)
+    games: list[Any] = data if isinstance(data, list) else [data]
+    if not games or not all(isinstance(game, dict) for game in games):
+        return api_error("Expected a game state or a list of game states.", 400)
 
-@app.route("/")
-def index() -> str:
-    return render_template("index.html")
+    submissions: list[tuple[CrewGameParameters, CrewGameState, float | None]] = []
+    try:
+        for game in games:
+            submissions.append(
+                (
+                    parameters_from_dict(game["parameters"])
+                    if "parameters" in game
+                    else DEFAULT_PARAMETERS,
+                    game_state_from_dict(game),
+                    float(game["timeout"]) if game.get("timeout") is not None else None,
+                )
+            )
+    except (IndexError, KeyError, TypeError, ValueError) as e:
+        return api_error(f"Invalid game state: {e!r}.", 400)
+
+    job_ids: list[str] = []
+    with store.lock():
+        if len(store.queued_jobs()) + len(submissions) > MAX_QUEUED_SOLVER_JOBS:
+            return api_error("The solver queue is full.", 503)
+        for parameters, state, timeout in submissions:
+            job: dict[str, Any] = submit_job(parameters, state, timeout)
+            if not job["api"]:
+                # Keep running the game of a room even if the room stops waiting.
+                job["api"] = True
+                store.put_job(job)
+            job_ids.append(job["id"])
+    ensure_solver_dispatcher()
+
+    log.info("%d solver jobs submitted through the API.", len(job_ids), jobs=job_ids)
+
+    if isinstance(data, list):
+        return jsonify({"jobs": job_ids}), 202
+    return jsonify({"job": job_ids[0]}), 202
+
+
+@app.route("/api/jobs/<job_id>")
+def get_api_job(job_id: str) -> tuple[Response, int]:
+    job: dict[str, Any] | None = store.get_job(job_id)
+    if job is None:
+        return api_error(f"Unknown job {job_id!r}.", 404)
+    return jsonify(api_job_to_dict(job)), 200
+
+
+@app.route("/api/jobs/stream")
+def stream_api_jobs() -> Response | tuple[Response, int]:
+    """Stream the results of the jobs given by the comma separated ids parameter as
+    newline delimited JSON, in the order in which they finish."""
+    job_ids: list[str] = [i for i in request.args.get("ids", "").split(",") if i]
+    if not job_ids:
+        return api_error("No job ids given.", 400)
+    unknown: list[str] = [i for i in job_ids if store.get_job(i) is None]
+    if unknown:
+        return api_error(f"Unknown jobs: {unknown}.", 404)
+
+    def results() -> Iterator[str]:
+        pending: list[str] = list(dict.fromkeys(job_ids))
+        while pending:
+            for job_id in list(pending):
+                job: dict[str, Any] | None = store.get_job(job_id)
+                if job is None or job["status"] in FINAL_JOB_STATUSES:
+                    pending.remove(job_id)
+                    if job is not None:
+                        yield json.dumps(api_job_to_dict(job)) + "\n"
+            if pending:
+                socketio.sleep(SOLVER_POLL_INTERVAL)
+
+    return Response(stream_with_context(results()), mimetype="application/x-ndjson")
+
+
+@app.route("/api/rooms/<room>/events")
+def get_room_events(room: str) -> tuple[Response, int]:
+    if room_events is None:
+        return api_error("Room events are not recorded.", 404)
+    return jsonify({"events": room_events.events(room)}), 200
+
+
+@app.route("/metrics")
+def metrics() -> Response:
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
 
 
 def main() -> None:
-    socketio.run(app, host="0.0.0.0", allow_unsafe_werkzeug=True)
+    global room_events
+    room_events = configure_logging(
+        os.environ.get("CREWZ3R_LOG_LEVEL", "INFO").upper(),
+        room_buffer=int(os.environ.get("CREWZ3R_ROOM_EVENTS", 0)),
+    )
+    ensure_solver_dispatcher()
+    socketio.run(
+        app,
+        host="0.0.0.0",
+        port=int(os.environ.get("CREWZ3R_PORT", 5000)),
+        allow_unsafe_werkzeug=True,
+    )
 
 
 if __name__ == "__main__":
@@ -1,7 +1,11 @@
 const socket = io();
-let cards = [];
-let colors = new Set();
-let numbers = new Set();
+// The selectable cards, stored as "color,number" keys, and the version of the
+// deck on the server they correspond to.
+let cards = new Set();
+let deck_version = null;
+// The number of selectable cards per color and per number.
+let color_counts = new Map();
+let number_counts = new Map();
 
 //************************************************************
 //        Function Declarations
@@ -13,8 +17,27 @@ const emit_name = () => {
   socket.emit("update name", name.value);
 };
 
+// Joins the room given in the URL fragment, if any
+const join_room_from_url = () => {
+  const room = decodeURIComponent(window.location.hash.slice(1));
+
+  if (room !== "") {
+    socket.emit("join room", room);
+  }
+};
+
+// The form of the current selection phase, which holds the card buttons. The
+// buttons of the other phase may still exist, with the same ids and names.
+const selection_form = () =>
+  document.getElementById(
+    document.querySelector("main").classList.contains("task_selection")
+      ? "task_selection"
+      : "card_selection"
+  );
+
 const update_buttons = (prefix, ids) => {
-  let old_elements = document.querySelectorAll(`[id*=${prefix}_]`);
+  const form = selection_form();
+  let old_elements = form.querySelectorAll(`[id*=${prefix}_]`);
 
   for (const element of old_elements) {
     element.disabled = true;
@@ -22,7 +45,7 @@ const update_buttons = (prefix, ids) => {
 
   let id;
   for (id of ids) {
-    const element = document.getElementById(`${prefix}_${id}`);
+    const element = form.querySelector(`#${prefix}_${id}`);
 
     if (element) {
       element.disabled = false;
@@ -31,17 +54,13 @@ const update_buttons = (prefix, ids) => {
     }
   }
 
-  const checked_element = document.querySelector(`[id*=${prefix}_]:checked`);
+  const checked_element = form.querySelector(`[id*=${prefix}_]:checked`);
   if (checked_element && checked_element.disabled === true) {
     checked_element.checked = false;
   }
 };
 
 const add_new_button = (prefix, id) => {
-  let form = document.querySelector("main").classList.contains("task_selection")
-    ? "task_selection"
-    : "card_selection";
-
   const input_element = document.createElement("input");
   input_element.setAttribute("type", "radio");
   input_element.classList.add(prefix);
@@ -53,21 +72,96 @@ const add_new_button = (prefix, id) => {
   label_element.setAttribute("for", `${prefix}_${id}`);
   label_element.innerText = id;
 
-  document.getElementById(form).appendChild(input_element);
-  document.getElementById(form).appendChild(label_element);
+  selection_form().appendChild(input_element);
+  selection_form().appendChild(label_element);
+};
+
+const show_solution = (solution) => {
+  const table_element = document.getElementById("solver_result");
+  table_element.innerHTML = "";
+
+  solution.tricks.forEach((trick, index) => {
+    const row_element = document.createElement("tr");
+    const cells = [
+      index + 1,
+      trick.starting_player,
+      ...trick.played_cards.map((card) => `(${card[0]}, ${card[1]})`),
+      trick.winning_player,
+    ];
+
+    for (const cell of cells) {
+      const cell_element = document.createElement("td");
+      cell_element.innerText = cell;
+      row_element.appendChild(cell_element);
+    }
+    table_element.appendChild(row_element);
+  });
+};
+
+const set_solver_status = (status) => {
+  document.getElementById("solver_status").innerText = status;
+};
+
+const card_key = (card) => `${card[0]},${card[1]}`;
+
+const cards_contain_card = (card_comp) => cards.has(card_key(card_comp));
+
+const change_count = (counts, key, change) => {
+  const count = (counts.get(key) || 0) + change;
+
+  if (count > 0) {
+    counts.set(key, count);
+  } else {
+    counts.delete(key);
+  }
+  return count;
 };
 
-const cards_contain_card = (card_comp) => {
-  let contains_card = false;
+const disable_button = (prefix, id) => {
+  const element = selection_form().querySelector(`#${prefix}_${id}`);
 
-  for (const card of cards) {
-    if (card[0] === card_comp[0] && card[1] === card_comp[1]) {
-      contains_card = true;
-      break;
+  if (element) {
+    element.disabled = true;
+    element.checked = false;
+  }
+};
+
+// Enables only the color and number buttons that, together with the checked
+// number or color, still make up a selectable card.
+const refresh_card_buttons = () => {
+  const form = selection_form();
+  const number_element = form.querySelector("[name='card_number']:checked");
+  const color_element = form.querySelector("[name='card_color']:checked");
+  let number = number_element !== null ? parseInt(number_element.value) : null;
+  let color = color_element !== null ? parseInt(color_element.value) : null;
+
+  if (
+    number !== null &&
+    color !== null &&
+    !cards_contain_card([color, number])
+  ) {
+    // The checked card was taken by another player.
+    number_element.checked = false;
+    color_element.checked = false;
+    number = null;
+    color = null;
+  }
+
+  for (const item of color_counts.keys()) {
+    const element = form.querySelector(`#card_color_${item}`);
+
+    if (element) {
+      element.disabled = number !== null && !cards_contain_card([item, number]);
     }
   }
 
-  return contains_card;
+  for (const item of number_counts.keys()) {
+    const element = form.querySelector(`#card_number_${item}`);
+
+    if (element) {
+      element.disabled = color !== null && !cards_contain_card([color, item]);
+    }
+  }
 };
 
 //************************************************************
@@ -79,6 +173,7 @@ const cards_contain_card = (card_comp) => {
 socket.on("connect", () => {
   document.getElementById("connection-banner").classList.add("connected");
   emit_name();
+  join_room_from_url();
 });
 
 socket.on("disconnect", () => {
@@ -87,6 +182,16 @@ socket.on("disconnect", () => {
 
 // start page
 
+socket.on("room joined", (room) => {
+  document.querySelector("[data-room]").innerText = room;
+  document.getElementById("room_error").innerText = "";
+  window.location.hash = encodeURIComponent(room);
+});
+
+socket.on("room error", (message) => {
+  document.getElementById("room_error").innerText = message;
+});
+
 socket.on("user list", (user_string) => {
   const users_element = document.getElementById("users");
   const user_count_element = document.querySelector("[data-user-count]");
@@ -126,21 +231,55 @@ socket.on("game ended", () => {
   console.log("game ended");
   document.querySelector("main").classList.remove("task_selection");
   document.querySelector("main").classList.remove("card_selection");
+  document.querySelector("main").classList.remove("solving");
+  document.getElementById("task_check").innerHTML = "";
 });
 
-socket.on("cards updated", (cardsJsonString) => {
-  cards = JSON.parse(cardsJsonString);
+// A full snapshot of the selectable cards, sent when a selection starts or when
+// the client requests a resync.
+socket.on("cards snapshot", (snapshotJsonString) => {
+  const snapshot = JSON.parse(snapshotJsonString);
+
+  deck_version = snapshot.version;
+  cards.clear();
+  color_counts.clear();
+  number_counts.clear();
+
+  for (const item of snapshot.cards) {
+    cards.add(card_key(item));
+    change_count(color_counts, item[0], 1);
+    change_count(number_counts, item[1], 1);
+  }
+
+  update_buttons("card_color", Array.from(color_counts.keys()).sort());
+  update_buttons("card_number", Array.from(number_counts.keys()).sort());
+  refresh_card_buttons();
+});
 
-  colors.clear();
-  numbers.clear();
+// A single card was taken, which disables the buttons of its color and number
+// once no card of them is left, and the buttons that only made up that card
+// with the checked number or color.
+socket.on("card removed", (removalJsonString) => {
+  const removal = JSON.parse(removalJsonString);
 
-  for (const item of cards) {
-    colors.add(item[0]);
-    numbers.add(item[1]);
+  if (deck_version === null || removal.version !== deck_version + 1) {
+    // An update was missed.
+    socket.emit("resync");
+    return;
   }
+  deck_version = removal.version;
 
-  update_buttons("card_color", Array.from(colors).sort());
-  update_buttons("card_number", Array.from(numbers).sort());
+  const [color, number] = removal.card;
+  if (!cards.delete(card_key(removal.card))) {
+    return;
+  }
+  if (change_count(color_counts, color, -1) === 0) {
+    disable_button("card_color", color);
+  }
+  if (change_count(number_counts, number, -1) === 0) {
+    disable_button("card_number", number);
+  }
+  refresh_card_buttons();
 });
 
 socket.on("selected cards updated", (cardsJsonString) => {
@@ -151,6 +290,60 @@ socket.on("selected tasks updated", (cardsJsonString) => {
   document.getElementById("selected_tasks").innerHTML = cardsJsonString;
 });
 
+// The result of the quick check of all tasks chosen so far.
+socket.on("task check", (result) => {
+  const hints = {
+    sat: "Die Aufträge sind erfüllbar.",
+    unsat: "Die Aufträge sind nicht mehr erfüllbar.",
+    unknown: "Die Erfüllbarkeit der Aufträge ist unklar.",
+  };
+  document.getElementById("task_check").innerHTML = hints[result];
+});
+
+// solver
+
+socket.on("solver started", () => {
+  console.log("solver started");
+  document.querySelector("main").classList.add("solving");
+  document.getElementById("solver_result").innerHTML = "";
+  set_solver_status("Lösung wird berechnet …");
+});
+
+socket.on("solver queued", (position) => {
+  set_solver_status(`Warte auf freien Rechenplatz … (Position ${position})`);
+});
+
+socket.on("solver rejected", (error) => {
+  document.querySelector("main").classList.remove("solving");
+  alert(`Die Berechnung konnte nicht gestartet werden: ${error}`);
+});
+
+socket.on("solver progress", (progressJsonString) => {
+  const progress = JSON.parse(progressJsonString);
+  set_solver_status(
+    `Lösung wird berechnet … (${progress.status}, ${progress.elapsed}s)`
+  );
+});
+
+socket.on("solver finished", (solutionJsonString) => {
+  const solution = JSON.parse(solutionJsonString);
+
+  if (solution === null) {
+    set_solver_status("Es gibt keine Lösung.");
+  } else {
+    set_solver_status("Lösung:");
+    show_solution(solution);
+  }
+});
+
+socket.on("solver failed", (error) => {
+  set_solver_status(`Fehler beim Berechnen der Lösung: ${error}`);
+});
+
+socket.on("solver cancelled", () => {
+  set_solver_status("Berechnung abgebrochen.");
+});
+
 //************************************************************
 //        Initialization of EventListeners
 //************************************************************
@@ -160,6 +353,16 @@ document.getElementById("name").addEventListener("submit", (event) => {
   emit_name();
 });
 
+document.getElementById("room").addEventListener("submit", (event) => {
+  event.preventDefault();
+  const room = document.querySelector("[name='room']");
+  socket.emit("join room", room.value);
+});
+
+document.getElementById("create_room").addEventListener("click", () => {
+  socket.emit("create room");
+});
+
 document.getElementById("start_game").addEventListener("click", () => {
   socket.emit("start card selection");
 });
@@ -175,8 +378,9 @@ document
   });
 
 const submitCardListener = () => {
-  const number_element = document.querySelector("[name='card_number']:checked");
-  const color_element = document.querySelector("[name='card_color']:checked");
+  const form = selection_form();
+  const number_element = form.querySelector("[name='card_number']:checked");
+  const color_element = form.querySelector("[name='card_color']:checked");
 
   if (number_element !== null && color_element !== null) {
     const number = parseInt(number_element.value);
@@ -194,25 +398,10 @@ document
   .getElementById("submit_task")
   .addEventListener("click", () => submitCardListener());
 
-document.getElementById("card_selection").addEventListener("change", () => {
-  const number_element = document.querySelector("[name='card_number']:checked");
-  const color_element = document.querySelector("[name='card_color']:checked");
-
-  if (number_element !== null) {
-    const number = parseInt(number_element.value);
-
-    for (const color of colors) {
-      document.getElementById(`card_color_${color}`).disabled =
-        !cards_contain_card([color, number]);
-    }
-  }
-
-  if (color_element !== null) {
-    const color = parseInt(color_element.value);
+document
+  .getElementById("card_selection")
+  .addEventListener("change", () => refresh_card_buttons());
 
-    for (const number of numbers) {
-      document.getElementById(`card_number_${number}`).disabled =
-        !cards_contain_card([color, number]);
-    }
-  }
-});
+document
+  .getElementById("task_selection")
+  .addEventListener("change", () => refresh_card_buttons());
@@ -0,0 +1,14 @@
+import pytest
+
+from crewz3r.crew_types import CardDistribution
+
+
+@pytest.fixture
+def example_hands() -> CardDistribution:
+    """The hands of example game 1, where player 4 starts."""
+    return [
+        [(1, 5), (2, 3), (-1, 3)],
+        [(2, 5), (2, 4), (-1, 2)],
+        [(3, 8), (2, 7), (1, 3)],
+        [(1, 6), (2, 2), (1, 7)],
+    ]
@@ -0,0 +1,46 @@
+from crewz3r.crew_benchmark import (
+    STARTUP_COMMANDS,
+    BenchmarkInstance,
+    compare_results,
+    measure_startup,
+    run_instance,
+)
+from crewz3r.crew_example_games import random_game_mission_26
+
+
+def test_seeded_deals() -> None:
+    first = random_game_mission_26(seed=3).player_hands
+    assert random_game_mission_26(seed=3).player_hands == first
+    assert random_game_mission_26(seed=4).player_hands != first
+
+
+def test_compare_results() -> None:
+    result = run_instance(BenchmarkInstance("example", 1))
+    assert result["name"] == "example 1"
+    assert result["result"] == "sat"
+    assert result["violation"] is None
+    assert result["witness"]
+    assert result["statistics"]["decisions"] >= 0
+    baseline = {"results": [result]}
+    assert compare_results({"results": [result]}, baseline) == []
+
+    slower = result | {"check_seconds": result["check_seconds"] * 2 + 1}
+    changed = result | {"result": "unknown"}
+    assert len(compare_results({"results": [slower]}, baseline)) == 1
+    invalid = result | {"violation": "Trick 1 is started with a trump card."}
+    assert len(compare_results({"results": [changed]}, baseline)) == 1
+    assert len(compare_results({"results": [invalid]}, baseline)) == 1
+    # The playouts found a solution, which contradicts the result.
+    contradicted = result | {"result": "unsat"}
+    assert len(compare_results({"results": [contradicted]}, baseline)) == 2
+
+
+def test_startup() -> None:
+    startup = measure_startup(repeat=1)
+    assert set(startup) == set(STARTUP_COMMANDS)
+    assert all(seconds > 0 for seconds in startup.values())
+
+    report = {"startup": startup, "results": []}
+    assert compare_results(report, report) == []
+    slower = {"startup": startup | {"server": startup["server"] * 2 + 1}}
+    assert len(compare_results(slower | {"results": []}, report)) == 1
@@ -0,0 +1,60 @@
+from crewz3r.crew_endgame import EndgameCache, EndgamePosition, EndgameSearch
+from crewz3r.crew_rules import verify_solution
+from crewz3r.crew_tasks import NullGame, SpecialTask, Task, WinTricksWithSpecificValues
+from crewz3r.crew_types import CardDistribution
+from crewz3r.crew_utils import DEFAULT_PARAMETERS, CrewGameSolution, CrewGameState
+
+
+def test_endgame_cache() -> None:
+    cache = EndgameCache(max_entries=2)
+    assert cache.get("a") is None
+    cache.put("a", True)
+    cache.put("b", False)
+    assert cache.get("a") is True
+    cache.put("c", True)
+    # "b" was used least recently.
+    assert cache.get("b") is None
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 2}
+
+
+def test_endgame_search(example_hands: CardDistribution) -> None:
+    cache = EndgameCache()
+    state = CrewGameState(
+        example_hands, 4, [Task((1, 7), 1, 1, True), Task((2, 4), 4, 2, True)]
+    )
+    search = EndgameSearch(DEFAULT_PARAMETERS, state, cache)
+    position = search.initial_position()
+    assert search.solvable(position)
+    tricks = search.solution(position)
+    assert tricks is not None
+    assert verify_solution(DEFAULT_PARAMETERS, CrewGameSolution(state, tricks)) is None
+    assert cache.stats()["hits"] > 0
+
+    misses = cache.stats()["misses"]
+    assert EndgameSearch(DEFAULT_PARAMETERS, state, cache).solvable(position)
+    assert cache.stats()["misses"] == misses
+
+    assert search.playable_cards(position, [None] * 4, 4) == {
+        (1, 6): False,
+        (1, 7): False,
+        (2, 2): True,
+    }
+    after = search.play_trick(position, [(2, 3), (2, 5), (2, 7), (2, 2)])
+    assert after is not None
+    assert after == EndgamePosition(after.hands, 3, 2, 0)
+    assert search.solvable(after)
+    assert search.play_trick(position, [(2, 3), (2, 5), (2, 7), (1, 6)]) is None
+
+
+def test_endgame_special_tasks(example_hands: CardDistribution) -> None:
+    def solvable(*special_tasks: SpecialTask) -> bool:
+        state = CrewGameState(example_hands, 4, [], list(special_tasks))
+        search = EndgameSearch(DEFAULT_PARAMETERS, state, EndgameCache())
+        return search.solvable(search.initial_position())
+
+    assert solvable(WinTricksWithSpecificValues(7))
+    assert solvable(WinTricksWithSpecificValues(7, 2))
+    assert not solvable(WinTricksWithSpecificValues(5, 2))
+    # Player 1 wins the trick with the highest trump card (-1, 3).
+    assert not solvable(NullGame(1))
+    assert solvable(NullGame(2))
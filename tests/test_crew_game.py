@@ -0,0 +1,215 @@
+import threading
+
+import pytest
+from z3 import sat, unknown, unsat
+
+from crewz3r.crew_example_games import example_game, random_game_mission_26
+from crewz3r.crew_game import RULE_FAMILIES, CrewGame
+from crewz3r.crew_rules import verify_solution
+from crewz3r.crew_tasks import SpecialTask, Task, WinTricksWithSpecificValues
+from crewz3r.crew_utils import DEFAULT_PARAMETERS, CrewGameState, SolverConfig
+
+
+def solved_game() -> CrewGame:
+    game = example_game(1)
+    game.solve()
+    assert game.has_solution()
+    return game
+
+
+def test_get_solution() -> None:
+    game = solved_game()
+    solution = game.get_solution()
+    assert len(solution.tricks) == game.NUMBER_OF_TRICKS
+    # The replay checks the cards, active colour, starting and winning player of
+    # each trick.
+    assert verify_solution(game.parameters, solution) is None
+
+    fields = ("played_cards", "winning_player")
+    partial = game.get_solution(fields=fields)
+    assert verify_solution(game.parameters, partial) is None
+    for trick, full in zip(partial.tricks, solution.tricks):
+        assert trick.played_cards == full.played_cards
+        assert trick.winning_player == full.winning_player
+        assert trick.active_colour is None
+        assert trick.starting_player is None
+    with pytest.raises(ValueError):
+        game.get_solution(fields=("winner",))
+
+
+def test_statistics() -> None:
+    game = solved_game()
+    statistics = game.statistics
+    assert set(statistics.phase_seconds) == {"rules", "tasks", "check"}
+    assert set(statistics.assertions) <= set(RULE_FAMILIES)
+    assert statistics.assertions["distinct_cards"] == 1
+    assert statistics.assertions["tasks"] > 0
+    assert len(game.solver.assertions()) == sum(statistics.assertions.values())
+    assert statistics.solver["decisions"] >= 0
+
+
+def test_solver_config() -> None:
+    for config in (
+        SolverConfig(params={"smt.arith.solver": 2, "smt.random_seed": 3}),
+        SolverConfig(tactic="simplify+solve-eqs+propagate-values+smt"),
+    ):
+        game = example_game(1, config)
+        game.solve()
+        assert game.has_solution()
+        assert len(game.get_solution().tricks) == game.NUMBER_OF_TRICKS
+
+
+def test_solve_with_budget() -> None:
+    game = example_game(1)
+    assert game.solve(rlimit=1000) == unknown
+    assert game.has_solution() is None
+    with pytest.raises(ValueError):
+        game.get_solution()
+
+    # Resuming with a larger budget keeps the built constraints.
+    assert game.solve(rlimit=10**9) == sat
+    assert game.has_solution()
+    assert game.reason_unknown is None
+
+
+def test_interrupt() -> None:
+    game = random_game_mission_26(seed=26)
+    assert not game.interrupt()
+    threading.Timer(0.2, game.interrupt).start()
+    assert game.solve(timeout=30) == unknown
+    assert game.reason_unknown == "interrupted"
+    # The game can still be solved after an interrupt.
+    game.solver.add(game.trick_winners[0] == 0)
+    assert game.solve() == unsat
+
+
+def test_late_interrupt() -> None:
+    game = example_game(1)
+    assert game.solve() == sat
+    statistics = dict(game.statistics.solver)
+    # An interrupt without a running check, or one that reaches z3 after the
+    # check has returned, has no effect.
+    assert not game.interrupt()
+    game.solver.interrupt()
+    assert game.statistics.solver == statistics
+    assert game.solve() == sat
+    assert game.reason_unknown is None
+
+    # Interrupts racing with the start and end of many checks never make a check
+    # return unsat.
+    done = threading.Event()
+
+    def interrupt() -> None:
+        while not done.wait(0.001):
+            game.interrupt()
+
+    thread = threading.Thread(target=interrupt)
+    thread.start()
+    try:
+        results = [game.check() for _ in range(30)]
+    finally:
+        done.set()
+        thread.join()
+    assert unsat not in results
+    assert game.solve() == sat
+
+
+def test_observe_tricks() -> None:
+    game = solved_game()
+    first_trick = game.get_solution().tricks[0].played_cards
+    assert first_trick is not None
+
+    assert game.observe_trick(first_trick) == sat
+    assert game.observe_trick([None, None, (1, 3), None]) == unsat
+    # An incomplete trick is replaced by the next observation.
+    assert game.observe_trick([None, None, (3, 8), None]) == sat
+    assert len(game.observed_tricks) == 2
+    assert game.get_solution().tricks[0].played_cards == first_trick
+
+    game.retract_all_tricks()
+    assert game.observed_tricks == []
+    with pytest.raises(ValueError):
+        game.observe_trick([(2, 5), None, None, None])
+
+
+def test_playable_cards() -> None:
+    game = example_game(1)
+    assert game.playable_cards(4) == {(1, 6): unsat, (2, 2): sat, (1, 7): unsat}
+
+    game.observe_trick([None, None, None, (2, 2)])
+    assert game.playable_cards(4) == {(1, 6): unsat, (1, 7): sat}
+    assert game.playable_cards(2) == {(2, 5): sat, (2, 4): unsat, (-1, 2): unsat}
+
+
+def test_guarded_tasks() -> None:
+    game = example_game(1)
+    hands = CrewGameState(game.player_hands, game.initial_state.active_player)
+    game = CrewGame(game.parameters, hands)
+
+    first = game.add_guarded_task(Task((1, 7), 1))
+    assert game.solver.check(first) == sat
+    # Player 1 holds the highest trump, so player 2 can't win it.
+    second = game.add_guarded_task(Task((-1, 3), 2))
+    assert game.solver.check(first, second) == unsat
+    assert game.solver.check(first) == sat
+
+    with pytest.raises(ValueError):
+        game.add_guarded_task(Task((2, 4), 4, 1))
+    with pytest.raises(ValueError):
+        game.add_guarded_task(Task((2, 4)))
+
+
+def test_win_tricks_with_specific_values() -> None:
+    hands = example_game(1).player_hands
+    special_tasks: list[SpecialTask] = [
+        WinTricksWithSpecificValues(5, 1),
+        WinTricksWithSpecificValues(7, 1),
+    ]
+    game = CrewGame(DEFAULT_PARAMETERS, CrewGameState(hands, 4, [], special_tasks))
+    game.solve()
+    assert game.has_solution()
+    for value in (5, 7):
+        assert any(
+            trick.played_cards is not None
+            and trick.winning_player is not None
+            and trick.played_cards[trick.winning_player - 1]
+            == (trick.active_colour, value)
+            for trick in game.get_solution().tricks
+        )
+
+    special_tasks = [WinTricksWithSpecificValues(5, 2)]
+    game = CrewGame(DEFAULT_PARAMETERS, CrewGameState(hands, 4, [], special_tasks))
+    game.solve()
+    assert not game.has_solution()
+
+
+def test_absolute_task_order() -> None:
+    hands = example_game(1).player_hands
+
+    def solvable(orders: tuple[int, int, int]) -> bool:
+        tasks = [
+            Task(card, player, order)
+            for card, player, order in zip([(1, 7), (2, 4), (2, 5)], [1, 3, 1], orders)
+        ]
+        game = CrewGame(DEFAULT_PARAMETERS, CrewGameState(hands, 4, tasks))
+        game.solve()
+        return bool(game.has_solution())
+
+    assert solvable((2, 1, 0))
+    assert solvable((-1, 1, 0))
+    assert not solvable((1, 2, 0))
+    assert not solvable((1, 0, 0))
+
+    # Each absolute order has a bound of its own.
+    game = CrewGame(
+        DEFAULT_PARAMETERS, CrewGameState(hands, 4, [Task((1, 7), 1), Task((2, 4), 3)])
+    )
+    game.add_task_constraint_absolute_order([(1, 7)])
+    game.add_task_constraint_absolute_order([(2, 4)])
+    assert len({str(bound) for bound in game.unordered_task_bounds}) == 2
+
+
+def test_task_completed_in_first_trick() -> None:
+    hands = example_game(1).player_hands
+    game = CrewGame(DEFAULT_PARAMETERS, CrewGameState(hands, 4, [Task((2, 2), 3)]))
+    assert game.observe_trick([(2, 3), (2, 5), (2, 7), (2, 2)]) == sat
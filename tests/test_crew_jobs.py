@@ -0,0 +1,133 @@
+import time
+
+import pytest
+
+from crewz3r import crew_jobs
+from crewz3r.crew_example_games import example_game
+from crewz3r.crew_jobs import JobStatus, PrebuiltGame, SolverJob, WorkerPool
+from crewz3r.crew_json import solution_from_dict
+from crewz3r.crew_tasks import Task
+from crewz3r.crew_utils import CrewGameState
+
+
+def wait(job: SolverJob, timeout: float = 60) -> None:
+    end = time.monotonic() + timeout
+    while not job.poll() and time.monotonic() < end:
+        time.sleep(0.05)
+
+
+def test_solver_job(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Example game 1 is solved by the playouts, which are skipped to test z3.
+    monkeypatch.setattr(crew_jobs, "WITNESS_TIME_LIMIT", 0)
+    game = example_game(1)
+    job = SolverJob(game.parameters, game.initial_state)
+    job.start()
+    wait(job)
+    assert job.status == JobStatus.FINISHED
+    assert job.check_result == "sat"
+    assert set(job.timings) == {"build", "check"}
+    assert job.result is not None
+    solution = solution_from_dict(job.result)
+    assert len(solution.tricks) == game.NUMBER_OF_TRICKS
+    assert solution.initial_state.hands == game.player_hands
+
+
+def test_solver_job_with_witness() -> None:
+    game = example_game(1)
+    job = SolverJob(game.parameters, game.initial_state)
+    job.start()
+    wait(job)
+    assert job.status == JobStatus.FINISHED
+    assert job.check_result == "sat"
+    assert set(job.timings) == {"witness"}
+    assert job.result is not None
+
+
+def test_cancel_solver_job() -> None:
+    game = example_game(1)
+    job = SolverJob(game.parameters, game.initial_state)
+    job.start()
+    job.cancel()
+    assert job.status == JobStatus.CANCELLED
+    assert job.poll()
+
+
+def test_worker_pool() -> None:
+    game = example_game(1)
+    pool = WorkerPool(max_workers=1)
+    job = pool.start(game.parameters, game.initial_state)
+    assert pool.free_workers == 0
+    with pytest.raises(ValueError):
+        pool.start(game.parameters, game.initial_state)
+
+    end = time.monotonic() + 60
+    done: list[SolverJob] = []
+    while not done and time.monotonic() < end:
+        done = pool.poll()
+        time.sleep(0.05)
+    assert done == [job]
+    assert job.status == JobStatus.FINISHED
+    assert pool.free_workers == 1
+
+    job = pool.start(game.parameters, game.initial_state)
+    pool.shutdown()
+    assert job.status == JobStatus.CANCELLED
+    assert pool.running_jobs() == []
+
+
+def test_solver_job_with_prebuilt_game(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(crew_jobs, "WITNESS_TIME_LIMIT", 0)
+    game = example_game(1)
+    prebuilt = PrebuiltGame(
+        game.parameters,
+        CrewGameState(game.player_hands, game.initial_state.active_player),
+    )
+    job = SolverJob(game.parameters, game.initial_state, prebuilt=prebuilt)
+    assert job.prebuilt is prebuilt
+    job.start()
+    wait(job)
+    assert job.status == JobStatus.FINISHED
+    assert job.check_result == "sat"
+    assert set(job.timings) == {"build", "check"}
+    assert job.result is not None
+    assert len(job.result["initial_state"]["tasks"]) == len(game.initial_state.tasks)
+
+    # A prebuilt game for other hands is not used.
+    other_hands = CrewGameState(game.player_hands[::-1], 1)
+    prebuilt = PrebuiltGame(game.parameters, other_hands)
+    job = SolverJob(game.parameters, game.initial_state, prebuilt=prebuilt)
+    assert job.prebuilt is None
+    assert not prebuilt.process.is_alive()
+
+
+def test_prebuilt_game_task_checks(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(crew_jobs, "WITNESS_TIME_LIMIT", 0)
+    game = example_game(1)
+    hands = CrewGameState(game.player_hands, game.initial_state.active_player)
+    prebuilt = PrebuiltGame(game.parameters, hands)
+    tasks = [Task((1, 7), 1), Task((2, 4), 4)]
+
+    def wait_for_check() -> tuple[int, str] | None:
+        end = time.monotonic() + 60
+        while (result := prebuilt.poll_check()) is None and time.monotonic() < end:
+            time.sleep(0.05)
+        return result
+
+    # Only the result of the latest check is returned.
+    prebuilt.check_tasks(tasks[:1], 10)
+    check_id = prebuilt.check_tasks(tasks, 10)
+    assert wait_for_check() == (check_id, "sat")
+    check_id = prebuilt.check_tasks(tasks + [Task((-1, 3), 2)], 10)
+    assert wait_for_check() == (check_id, "unsat")
+
+    # The guards of the checked tasks are reused for solving.
+    state = CrewGameState(game.player_hands, hands.active_player, tasks)
+    job = SolverJob(game.parameters, state, prebuilt=prebuilt)
+    assert job.prebuilt is prebuilt
+    job.start()
+    wait(job)
+    assert job.status == JobStatus.FINISHED
+    assert job.check_result == "sat"
+    assert set(job.timings) == {"build", "check"}
+    assert job.result is not None
+    assert len(job.result["initial_state"]["tasks"]) == len(tasks)
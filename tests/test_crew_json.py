@@ -0,0 +1,38 @@
+from crewz3r.crew_json import (
+    game_state_from_dict,
+    game_state_to_dict,
+    special_task_from_dict,
+    special_task_to_dict,
+)
+from crewz3r.crew_tasks import (
+    AssignTrickToPlayer,
+    NoTricksWithValueTask,
+    NullGame,
+    Task,
+    WinTricksWithSpecificValues,
+)
+from crewz3r.crew_utils import CrewGameState
+
+
+def test_special_task_round_trip() -> None:
+    for task in (
+        NoTricksWithValueTask(9),
+        AssignTrickToPlayer(2, 3),
+        NullGame(1),
+        WinTricksWithSpecificValues(1, 2),
+    ):
+        copy = special_task_from_dict(special_task_to_dict(task))
+        assert type(copy) is type(task)
+        assert vars(copy) == vars(task)
+
+
+def test_game_state_round_trip() -> None:
+    state = CrewGameState(
+        [[(-1, 3), (0, 1)], [(1, 2), (2, 5)]],
+        2,
+        [Task((0, 1), 1, 1, True), Task((2, 5), 2, -1)],
+        [NullGame(1)],
+    )
+    data = game_state_to_dict(state)
+    assert game_state_to_dict(game_state_from_dict(data)) == data
+    assert game_state_from_dict(data).hands == state.hands
@@ -0,0 +1,56 @@
+import io
+import json
+import logging
+
+from crewz3r.crew_log import configure_logging, get_logger
+
+
+class Expensive:
+    def __init__(self) -> None:
+        self.formatted = 0
+
+    def __str__(self) -> str:
+        self.formatted += 1
+        return "state"
+
+
+def test_json_lines() -> None:
+    stream = io.StringIO()
+    configure_logging(logging.INFO, stream=stream)
+    log = get_logger("crewz3r.test").bind(room="table")
+    state = Expensive()
+
+    log.info("Card %s was taken.", 3, sid="abc")
+    log.debug("State: %s", state)
+    assert state.formatted == 0
+
+    event = json.loads(stream.getvalue())
+    assert event["level"] == "INFO"
+    assert event["message"] == "Card 3 was taken."
+    assert event["room"] == "table"
+    assert event["sid"] == "abc"
+
+
+def test_room_event_buffer() -> None:
+    stream = io.StringIO()
+    buffer = configure_logging(
+        logging.WARNING, room_buffer=2, buffer_level=logging.DEBUG, stream=stream
+    )
+    assert buffer is not None
+    log = get_logger("crewz3r.test")
+    state = ["card"]
+
+    for i in range(2):
+        log.info("Event %d", i, room="table")
+    log.debug("State: %s", state, room="table")
+    state.append("task")
+    log.info("Other room", room="other")
+
+    assert stream.getvalue() == ""
+    assert [e["message"] for e in buffer.events("table")] == [
+        "Event 1",
+        "State: ['card']",
+    ]
+    assert buffer.events("other")[0]["room"] == "other"
+    buffer.clear("other")
+    assert buffer.events("other") == []
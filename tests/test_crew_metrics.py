@@ -0,0 +1,42 @@
+import pytest
+
+from crewz3r.crew_metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+def test_counter() -> None:
+    requests = Counter("requests", "Requests.", ("result",))
+    requests.inc(result="hit")
+    requests.inc(2, result="hit")
+    assert requests.value(result="hit") == 3
+    assert requests.value(result="miss") == 0
+    with pytest.raises(ValueError):
+        requests.inc(cache="jobs")
+    assert requests.render() == (
+        "# HELP requests Requests.\n"
+        "# TYPE requests counter\n"
+        'requests_total{result="hit"} 3.0'
+    )
+
+
+def test_histogram() -> None:
+    seconds = Histogram("seconds", "Seconds.", buckets=(0.1, 1.0))
+    seconds.observe(0.05)
+    seconds.observe(0.5)
+    seconds.observe(2.0)
+    assert seconds.count() == 3
+    lines = seconds.render().splitlines()[2:]
+    assert lines == [
+        'seconds_bucket{le="0.1"} 1.0',
+        'seconds_bucket{le="1.0"} 2.0',
+        'seconds_bucket{le="+Inf"} 3.0',
+        "seconds_sum 2.55",
+        "seconds_count 3.0",
+    ]
+
+
+def test_registry() -> None:
+    registry = MetricsRegistry()
+    registry.register(Gauge("users", "Users.", function=lambda: 4))
+    with pytest.raises(ValueError):
+        registry.register(Gauge("users", "Users."))
+    assert registry.render().endswith("users 4.0\n")
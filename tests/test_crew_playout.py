@@ -0,0 +1,48 @@
+import random
+
+from crewz3r.crew_example_games import example_game, random_game_state
+from crewz3r.crew_playout import Playouts, find_witness
+from crewz3r.crew_rules import task_predecessors, verify_solution
+from crewz3r.crew_tasks import NullGame, Task
+from crewz3r.crew_types import Card
+from crewz3r.crew_utils import DEFAULT_PARAMETERS, CrewGameState
+
+
+def test_task_predecessors() -> None:
+    relative = [Task((0, 1), 1, 2, True), Task((0, 2), 1), Task((0, 3), 1, 1, True)]
+    assert task_predecessors(relative) == [0b100, 0, 0]
+    absolute = [Task((0, 1), 1, 2), Task((0, 2), 1), Task((0, 3), 1, 1)]
+    assert task_predecessors(absolute) == [0b100, 0b101, 0]
+    last = [Task((0, 1), 1, -1), Task((0, 2), 1), Task((0, 3), 1, 1)]
+    assert task_predecessors(last) == [0b110, 0b100, 0]
+
+
+def test_find_witness() -> None:
+    game = example_game(1)
+    solution = find_witness(game.parameters, game.initial_state, seed=1)
+    assert solution is not None
+    assert verify_solution(game.parameters, solution) is None
+    assert solution.initial_state is game.initial_state
+
+    # Task (1, 7) to player 1 and a null game for player 1 contradict each other.
+    state = CrewGameState(game.player_hands, 4, [Task((1, 7), 1)], [NullGame(1)])
+    assert find_witness(DEFAULT_PARAMETERS, state, playouts=100) is None
+    assert find_witness(DEFAULT_PARAMETERS, CrewGameState()) is None
+
+
+def test_playouts_are_seeded() -> None:
+    deal = random_game_state(DEFAULT_PARAMETERS, seed=1)
+    state = CrewGameState(deal.hands, deal.active_player)
+
+    def playouts(seed: int) -> list[list[list[Card] | None] | None]:
+        games = Playouts(DEFAULT_PARAMETERS, state, random.Random(seed))
+        solutions = [games.playout() for _ in range(5)]
+        return [
+            [trick.played_cards for trick in solution.tricks] if solution else None
+            for solution in solutions
+        ]
+
+    first = playouts(1)
+    assert any(first)
+    assert playouts(1) == first
+    assert playouts(2) != first
@@ -0,0 +1,25 @@
+from z3 import And, Bool, Or
+
+from crewz3r.crew_example_games import example_game
+from crewz3r.crew_game import CrewGame
+from crewz3r.crew_profile import constraint_size, format_profile, profile_rules
+from crewz3r.crew_tasks import Task
+from crewz3r.crew_utils import DEFAULT_PARAMETERS, CrewGameState
+
+
+def test_constraint_size() -> None:
+    a, b = Bool("a"), Bool("b")
+    # The nodes a, b, And and Or; a and b are the only literals.
+    assert constraint_size([And(a, b), Or(a, And(a, b))]) == (4, 2)
+
+
+def test_unsat_core() -> None:
+    hands = example_game(1).player_hands
+    # Player 1 holds the highest trump card, so player 2 can't win its trick.
+    game = CrewGame(DEFAULT_PARAMETERS, CrewGameState(hands, None, [Task((-1, 3), 2)]))
+    profile = profile_rules(game, leave_one_out=True)
+    assert profile.result == "unsat"
+    assert profile.families[0].leave_out_result == "sat"
+    assert {f.family for f in profile.families if f.in_core} >= {"tasks"}
+    assert {f.family for f in profile.families} == set(game.rule_constraints)
+    assert "tasks" in format_profile(profile)
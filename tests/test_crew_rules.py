@@ -0,0 +1,146 @@
+import dataclasses
+from typing import Callable, TypeAlias
+
+import pytest
+
+from crewz3r.crew_example_games import example_game, random_game_state
+from crewz3r.crew_rules import (
+    card_mask,
+    colour_mask,
+    decode_card,
+    encode_card,
+    trick_winner,
+    verify_solution,
+)
+from crewz3r.crew_tasks import (
+    AssignTrickToPlayer,
+    NoTricksWithValueTask,
+    NullGame,
+    SpecialTask,
+    Task,
+    WinTricksWithSpecificValues,
+)
+from crewz3r.crew_types import CardDistribution
+from crewz3r.crew_utils import (
+    DEFAULT_PARAMETERS,
+    TRUMP_COLOUR,
+    CrewGameSolution,
+    CrewGameState,
+    CrewGameTrick,
+)
+
+# A solution of example game 1.
+TRICKS = [
+    CrewGameTrick([(2, 3), (2, 5), (2, 7), (2, 2)], 2, 4, 3),
+    CrewGameTrick([(-1, 3), (-1, 2), (3, 8), (1, 7)], 3, 3, 1),
+    CrewGameTrick([(1, 5), (2, 4), (1, 3), (1, 6)], 1, 1, 4),
+]
+
+Verify: TypeAlias = Callable[..., str | None]
+
+
+@pytest.fixture
+def verify(example_hands: CardDistribution) -> Verify:
+    def verify(
+        tricks: list[CrewGameTrick] = TRICKS,
+        tasks: list[Task] | None = None,
+        special_tasks: list[SpecialTask] | None = None,
+    ) -> str | None:
+        state = CrewGameState(example_hands, 4, tasks or [], special_tasks or [])
+        return verify_solution(DEFAULT_PARAMETERS, CrewGameSolution(state, tricks))
+
+    return verify
+
+
+def test_card_encoding() -> None:
+    for card in ((-1, 4), (0, 1), (3, 9)):
+        assert decode_card(encode_card(card)) == card
+    hand = card_mask([(0, 1), (0, 9), (2, 3)])
+    assert bin(hand & colour_mask(0)).count("1") == 2
+    assert hand & colour_mask(1) == 0
+
+    codes = [encode_card(c) for c in ((1, 3), (1, 9), (2, 9), (-1, 1))]
+    assert trick_winner(codes, 1) == 4
+    assert trick_winner(codes[:3], 1) == 2
+    assert trick_winner(codes[:3], 3) == 3
+
+
+def test_verify_solver_solution(example_hands: CardDistribution) -> None:
+    game = example_game(1)
+    assert game.player_hands == example_hands
+    game.solve()
+    assert verify_solution(game.parameters, game.get_solution()) is None
+
+
+def test_random_game_state() -> None:
+    for seed in range(20):
+        state, again = random_game_state(seed=seed), random_game_state(seed=seed)
+        assert state.hands == again.hands
+        task_cards = [task.card for task in state.tasks]
+        assert task_cards == [task.card for task in again.tasks]
+        assert all(card[0] != TRUMP_COLOUR for card in task_cards)
+
+
+def test_verify_tricks(example_hands: CardDistribution, verify: Verify) -> None:
+    assert verify() is None
+    # Tricks without the extracted fields are replayed as well.
+    assert verify([CrewGameTrick(t.played_cards) for t in TRICKS]) is None
+
+    assert verify(TRICKS[:2]) is not None
+    assert verify([dataclasses.replace(TRICKS[0], winning_player=2)] + TRICKS[1:])
+    assert verify([dataclasses.replace(TRICKS[0], starting_player=1)] + TRICKS[1:])
+    # Player 2 holds (2, 4), so can't play a trump card in the first trick.
+    swapped = [
+        CrewGameTrick([(2, 3), (-1, 2), (2, 7), (2, 2)]),
+        CrewGameTrick([(-1, 3), (2, 5), (3, 8), (1, 7)]),
+        TRICKS[2],
+    ]
+    assert "follow suit" in str(verify(swapped))
+    stolen = [CrewGameTrick([(2, 3), (2, 4), (2, 7), (2, 5)])] + TRICKS[1:]
+    assert "doesn't hold" in str(verify(stolen))
+    trump_lead = CrewGameSolution(
+        CrewGameState(example_hands, 1),
+        [CrewGameTrick([(-1, 3), (2, 5), (2, 7), (2, 2)])] + TRICKS[1:],
+    )
+    assert "trump" in str(verify_solution(DEFAULT_PARAMETERS, trump_lead))
+
+
+def test_verify_cards_outside_the_deck(
+    example_hands: CardDistribution, verify: Verify
+) -> None:
+    # Invalid cards and tricks are reported instead of raising.
+    short = [CrewGameTrick([(2, 3), (2, 5), (2, 7)])] + TRICKS[1:]
+    assert "a card of each player" in str(verify(short))
+    foreign = [CrewGameTrick([(2, 3), (2, 5), (4, 7), (2, 2)])] + TRICKS[1:]
+    assert "isn't in the deck" in str(verify(foreign))
+    assert "isn't in the deck" in str(verify(tasks=[Task((-1, 5), 1)]))
+    hands = [example_hands[0][:2] + [(0, 0)]] + example_hands[1:]
+    invalid_hand = CrewGameSolution(CrewGameState(hands, 4), TRICKS)
+    assert "isn't in the deck" in str(verify_solution(DEFAULT_PARAMETERS, invalid_hand))
+
+
+def test_verify_tasks(verify: Verify) -> None:
+    assert verify(tasks=[Task((1, 7), 1, 1, True), Task((2, 4), 4, 2, True)]) is None
+    assert verify(tasks=[Task((1, 7), 2)]) is not None
+    assert verify(tasks=[Task((1, 7))]) is not None
+    # Task cards may be won in the first trick.
+    assert verify(tasks=[Task((2, 5), 3)]) is None
+
+    assert verify(tasks=[Task((1, 7), 1, 2, True), Task((2, 4), 4, 1, True)])
+    assert verify(tasks=[Task((2, 2), 3), Task((1, 7), 1, 1)])
+    assert verify(tasks=[Task((2, 2), 3, 1), Task((1, 7), 1)]) is None
+    assert verify(tasks=[Task((2, 4), 4, -1), Task((2, 2), 3)]) is None
+    assert verify(tasks=[Task((2, 2), 3, -1), Task((2, 4), 4)])
+
+
+def test_verify_special_tasks(verify: Verify) -> None:
+    assert verify(special_tasks=[AssignTrickToPlayer(1, 2)]) is None
+    assert verify(special_tasks=[AssignTrickToPlayer(2, 2)])
+    assert verify(special_tasks=[NullGame(2)]) is None
+    assert verify(special_tasks=[NullGame(3)])
+    assert verify(special_tasks=[WinTricksWithSpecificValues(7)]) is None
+    # The trump card 3 doesn't count.
+    assert verify(special_tasks=[WinTricksWithSpecificValues(3)])
+    assert verify(special_tasks=[WinTricksWithSpecificValues(6, 2)])
+    assert verify(special_tasks=[NoTricksWithValueTask(9)]) is None
+    assert verify(special_tasks=[NoTricksWithValueTask(8)])
@@ -0,0 +1,85 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from crewz3r.crew_store import MemoryStore, SQLiteStore, StateStore, create_store
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request: pytest.FixtureRequest, tmp_path: Path) -> StateStore:
+    if request.param == "memory":
+        return MemoryStore()
+    return SQLiteStore(str(tmp_path / "state.db"))
+
+
+def job(job_id: str, priority: int = 1, worker: str | None = None) -> dict[str, Any]:
+    return {
+        "id": job_id,
+        "key": f"key {job_id}",
+        "priority": priority,
+        "status": "QUEUED",
+        "worker": worker,
+    }
+
+
+def test_rooms(store: StateStore) -> None:
+    store.put_room("table", {"users": ["a"]})
+    assert store.get_room("table") == {"users": ["a"]}
+    assert store.room_count() == 1
+
+    # Changes in a failed lock block are discarded by the SQLite store.
+    with pytest.raises(RuntimeError):
+        with store.lock():
+            store.delete_room("table")
+            raise RuntimeError
+    if isinstance(store, SQLiteStore):
+        assert store.get_room("table") is not None
+
+    store.delete_room("table")
+    assert store.get_room("table") is None
+    assert store.room_count() == 0
+
+
+def test_job_queue(store: StateStore) -> None:
+    store.put_job(job("first"))
+    store.put_job(job("pinned", worker="other"))
+    store.put_job(job("quick", priority=0))
+    assert [j["id"] for j in store.queued_jobs()] == ["quick", "first", "pinned"]
+    assert store.find_job("key first") is not None
+
+    claimed = store.claim_jobs("worker", 5)
+    assert [j["id"] for j in claimed] == ["quick", "first"]
+    assert all(j["worker"] == "worker" for j in claimed)
+    assert [j["id"] for j in store.queued_jobs()] == ["pinned"]
+    assert [j["id"] for j in store.claim_jobs("other", 5)] == ["pinned"]
+    assert sorted(j["id"] for j in store.assigned_jobs()) == [
+        "first",
+        "pinned",
+        "quick",
+    ]
+
+    for job_id in ("quick", "first"):
+        finished = store.get_job(job_id)
+        assert finished is not None
+        finished["status"] = "FINISHED"
+        store.put_job(finished)
+    assert store.find_job("key first") is None
+    assert [j["id"] for j in store.assigned_jobs()] == ["pinned"]
+    store.prune_jobs(1)
+    assert store.get_job("first") is None
+    assert store.get_job("quick") is not None
+    assert store.get_job("pinned") is not None
+
+
+def test_shared_sqlite_store(tmp_path: Path) -> None:
+    url = f"sqlite:///{tmp_path / 'state.db'}"
+    first, second = create_store(url), create_store(url)
+    first.put_room("table", {"users": []})
+    first.put_job(job("job"))
+    assert second.get_room("table") == {"users": []}
+    assert len(second.claim_jobs("worker", 1)) == 1
+    assert first.claim_jobs("other", 1) == []
+
+    with pytest.raises(ValueError):
+        create_store("redis://localhost")
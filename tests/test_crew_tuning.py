@@ -0,0 +1,40 @@
+from typing import Any
+
+from crewz3r.crew_benchmark import BenchmarkInstance
+from crewz3r.crew_tuning import CONFIGURATIONS, run_configuration, summarize
+
+
+def test_configurations_agree() -> None:
+    instance = BenchmarkInstance("example", 1)
+    runs = [
+        run_configuration((CONFIGURATIONS[name], instance, 30.0))
+        for name in ("default", "arith_simplex", "preprocess")
+    ]
+    assert {run["result"] for run in runs} == {"sat"}
+
+    summary = summarize(runs)
+    entry = summary["players"]["4"]
+    assert entry["recommended"] in entry["configs"]
+    assert entry["configs"]["default"]["runs"] == 1
+    assert summary["conflicts"] == []
+
+
+def test_summarize() -> None:
+    def run(config: str, seconds: float, result: str = "sat") -> dict[str, Any]:
+        return {
+            "config": config,
+            "instance": f"game {seconds}",
+            "players": 3,
+            "result": result,
+            "check_seconds": seconds,
+        }
+
+    runs = [run("fast", 1.0), run("fast", 30.0, "unknown"), run("slow", 2.0)]
+    runs.append(run("slow", 3.0, "unsat"))
+    summary = summarize(runs)
+    configs = summary["players"]["3"]["configs"]
+    assert configs["fast"]["median"] == 15.5
+    assert configs["fast"]["timeouts"] == 1
+    # Fewer timeouts are preferred over a lower median.
+    assert summary["players"]["3"]["recommended"] == "slow"
+    assert summary["conflicts"] == []
@@ -0,0 +1,84 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from crewz3r.crew_types import CardDistribution
+from crewz3r.main import main, mission_games, parse_seeds, solve_lines
+
+# Example game 1, with a task that can be completed by player 4 and one that
+# player 2 can never win, as player 1 holds the highest trump card.
+
+
+@pytest.fixture
+def solvable(example_hands: CardDistribution) -> str:
+    tasks = [{"card": [1, 6], "player": 4}]
+    return json.dumps({"id": "solvable", "hands": example_hands, "tasks": tasks})
+
+
+@pytest.fixture
+def unsolvable(example_hands: CardDistribution) -> str:
+    return json.dumps(
+        {"hands": example_hands, "tasks": [{"card": [-1, 3], "player": 2}]}
+    )
+
+
+def test_parse_seeds() -> None:
+    assert parse_seeds("3") == (3,)
+    assert parse_seeds("1-3,7") == (1, 2, 3, 7)
+
+
+def test_solve_lines(solvable: str, unsolvable: str) -> None:
+    lines = [solvable, "", unsolvable, "[]"]
+    results = list(solve_lines(lines, "z3", timeout=30.0))
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert results[0]["id"] == "solvable"
+    assert results[0]["result"] == "sat"
+    assert results[0]["solution"]["tricks"]
+    assert results[1]["result"] == "unsat"
+    assert results[1]["backend"] == "z3"
+    assert results[2]["result"] is None
+    assert "ValueError" in results[2]["error"]
+
+    # Playouts can't tell that a game has no solution.
+    results = list(solve_lines([unsolvable, solvable], "playouts", timeout=0.1))
+    assert [r["result"] for r in results] == ["unknown", "sat"]
+    assert results[1]["backend"] == "playouts"
+
+
+def test_solve_lines_in_parallel() -> None:
+    lines = list(mission_games("random", range(1, 4), players=3))
+    assert json.loads(lines[0])["id"] == "mission random seed 1"
+    results = list(
+        solve_lines(lines, "playouts", timeout=1.0, workers=2, ordered=False)
+    )
+    assert sorted(r["index"] for r in results) == [0, 1, 2]
+    assert all(r["error"] is None for r in results)
+
+
+def test_main(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], solvable: str, unsolvable: str
+) -> None:
+    games = tmp_path / "games.jsonl"
+    games.write_text(f"{solvable}\n{unsolvable}\n")
+    assert main(["--input", str(games), "--backend", "z3"]) == 0
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [r["result"] for r in results] == ["sat", "unsat"]
+
+    games.write_text(f"{solvable}\n")
+    assert main(["--input", str(games), "--print"]) == 0
+    assert "Card distribution:" in capsys.readouterr().out
+
+    games.write_text("{\n")
+    assert main(["--input", str(games)]) == 1
+
+
+def test_z3_is_loaded_lazily() -> None:
+    # Neither the server nor the command line load z3 before a game is solved.
+    code = "import sys, crewz3r.main, crewz3r.server; print('z3' in sys.modules)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert output.stdout.strip() == "False"
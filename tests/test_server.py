@@ -0,0 +1,317 @@
+import json
+import time
+from typing import Any
+
+import pytest
+from flask_socketio import SocketIOTestClient
+
+from crewz3r import crew_jobs, server
+from crewz3r.crew_example_games import example_game, random_game_state
+from crewz3r.crew_jobs import JobPriority, QueueFullError
+from crewz3r.crew_json import game_state_to_dict, parameters_to_dict
+from crewz3r.crew_store import MemoryStore
+from crewz3r.crew_tasks import Task
+from crewz3r.crew_utils import THREE_PLAYER_PARAMETERS, CrewGameState
+
+
+def client_in_room(room: str) -> SocketIOTestClient:
+    client = server.socketio.test_client(server.app)
+    client.emit("join room", room)
+    return client
+
+
+def event_names(client: SocketIOTestClient) -> list[str]:
+    return [event["name"] for event in client.get_received()]
+
+
+def stored_session(room: str) -> server.GameSession:
+    session = server.load_session(room)
+    assert session is not None
+    return session
+
+
+def stored_job(job_id: str | None) -> dict[str, Any]:
+    assert job_id is not None
+    job = server.store.get_job(job_id)
+    assert job is not None
+    return job
+
+
+def test_rooms_are_independent() -> None:
+    table_1 = [client_in_room("table 1") for _ in range(3)]
+    table_2 = [client_in_room("table 2") for _ in range(3)]
+    for client in table_1 + table_2:
+        client.get_received()
+
+    table_1[0].emit("start card selection")
+    assert "card selection started" in event_names(table_1[1])
+    assert event_names(table_2[1]) == []
+    session = server.load_session("table 2")
+    assert session is not None and session.parameters is None
+
+    for client in table_1 + table_2:
+        client.disconnect()
+    assert server.load_session("table 1") is None
+    assert server.load_session("table 2") is None
+
+
+def test_join_room_with_game_in_progress() -> None:
+    table = [client_in_room("table") for _ in range(3)]
+    table[0].emit("start card selection")
+
+    late_client = client_in_room("table")
+    assert "room error" in event_names(late_client)
+    session = server.load_session("table")
+    assert session is not None and len(session.users) == 3
+
+    for client in table + [late_client]:
+        client.disconnect()
+
+
+def test_card_removal_deltas() -> None:
+    table = [client_in_room("deltas") for _ in range(3)]
+    table[0].emit("start card selection")
+    snapshots = [
+        json.loads(event["args"][0])
+        for event in table[1].get_received()
+        if event["name"] == "cards snapshot"
+    ]
+    assert len(snapshots) == 1
+    assert [0, 1] in snapshots[0]["cards"]
+
+    table[0].emit("card_or_task taken", json.dumps([0, 1]))
+    removals = [
+        json.loads(event["args"][0])
+        for event in table[1].get_received()
+        if event["name"] == "card removed"
+    ]
+    assert removals == [{"version": snapshots[0]["version"] + 1, "card": [0, 1]}]
+
+    table[1].emit("resync")
+    (event,) = table[1].get_received()
+    assert event["name"] == "cards snapshot"
+    snapshot = json.loads(event["args"][0])
+    assert snapshot["version"] == removals[0]["version"]
+    assert [0, 1] not in snapshot["cards"]
+
+    for client in table:
+        client.disconnect()
+
+
+def test_card_taken_twice() -> None:
+    table = [client_in_room("twice") for _ in range(3)]
+    table[0].emit("start card selection")
+    for client in table:
+        client.get_received()
+
+    table[0].emit("card_or_task taken", json.dumps([0, 1]))
+    table[0].emit("card_or_task taken", json.dumps([0, 1]))
+    table[1].emit("card_or_task taken", json.dumps([0, 1]))
+    session = server.load_session("twice")
+    assert session is not None
+    assert sum(hand.count((0, 1)) for hand in session.card_distribution) == 1
+    # The clients that took the card again get the current deck.
+    assert "cards snapshot" in event_names(table[1])
+
+    for client in table:
+        client.disconnect()
+
+
+def test_prebuilt_games_are_limited(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(server, "MAX_PREBUILT_GAMES", 1)
+    game = example_game(1)
+    rooms = ["prebuilt 1", "prebuilt 2"]
+    for room in rooms:
+        with server.open_session(room, create=True) as session:
+            assert session is not None
+            session.users["sid"] = server.User(
+                "sid", "player", server.UserStatus.TASK_SELECTION
+            )
+            session.parameters = game.parameters
+            session.card_distribution = game.player_hands
+            server.prebuild_game(session)
+    assert list(server.local_games) == ["prebuilt 2"]
+    assert stored_session("prebuilt 1").prebuilt_worker is None
+    assert stored_session("prebuilt 2").prebuilt_worker == server.WORKER_ID
+
+    for room in rooms:
+        with server.open_session(room) as session:
+            assert session is not None
+            server.close_prebuilt_game(session)
+            session.users.clear()
+    assert server.local_games == {}
+
+
+def test_solve_api(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Example game 1 is solved by the playouts, which are skipped to test z3.
+    monkeypatch.setattr(crew_jobs, "WITNESS_TIME_LIMIT", 0)
+    checks = server.solver_phase_seconds.count(phase="check")
+    client = server.app.test_client()
+    game = example_game(1)
+    data = game_state_to_dict(game.initial_state)
+    data["parameters"] = parameters_to_dict(game.parameters)
+
+    response = client.post("/api/jobs", json=data)
+    assert response.status_code == 202
+    job_id = response.get_json()["job"]
+    end = time.monotonic() + 60
+    while time.monotonic() < end:
+        job = client.get(f"/api/jobs/{job_id}").get_json()
+        if job["status"] == "FINISHED":
+            break
+        time.sleep(0.1)
+    assert job["check_result"] == "sat"
+    assert len(job["solution"]["tricks"]) == game.NUMBER_OF_TRICKS
+    assert server.solver_phase_seconds.count(phase="check") == checks + 1
+
+    other = dict(data, active_player=1)
+    response = client.post("/api/jobs", json=[data, other])
+    assert response.status_code == 202
+    job_ids = response.get_json()["jobs"]
+    assert len(job_ids) == 2
+    response = client.get(f"/api/jobs/stream?ids={','.join(job_ids)}")
+    results = [
+        json.loads(line) for line in response.get_data(as_text=True).splitlines()
+    ]
+    assert sorted(result["id"] for result in results) == sorted(job_ids)
+    assert all(result["status"] == "FINISHED" for result in results)
+
+    assert client.post("/api/jobs", json=[data, 1]).status_code == 400
+    assert client.post("/api/jobs", json={"hands": "x"}).status_code == 400
+    assert client.get("/api/jobs/unknown").status_code == 404
+
+
+def test_job_queue(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(server, "store", MemoryStore())
+    monkeypatch.setattr(server, "MAX_QUEUED_SOLVER_JOBS", 3)
+    game = example_game(1)
+    states = [CrewGameState(game.player_hands, player) for player in (1, 2, 3)]
+
+    # The jobs are pinned to another server process, so they stay queued.
+    def submit(
+        state: CrewGameState, priority: JobPriority = JobPriority.NORMAL
+    ) -> dict[str, Any]:
+        return server.submit_job(
+            game.parameters, state, 1.0, priority, room="queue", worker="elsewhere"
+        )
+
+    first, second = submit(states[0]), submit(states[1])
+    quick = submit(states[2], JobPriority.QUICK_CHECK)
+    assert [j["id"] for j in server.store.queued_jobs()] == [
+        quick["id"],
+        first["id"],
+        second["id"],
+    ]
+
+    # Identical games are merged onto one job, which may get a higher priority.
+    assert submit(states[1], JobPriority.QUICK_CHECK)["id"] == second["id"]
+    assert server.store.queued_jobs()[0]["id"] == second["id"]
+
+    with pytest.raises(QueueFullError):
+        submit(CrewGameState(game.player_hands, 4))
+
+    session = server.GameSession("queue", solver_job=first["id"])
+    server.cancel_solver_job(session)
+    assert stored_job(first["id"])["status"] == "CANCELLED"
+    assert submit(states[0])["id"] != first["id"]
+
+
+def test_task_check_job(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(server, "store", MemoryStore())
+    monkeypatch.setattr(crew_jobs, "WITNESS_TIME_LIMIT", 0)
+    checks = server.solver_phase_seconds.count(phase="check")
+    game = example_game(1)
+    client = client_in_room("checks")
+    with server.open_session("checks") as session:
+        assert session is not None
+        session.parameters = game.parameters
+        session.card_distribution = game.player_hands
+        session.chosen_tasks = [Task((1, 6), 4)]
+        server.submit_task_check(session)
+        job_id = session.task_check_job
+    job = stored_job(job_id)
+    assert job["priority"] == JobPriority.QUICK_CHECK
+    assert job["task_check"]
+
+    end = time.monotonic() + 60
+    results: list[str] = []
+    while not results and time.monotonic() < end:
+        results = [
+            event["args"][0]
+            for event in client.get_received()
+            if event["name"] == "task check"
+        ]
+        time.sleep(0.1)
+    assert results == ["sat"]
+    assert server.solver_phase_seconds.count(phase="check") == checks + 1
+    assert stored_session("checks").task_check_job is None
+    client.disconnect()
+
+
+def test_task_check_of_fresh_game() -> None:
+    # The first check of a fresh deal takes longer than TASK_CHECK_TIMEOUT, and
+    # goes on in the prebuilt game after the unknown result.
+    deal = random_game_state(THREE_PLAYER_PARAMETERS, seed=1)
+    assert deal.hands is not None
+    client = client_in_room("fresh")
+    with server.open_session("fresh") as session:
+        assert session is not None
+        session.parameters = THREE_PLAYER_PARAMETERS
+        session.card_distribution = deal.hands
+        server.prebuild_game(session)
+        session.chosen_tasks = [Task(deal.tasks[0].card, 1)]
+
+    end = time.monotonic() + 60
+    results: list[str] = []
+    while (not results or results[-1] == "unknown") and time.monotonic() < end:
+        results += [
+            event["args"][0]
+            for event in client.get_received()
+            if event["name"] == "task check"
+        ]
+        time.sleep(0.1)
+    assert results[-1] in ("sat", "unsat")
+
+    with server.open_session("fresh") as session:
+        assert session is not None
+        server.close_prebuilt_game(session)
+    client.disconnect()
+
+
+def test_expired_job_leases(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(server, "store", MemoryStore())
+    game = example_game(1)
+    pinned = server.submit_job(game.parameters, game.initial_state, worker="gone")
+    assert pinned["lease"] > time.time()
+    server.expire_job_leases()
+    assert stored_job(pinned["id"])["worker"] == "gone"
+
+    # The server process stopped while running the job. It is queued again, and
+    # fails when it is stopped again. The job may be claimed by the solver
+    # dispatcher of this process in between.
+    for attempts in (0, 1):
+        job = stored_job(pinned["id"])
+        job.update(status="SOLVING", worker="gone", lease=time.time() - 1)
+        job["attempts"] = attempts
+        server.store.put_job(job)
+        server.expire_job_leases()
+        job = stored_job(pinned["id"])
+        assert job["worker"] != "gone"
+        assert job["attempts"] == attempts + 1
+    assert job["status"] == "FAILED"
+    assert server.store.find_job(pinned["key"]) is None
+
+
+def test_metrics() -> None:
+    joined = server.socketio_events.value(event="join room")
+    client = client_in_room("table")
+    assert server.socketio_events.value(event="join room") == joined + 1
+    assert server.socketio_events.value(event="connect") >= 1
+
+    response = server.app.test_client().get("/metrics")
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert 'crewz3r_socketio_events_total{event="join room"}' in text
+    assert "crewz3r_rooms 1.0" in text
+    assert "# TYPE crewz3r_solver_job_seconds histogram" in text
+    client.disconnect()